@@ -0,0 +1,206 @@
+"""
+Title and body extraction for scraped articles.
+
+Each NEWS_SITES entry can carry an "extraction" profile with CSS selectors for
+the title, the body container and elements to strip from the body. Profiles
+are compiled once at import. The generic class-name heuristic from the
+original scraper only runs when a site has no profile or its profile does not
+match the page.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from link_extractor import BS4_PARSER
+from news_sites import NEWS_SITES
+
+MIN_CONTENT_LENGTH = 300
+
+INVALID_TITLES = {
+    "Business", "Climate", "Sport", "Technology", "Entertainment",
+    "Analysis", "Art & Design", "Movies", "Opinion", "Review",
+    "Menu", "Navigation", "Search"
+}
+
+# Class names the generic heuristic treats as article body containers
+BODY_CLASS_PATTERN = re.compile(
+    "article-body|article-content|story-body|story-content|main-content|entry-content|post-content",
+    re.IGNORECASE
+)
+
+HEADLINE_CLASSES = ["article-headline", "story-headline", "headline"]
+
+
+class ExtractionProfile:
+    """Compiled selectors from a site's "extraction" config"""
+
+    def __init__(self, config):
+        self.title = soupsieve.compile(config["title"]) if config.get("title") else None
+        self.body = soupsieve.compile(config["body"]) if config.get("body") else None
+        strip = config.get("strip") or []
+        self.strip = soupsieve.compile(", ".join(strip)) if strip else None
+
+
+PROFILES = {
+    name: ExtractionProfile(config["extraction"])
+    for name, config in NEWS_SITES.items()
+    if config.get("extraction")
+}
+
+
+class ParseStats:
+    """Counts which extraction path each article took and how long parsing took"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.paths = defaultdict(int)
+        self.site_paths = defaultdict(lambda: defaultdict(int))
+        self.parse_seconds = 0.0
+        self.articles = 0
+
+    def record(self, site_name, path, seconds):
+        with self._lock:
+            self.paths[path] += 1
+            self.site_paths[site_name][path] += 1
+            self.parse_seconds += seconds
+            self.articles += 1
+
+    def report(self):
+        if not self.articles:
+            return
+        print("\n=== Article extraction report ===")
+        print(f"Parsed {self.articles} articles in {self.parse_seconds:.2f}s "
+              f"({self.parse_seconds / self.articles * 1000:.0f}ms avg)")
+        for path, count in sorted(self.paths.items(), key=lambda item: -item[1]):
+            print(f"  - {path}: {count}")
+        print("By site:")
+        for site_name, paths in sorted(self.site_paths.items()):
+            summary = ", ".join(f"{path} {count}" for path, count in paths.items())
+            print(f"  - {site_name}: {summary}")
+
+
+stats = ParseStats()
+
+
+def is_valid_title(title):
+    return not (title in INVALID_TITLES or
+                len(title) < 10 or
+                any(section in title for section in ["Section", "Category", "Page"]))
+
+
+def heuristic_title(soup, site_name):
+    """Title lookup used before extraction profiles existed"""
+    title_element = soup.find("h1")
+    if title_element:
+        return title_element.text.strip()
+
+    if site_name == "BBC":
+        # Sometimes BBC uses H2 for headlines; look for one with significant text length
+        for h2 in soup.find_all("h2"):
+            if len(h2.text.strip()) > 20:
+                return h2.text.strip()
+        for headline_class in HEADLINE_CLASSES:
+            headline = soup.find(class_=headline_class)
+            if headline:
+                return headline.text.strip()
+
+    return "No title"
+
+
+def paragraph_text(element, skip=None):
+    """Text of the paragraphs in element, leaving out those inside any element of skip"""
+    paragraphs = element.find_all("p")
+    if skip:
+        paragraphs = [p for p in paragraphs
+                      if id(p) not in skip and not any(id(parent) in skip for parent in p.parents)]
+    return " ".join(p.text.strip() for p in paragraphs)
+
+
+def profile_content(soup, profile):
+    """Body text from the profile's body selector, or "" if it doesn't match.
+
+    Strip elements are skipped rather than removed, so the heuristic fallback
+    still sees the whole page.
+    """
+    if not profile or not profile.body:
+        return ""
+    for body in profile.body.select(soup):
+        skip = {id(element) for element in profile.strip.select(body)} if profile.strip else None
+        content = paragraph_text(body, skip)
+        if len(content) >= MIN_CONTENT_LENGTH:
+            return content
+    return ""
+
+
+def heuristic_content(soup):
+    """Generic fallbacks: class-name containers, then all paragraphs, then page text.
+
+    Returns (content, path).
+    """
+    for container in soup.find_all(["article", "div", "section"], class_=BODY_CLASS_PATTERN):
+        if container.find("p"):
+            content = paragraph_text(container)
+            if len(content) >= MIN_CONTENT_LENGTH:
+                return content, "heuristic_container"
+            break
+
+    content = paragraph_text(soup)
+    if len(content) >= MIN_CONTENT_LENGTH:
+        return content, "paragraphs"
+
+    # Last resort: all text from the page, excluding scripts and styles
+    print(f"Not enough paragraph content, trying to extract all text")
+    for script in soup(["script", "style"]):
+        script.extract()
+    return soup.get_text(separator=" ", strip=True), "page_text"
+
+
+def parse_article(html, url, site_name, parse_stats=None):
+    """Extracts title and content from article HTML.
+
+    Returns {"url", "title", "content", "extraction_path", "parse_ms"} or None if
+    the page has an invalid title or not enough content. The outcome is
+    recorded in parse_stats (the module-level stats by default).
+    """
+    if parse_stats is None:
+        parse_stats = stats
+    start = time.perf_counter()
+    soup = BeautifulSoup(html, BS4_PARSER)
+    profile = PROFILES.get(site_name)
+
+    title = None
+    if profile and profile.title:
+        title_element = profile.title.select_one(soup)
+        if title_element:
+            title = title_element.get_text(" ", strip=True)
+    if not title:
+        title = heuristic_title(soup, site_name)
+
+    if not is_valid_title(title):
+        parse_stats.record(site_name, "invalid_title", time.perf_counter() - start)
+        print(f"Skipping article with invalid title: {title}")
+        return None
+
+    content = profile_content(soup, profile)
+    path = "profile"
+    if not content:
+        content, path = heuristic_content(soup)
+
+    seconds = time.perf_counter() - start
+    if len(content) < MIN_CONTENT_LENGTH:
+        parse_stats.record(site_name, "insufficient_content", seconds)
+        print(f"Skipping article with insufficient content: {title}")
+        return None
+
+    parse_stats.record(site_name, path, seconds)
+    return {
+        "url": url,
+        "title": title,
+        "content": content,
+        "extraction_path": path,
+        "parse_ms": round(seconds * 1000, 1)
+    }
@@ -0,0 +1,222 @@
+"""
+Streaming, size-capped article download.
+
+Article pages are read in chunks and fed to an incremental HTML scanner as
+they arrive. The scanner drops script/style/svg content without building any
+tree nodes for it and stops reading once the site's article body container
+has closed, or once the byte cap is reached. The trimmed HTML it produces is
+what article_parser then parses.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+import http_client
+from config import ARTICLE_MAX_BYTES
+from news_sites import NEWS_SITES
+
+CHUNK_SIZE = 16 * 1024
+
+# Content that is dropped entirely
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe"}
+
+# Container text needed before an early stop, same threshold as article_parser
+MIN_BODY_TEXT = 300
+
+SIMPLE_SELECTOR = re.compile(
+    r"^(?P<tag>[a-z][a-z0-9\-]*)?"
+    r"(?:\.(?P<cls>[\w\-]+)|#(?P<id>[\w\-]+)|\[(?P<attr>[\w\-]+)=['\"]?(?P<value>[^'\"\]]+)['\"]?\])?$",
+    re.IGNORECASE
+)
+
+
+def compile_stop_selectors(selector_list):
+    """Turns a profile body selector into simple (tag, attr, value) matchers.
+
+    Only tag, .class, #id and [attr=value] selectors (optionally with a tag)
+    are supported; anything more complex disables the early stop.
+    """
+    if not selector_list:
+        return None
+    matchers = []
+    for selector in selector_list.split(","):
+        match = SIMPLE_SELECTOR.match(selector.strip())
+        if not match:
+            return None
+        tag = (match.group("tag") or "").lower() or None
+        if match.group("cls"):
+            matchers.append((tag, "class", match.group("cls")))
+        elif match.group("id"):
+            matchers.append((tag, "id", match.group("id")))
+        elif match.group("attr"):
+            matchers.append((tag, match.group("attr").lower(), match.group("value")))
+        elif tag:
+            matchers.append((tag, None, None))
+    return matchers or None
+
+
+STOP_SELECTORS = {
+    name: compile_stop_selectors(config.get("extraction", {}).get("body"))
+    for name, config in NEWS_SITES.items()
+}
+
+
+class ArticleScanner(HTMLParser):
+    """Incremental scanner that rebuilds the page without script/style content"""
+
+    def __init__(self, stop_selectors=None):
+        super().__init__(convert_charrefs=False)
+        self.stop_selectors = stop_selectors
+        self.parts = []
+        self.skip_tag = None
+        self.skip_depth = 0
+        self.body_tag = None
+        self.body_depth = 0
+        self.body_text = 0
+        self.done = False
+
+    def _matches_body(self, tag, attrs):
+        for sel_tag, attr, value in self.stop_selectors:
+            if sel_tag and sel_tag != tag:
+                continue
+            if attr is None:
+                return True
+            actual = attrs.get(attr)
+            if actual is None:
+                continue
+            if attr == "class" and value in actual.split():
+                return True
+            if attr != "class" and actual == value:
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self.skip_tag = tag
+            self.skip_depth = 1
+            return
+
+        if self.body_tag:
+            if tag == self.body_tag:
+                self.body_depth += 1
+        elif self.stop_selectors and self._matches_body(tag, dict(attrs)):
+            self.body_tag = tag
+            self.body_depth = 1
+            self.body_text = 0
+
+        self.parts.append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.done and not self.skip_tag and tag not in SKIP_TAGS:
+            self.parts.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if self.skip_depth == 0:
+                    self.skip_tag = None
+            return
+
+        self.parts.append(f"</{tag}>")
+
+        if self.body_tag and tag == self.body_tag:
+            self.body_depth -= 1
+            if self.body_depth == 0:
+                if self.body_text >= MIN_BODY_TEXT:
+                    self.done = True
+                else:
+                    # Too short to be the article body (e.g. a teaser); keep looking
+                    self.body_tag = None
+
+    def handle_data(self, data):
+        if self.done or self.skip_tag:
+            return
+        if self.body_tag:
+            self.body_text += len(data.strip())
+        self.parts.append(data)
+
+    def handle_entityref(self, name):
+        if not self.done and not self.skip_tag:
+            self.parts.append(f"&{name};")
+
+    def handle_charref(self, name):
+        if not self.done and not self.skip_tag:
+            self.parts.append(f"&#{name};")
+
+    def handle_decl(self, decl):
+        self.parts.append(f"<!{decl}>")
+
+    def html(self):
+        return "".join(self.parts)
+
+
+def response_encoding(response):
+    return content_type_encoding(response.headers.get("Content-Type", ""))
+
+
+def content_type_encoding(content_type):
+    """Charset from a Content-Type header, defaulting to UTF-8 rather than requests' ISO-8859-1"""
+    match = re.search(r"charset=([\w\-]+)", content_type or "", re.IGNORECASE)
+    if match:
+        try:
+            codecs.lookup(match.group(1))
+            return match.group(1)
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def fetch_article(url, site_name, attempt=0, timeout=None, max_bytes=ARTICLE_MAX_BYTES, keep_raw=False):
+    """Streams an article page through ArticleScanner.
+
+    Returns {"html", "bytes_read", "truncated", "stopped_early", "response"},
+    plus "raw" (the bytes actually read) when keep_raw is set. Raises the same
+    requests exceptions as a normal fetch.
+    """
+    response = http_client.get(url, attempt=attempt, timeout=timeout, stream=True)
+    bytes_read = 0
+    truncated = False
+    raw_chunks = [] if keep_raw else None
+    try:
+        response.raise_for_status()
+        scanner = ArticleScanner(STOP_SELECTORS.get(site_name))
+        decoder = codecs.getincrementaldecoder(response_encoding(response))(errors="replace")
+
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            bytes_read += len(chunk)
+            if keep_raw:
+                raw_chunks.append(chunk)
+            scanner.feed(decoder.decode(chunk))
+            if scanner.done:
+                break
+            if bytes_read >= max_bytes:
+                truncated = True
+                break
+
+        if not scanner.done:
+            scanner.feed(decoder.decode(b"", final=True))
+            scanner.close()
+
+        result = {
+            "html": scanner.html(),
+            "bytes_read": bytes_read,
+            "truncated": truncated,
+            "stopped_early": scanner.done,
+            "response": response
+        }
+        if keep_raw:
+            result["raw"] = b"".join(raw_chunks)
+        return result
+    finally:
+        http_client.client.count_response(response, body_bytes=bytes_read)
+        # Closing a partly read response drops the connection instead of returning it to the pool
+        response.close()
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for the keyword check.
+
+Compares the old per-keyword substring scan with keyword_matcher on the
+article text of the recorded fixtures plus the exported quote CSVs. Reports
+microseconds per text and MB/sec for each approach, and lists the texts where
+the results differ (substring hits such as "war" in "award", inflections
+such as "wars" reported as "war", and "hostage" reported for "hostages").
+
+Usage (from the scraper directory):
+    python benchmarks/bench_keywords.py [--iterations 200]
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import article_parser  # noqa: E402
+import keyword_matcher  # noqa: E402
+from config import KEYWORDS  # noqa: E402
+from fixture_server import load_fixture  # noqa: E402
+from news_sites import NEWS_SITES  # noqa: E402
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def substring_terms(text):
+    """The keyword check as it was before keyword_matcher"""
+    content = text.lower()
+    return {kw for kw in KEYWORDS if kw.lower() in content}
+
+
+def load_corpus():
+    texts = []
+    for site_name in NEWS_SITES:
+        try:
+            html = load_fixture(site_name, "article").decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            continue
+        article = article_parser.parse_article(html, "https://example.com/", site_name)
+        if article:
+            texts.append(article["title"] + " " + article["content"])
+
+    for path in sorted(glob.glob(os.path.join(SCRAPER_DIR, "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = " ".join(row.get(col) or "" for col in ("text", "quote", "article_title"))
+                if text.strip():
+                    texts.append(text)
+    return texts
+
+
+def time_approach(func, texts, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            func(text)
+    return time.perf_counter() - start
+
+
+def benchmark(iterations=200):
+    texts = load_corpus()
+    size = sum(len(text.encode("utf-8")) for text in texts)
+
+    approaches = {"substring": substring_terms}
+    backends = ["find", "regex"] + (["ahocorasick"] if keyword_matcher.ahocorasick is not None else [])
+    for backend in backends:
+        matcher = keyword_matcher.KeywordMatcher(KEYWORDS, backend=backend)
+        approaches[f"matcher ({backend})"] = lambda text, m=matcher: {match.keyword for match in m.finditer(text)}
+    # What the pipeline calls when it doesn't need positions (KEYWORD_QUOTE_WINDOW=0)
+    approaches["matcher terms (find)"] = keyword_matcher.KeywordMatcher(KEYWORDS, backend="find").terms
+
+    print(f"Corpus: {len(texts)} texts, {size / 1024:.0f} KB, {iterations} iterations")
+    print(f"{'approach':<24}{'us/text':>10}{'MB/s':>10}")
+    for name, func in approaches.items():
+        elapsed = time_approach(func, texts, iterations)
+        runs = len(texts) * iterations
+        print(f"{name:<24}{elapsed / runs * 1e6:>10.2f}{size * iterations / elapsed / 1024 / 1024:>10.1f}")
+
+    differences = 0
+    for text in texts:
+        old = substring_terms(text)
+        new = {m.keyword for m in keyword_matcher.matcher.finditer(text)}
+        if old != new:
+            differences += 1
+            if differences <= 10:
+                print(f"  substring only: {sorted(old - new)}, matcher only: {sorted(new - old)} "
+                      f"in: {text[:80]!r}")
+    print(f"Texts with different keyword results: {differences} of {len(texts)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the keyword check')
+    parser.add_argument('--iterations', type=int, default=200, help='Passes over the corpus (default: 200)')
+    args = parser.parse_args()
+    benchmark(args.iterations)
@@ -0,0 +1,183 @@
+"""
+Benchmark for quote extraction.
+
+Compares the old one-regex-per-mark-pair extractor with the single-pass
+QuoteExtractor on two corpora:
+
+    articles   the recorded fixture articles (real text, no ground truth)
+    synthetic  articles assembled from the quotes in the exported CSVs, each
+               quote embedded in a known style: curly and straight double
+               marks, single marks with apostrophes inside, a quote running
+               over two paragraphs and a quote nested inside another
+
+Reports microseconds per article, MB/sec and quotes found. On the synthetic
+corpus every embedded quote is known, so it also reports recall and the
+fragment rate (extracted quotes that are not one of the embedded quotes,
+such as 'dominance," Kim said' or a quote cut at an apostrophe).
+
+Usage (from the scraper directory):
+    python benchmarks/bench_quotes.py [--iterations 50] [--examples 5]
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import article_parser  # noqa: E402
+from fixture_server import load_fixture  # noqa: E402
+from news_sites import NEWS_SITES  # noqa: E402
+from quote_extractor import QuoteExtractor  # noqa: E402
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUOTES_PER_ARTICLE = 8
+NAMES = ["Kim", "the minister", "a spokesperson", "Ms Okafor", "the general"]
+FILLER = [
+    "The ministry’s statement came hours later.",
+    "Officials in the parents’ association declined to comment.",
+    "It was the group's third statement this week.",
+]
+MARK_CHARS = re.compile('["“”‘’]')
+EDGE_PUNCTUATION = " ,.;:"
+
+
+def legacy_extract_quotes(content):
+    """Quote extraction as it was before the single-pass extractor"""
+    valid_quotes = []
+    for start_quote, end_quote in {'"': '"', '“': '”', "‘": "’"}.items():
+        pattern = f'{re.escape(start_quote)}([^{re.escape(end_quote)}]*){re.escape(end_quote)}'
+        for quote in re.findall(pattern, content):
+            quote = quote.strip()
+            if 8 < len(quote) < 300 and not quote.startswith(('http', 'www', 'https')):
+                valid_quotes.append(quote)
+    return valid_quotes
+
+
+def load_articles():
+    texts = []
+    for site_name in NEWS_SITES:
+        try:
+            html = load_fixture(site_name, "article").decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            continue
+        article = article_parser.parse_article(html, "https://example.com/", site_name)
+        if article:
+            texts.append(article["content"])
+    return texts
+
+
+def load_csv_quotes():
+    quotes = []
+    for path in sorted(glob.glob(os.path.join(SCRAPER_DIR, "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                quote = (row.get("text") or row.get("quote") or "").strip(EDGE_PUNCTUATION)
+                # Stored quotes that are themselves fragments can't be embedded cleanly
+                if 20 <= len(quote) <= 200 and not MARK_CHARS.search(quote.replace("’", "")):
+                    quotes.append(quote)
+    return quotes
+
+
+def embed(quote, index):
+    """(text, expected quote) for one CSV quote in the style picked by index"""
+    name = NAMES[index % len(NAMES)]
+    style = index % 5
+    if style == 0:
+        return f"“{quote},” {name} said.", quote
+    if style == 1:
+        return f'"{quote}," {name} told reporters.', quote
+    if style == 2:
+        return f"{name} said: ‘{quote}’.", quote
+    if style == 3 and " " in quote:
+        # Second paragraph reopens the quote without closing the first
+        words = quote.split(" ")
+        half = len(words) // 2
+        return f"“{' '.join(words[:half])} “{' '.join(words[half:])},” {name} said.", quote
+    outer = f"{name} told me, ‘{quote}’, and I believed it"
+    return f"“{outer},” she said.", outer
+
+
+def build_synthetic(quotes):
+    """List of (article text, set of expected quotes)"""
+    articles = []
+    for offset in range(0, len(quotes), QUOTES_PER_ARTICLE):
+        paragraphs = []
+        expected = set()
+        for index, quote in enumerate(quotes[offset:offset + QUOTES_PER_ARTICLE], offset):
+            text, truth = embed(quote, index)
+            paragraphs.append(text)
+            paragraphs.append(FILLER[index % len(FILLER)])
+            expected.add(truth.strip(EDGE_PUNCTUATION))
+        # Paragraphs are joined with spaces, as in article_parser
+        articles.append((" ".join(paragraphs), expected))
+    return articles
+
+
+def time_extractor(func, texts, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            func(text)
+    return time.perf_counter() - start
+
+
+def report_speed(label, extractors, texts, iterations):
+    size = sum(len(text.encode("utf-8")) for text in texts)
+    print(f"\n{label}: {len(texts)} articles, {size / 1024:.0f} KB, {iterations} iterations")
+    print(f"{'extractor':<14}{'us/article':>12}{'MB/s':>10}{'quotes':>10}")
+    for name, func in extractors.items():
+        elapsed = time_extractor(func, texts, iterations)
+        found = sum(len(func(text)) for text in texts)
+        print(f"{name:<14}{elapsed / (len(texts) * iterations) * 1e6:>12.1f}"
+              f"{size * iterations / elapsed / 1024 / 1024:>10.2f}{found:>10}")
+
+
+def report_fragments(extractors, articles, examples):
+    print(f"\n{'extractor':<14}{'found':>8}{'exact':>8}{'recall':>9}{'fragments':>11}{'rate':>8}")
+    for name, func in extractors.items():
+        found = exact = expected_total = 0
+        samples = []
+        for text, expected in articles:
+            expected_total += len(expected)
+            for quote in func(text):
+                found += 1
+                if quote.strip(EDGE_PUNCTUATION) in expected:
+                    exact += 1
+                elif len(samples) < examples:
+                    samples.append(quote)
+        fragments = found - exact
+        print(f"{name:<14}{found:>8}{exact:>8}{exact / expected_total:>9.1%}"
+              f"{fragments:>11}{fragments / found if found else 0:>8.1%}")
+        for quote in samples:
+            print(f"    fragment: {quote[:90]!r}")
+
+
+def benchmark(iterations=50, examples=5):
+    extractor = QuoteExtractor()
+    extractors = {"legacy regex": legacy_extract_quotes, "single pass": extractor.extract_quotes}
+
+    texts = load_articles()
+    if texts:
+        report_speed("Fixture articles", extractors, texts, iterations)
+
+    quotes = load_csv_quotes()
+    if not quotes:
+        print("No CSV quotes found for the synthetic corpus")
+        return
+    articles = build_synthetic(quotes)
+    report_speed(f"Synthetic articles from {len(quotes)} CSV quotes", extractors,
+                 [text for text, _ in articles], iterations)
+    report_fragments(extractors, articles, examples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark quote extraction')
+    parser.add_argument('--iterations', type=int, default=50, help='Passes over each corpus (default: 50)')
+    parser.add_argument('--examples', type=int, default=5, help='Fragments to print per extractor (default: 5)')
+    args = parser.parse_args()
+    benchmark(args.iterations, args.examples)
@@ -0,0 +1,190 @@
+"""
+Offline benchmark for the scrape/extract hot path.
+
+Runs get_article_links, scrape_article, search_keywords and
+QuoteExtractor.extract_quotes against the recorded fixtures for every
+NEWS_SITES entry, served by a local HTTP stand-in. Reports pages/sec, MB/sec,
+quotes/sec and peak memory for each stage, and which extraction path each
+article took. Synthetic fixtures were written to match the extraction
+profiles, so their profile hits say nothing about live pages.
+
+Usage (from the scraper directory):
+    python benchmarks/bench_scrape.py --output before.json
+    python benchmarks/bench_scrape.py --output after.json
+    python benchmarks/bench_scrape.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer, load_fixture, site_slug, synthetic_sites  # noqa: E402
+
+STAGES = ["get_article_links", "scrape_article", "search_keywords", "extract_quotes"]
+
+
+def load_targets():
+    # Imported here so --compare works without the scraper's dependencies
+    import homepage_cache
+    import scraper
+    return scraper, homepage_cache
+
+
+def run_stage(stage, scraper, homepage_cache, server, articles):
+    """Runs one pass of a stage over every site. Returns (pages, bytes, quotes)."""
+    pages = 0
+    size = 0
+    quotes = 0
+
+    for site_name, site_config in scraper.NEWS_SITES.items():
+        if stage == "get_article_links":
+            # Drop cached homepages so every pass downloads and parses the page
+            homepage_cache.cache.entries = {}
+            config = dict(site_config, url=server.url_for(site_name, "homepage"))
+            scraper.get_article_links(site_name, config)
+            pages += 1
+            size += len(load_fixture(site_name, "homepage"))
+        elif stage == "scrape_article":
+            article = scraper.scrape_article(server.url_for(site_name, "article"), site_name)
+            if article:
+                articles[site_name] = article
+            pages += 1
+            size += len(load_fixture(site_name, "article"))
+        elif stage == "search_keywords":
+            article = articles.get(site_name)
+            if article:
+                scraper.search_keywords(article)
+                pages += 1
+                size += len(article["content"].encode("utf-8"))
+        elif stage == "extract_quotes":
+            article = articles.get(site_name)
+            if article:
+                quotes += len(scraper.quote_extractor.extract_quotes(article["content"]))
+                pages += 1
+                size += len(article["content"].encode("utf-8"))
+
+    return pages, size, quotes
+
+
+def benchmark(iterations=5, verbose=False):
+    scraper, homepage_cache = load_targets()
+    results = {}
+    articles = {}
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with FixtureServer() as server, output:
+        # Warm up connections and fill `articles` for the text-only stages
+        for stage in STAGES:
+            run_stage(stage, scraper, homepage_cache, server, articles)
+
+        for stage in STAGES:
+            pages = size = quotes = 0
+            start = time.perf_counter()
+            for _ in range(iterations):
+                p, s, q = run_stage(stage, scraper, homepage_cache, server, articles)
+                pages += p
+                size += s
+                quotes += q
+            elapsed = time.perf_counter() - start
+
+            # Separate pass for memory, tracemalloc slows everything down
+            tracemalloc.start()
+            run_stage(stage, scraper, homepage_cache, server, articles)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[stage] = {
+                "seconds": elapsed,
+                "pages": pages,
+                "pages_per_sec": pages / elapsed,
+                "mb_per_sec": size / elapsed / 1024 / 1024,
+                "quotes_per_sec": quotes / elapsed,
+                "peak_mb": peak / 1024 / 1024
+            }
+
+    paths = {site_name: article["extraction_path"] for site_name, article in articles.items()}
+    return {"iterations": iterations, "stages": results, "extraction_paths": paths}
+
+
+def print_results(results):
+    print(f"\n=== Benchmark ({results['iterations']} iterations per stage) ===")
+    print(f"{'stage':<20}{'pages/s':>10}{'MB/s':>10}{'quotes/s':>10}{'peak MB':>10}")
+    for stage, r in results["stages"].items():
+        print(f"{stage:<20}{r['pages_per_sec']:>10.1f}{r['mb_per_sec']:>10.2f}"
+              f"{r['quotes_per_sec']:>10.0f}{r['peak_mb']:>10.1f}")
+
+    paths = results.get("extraction_paths", {})
+    if not paths:
+        return
+    synthetic = synthetic_sites()
+    print("\nExtraction path per article fixture:")
+    for site_name, path in sorted(paths.items()):
+        marker = " (synthetic)" if site_slug(site_name) in synthetic else ""
+        print(f"  - {site_name}: {path}{marker}")
+    profile_hits = sum(1 for path in paths.values() if path == "profile")
+    print(f"Profile hits: {profile_hits} of {len(paths)}")
+    fitted = sum(1 for site_name in paths if site_slug(site_name) in synthetic)
+    if fitted:
+        print(f"Note: {fitted} of {len(paths)} article fixtures are synthetic pages written to match "
+              f"the extraction profiles, so the profile hit rate is not representative of live pages. "
+              f"Record real pages with benchmarks/record_fixtures.py.")
+
+
+def compare(before, after, threshold=0.10):
+    """Prints per-stage changes and returns the list of regressions"""
+    regressions = []
+    print(f"\n=== Comparison (regression threshold {threshold:.0%}) ===")
+    for stage, new in after["stages"].items():
+        old = before["stages"].get(stage)
+        if not old:
+            print(f"{stage}: no baseline")
+            continue
+
+        for metric, higher_is_better in (("pages_per_sec", True), ("mb_per_sec", True),
+                                         ("quotes_per_sec", True), ("peak_mb", False)):
+            if not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            regressed = change < -threshold if higher_is_better else change > threshold
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{stage:<20}{metric:<16}{old[metric]:>10.2f} -> {new[metric]:>10.2f} ({change:+.1%}){flag}")
+            if regressed:
+                regressions.append((stage, metric, change))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) found")
+    else:
+        print("\nNo regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scrape/extract hot path on recorded fixtures')
+    parser.add_argument('--iterations', type=int, default=5, help='Passes over all sites per stage (default: 5)')
+    parser.add_argument('--output', default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change flagged as a regression (default: 0.10)')
+    parser.add_argument('--verbose', action='store_true', help='Show scraper output')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        sys.exit(1 if compare(before, after, args.threshold) else 0)
+
+    results = benchmark(args.iterations, args.verbose)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
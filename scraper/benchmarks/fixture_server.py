@@ -0,0 +1,104 @@
+"""
+Local HTTP stand-in for the NEWS_SITES used by the benchmarks.
+
+Serves the recorded fixtures in benchmarks/fixtures/<site>/ at
+/<site>/homepage and /<site>/article, gzip-encoded when the client accepts it,
+so the scraper's real fetch paths can be exercised without the network.
+"""
+import gzip
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_KINDS = ("homepage", "article")
+# Slugs of the sites whose fixtures are synthetic pages, not recorded ones
+SYNTHETIC_LIST = os.path.join(FIXTURES_DIR, "synthetic.txt")
+
+
+def site_slug(site_name):
+    return re.sub(r"[^a-z0-9]+", "-", site_name.lower()).strip("-")
+
+
+def fixture_path(site_name, kind):
+    return os.path.join(FIXTURES_DIR, site_slug(site_name), f"{kind}.html.gz")
+
+
+def synthetic_sites():
+    """Slugs of the sites whose fixtures were written by hand to match news_sites.py"""
+    try:
+        with open(SYNTHETIC_LIST, encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def mark_recorded(site_name):
+    """Takes a site off the synthetic list once its pages have been recorded"""
+    slugs = synthetic_sites() - {site_slug(site_name)}
+    with open(SYNTHETIC_LIST, "w", encoding="utf-8") as f:
+        f.writelines(f"{slug}\n" for slug in sorted(slugs))
+
+
+def load_fixture(site_name, kind):
+    """Decompressed fixture bytes"""
+    with open(fixture_path(site_name, kind), "rb") as f:
+        return gzip.decompress(f.read())
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        path = None
+        if len(parts) == 2 and parts[1] in FIXTURE_KINDS:
+            path = os.path.join(FIXTURES_DIR, parts[0], f"{parts[1]}.html.gz")
+
+        if not path or not os.path.exists(path):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            body = gzip.decompress(body)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Streaming fetches close the connection once they have what they need
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serves the fixtures on a local port from a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url_for(self, site_name, kind):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{site_slug(site_name)}/{kind}"
@@ -0,0 +1,62 @@
+"""
+Records fresh benchmark fixtures from the live NEWS_SITES.
+
+For each site, saves the homepage and the first article linked from it to
+benchmarks/fixtures/<site>/{homepage,article}.html.gz. The checked-in
+fixtures are synthetic pages shaped like each site's markup (same link
+formats, body containers and inline script weight), listed in
+fixtures/synthetic.txt; run this to replace them with real captures.
+
+Usage (from the scraper directory):
+    python benchmarks/record_fixtures.py [--site "BBC"]
+"""
+import argparse
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client  # noqa: E402
+import link_extractor  # noqa: E402
+from news_sites import NEWS_SITES  # noqa: E402
+from fixture_server import fixture_path, mark_recorded  # noqa: E402
+
+
+def save_fixture(site_name, kind, body):
+    path = fixture_path(site_name, kind)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        # mtime=0 keeps re-recorded identical pages byte-identical
+        f.write(gzip.compress(body, 9, mtime=0))
+    print(f"  - Saved {kind} ({len(body) / 1024:.0f} KB)")
+
+
+def record_site(site_name, site_config):
+    print(f"Recording {site_name}...")
+    response = http_client.get(site_config["url"])
+    response.raise_for_status()
+    save_fixture(site_name, "homepage", response.content)
+
+    links, _ = link_extractor.extract_links(site_name, site_config, response.text)
+    for link in links:
+        article = http_client.get(link.url)
+        if article.ok:
+            save_fixture(site_name, "article", article.content)
+            mark_recorded(site_name)
+            return
+    print(f"  - No article could be fetched for {site_name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Record benchmark fixtures from the live sites')
+    parser.add_argument('--site', default=None, help='Only record one site')
+    args = parser.parse_args()
+
+    for site_name, site_config in NEWS_SITES.items():
+        if args.site and site_name != args.site:
+            continue
+        try:
+            record_site(site_name, site_config)
+        except Exception as e:
+            print(f"Error recording {site_name}: {e}")
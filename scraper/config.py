@@ -15,3 +15,103 @@ def update_collection(new_collection):
     return QUOTES_COLLECTION
 
 MODEL_ID = "ft:gpt-3.5-turbo-0125:personal::B2QGxish"
+
+# Crawl settings
+CONCURRENT_CRAWL = os.getenv("CONCURRENT_CRAWL", "0") == "1"
+PER_HOST_CONCURRENCY = int(os.getenv("PER_HOST_CONCURRENCY", "2"))
+POLITENESS_DELAY = float(os.getenv("POLITENESS_DELAY", "2"))
+
+# HTTP client settings
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "4"))
+
+# Homepage cache settings
+HOMEPAGE_CACHE_PATH = os.getenv("HOMEPAGE_CACHE_PATH", "/tmp/sonder_homepage_cache.json")
+SKIP_UNCHANGED_SITES = os.getenv("SKIP_UNCHANGED_SITES", "0") == "1"
+
+# Homepage parser backend: auto, selectolax, lxml or html.parser
+LINK_PARSER = os.getenv("LINK_PARSER", "auto")
+
+# Streaming article download
+STREAM_ARTICLES = os.getenv("STREAM_ARTICLES", "0") == "1"
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", str(1536 * 1024)))
+
+# Parser processes used by the concurrent crawl (0 parses in the crawl threads)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+PARSE_QUEUE_SIZE = int(os.getenv("PARSE_QUEUE_SIZE", "0"))
+
+# Raw HTML archive (empty disables archiving)
+HTML_ARCHIVE_DIR = os.getenv("HTML_ARCHIVE_DIR", "")
+HTML_ARCHIVE_SEGMENT_BYTES = int(os.getenv("HTML_ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+
+# Yield-aware crawl budget (shifts max_articles_to_check between sites)
+ADAPTIVE_BUDGET = os.getenv("ADAPTIVE_BUDGET", "0") == "1"
+BUDGET_EXPLORATION_FLOOR = int(os.getenv("BUDGET_EXPLORATION_FLOOR", "4"))
+BUDGET_MAX_MULTIPLIER = int(os.getenv("BUDGET_MAX_MULTIPLIER", "2"))
+
+# Firestore server timestamps can be slightly behind our clock, so timestamp
+# watermarks and resume points are moved back this far
+CLOCK_SKEW_SECONDS = 600
+
+# Bloom filter of processed URLs, consulted before processed_urls lookups
+PROCESSED_FILTER = os.getenv("PROCESSED_FILTER", "0") == "1"
+PROCESSED_FILTER_SNAPSHOT = os.getenv("PROCESSED_FILTER_SNAPSHOT", "/tmp/sonder_processed_filter.bin")
+PROCESSED_FILTER_CAPACITY = int(os.getenv("PROCESSED_FILTER_CAPACITY", "50000"))
+PROCESSED_FILTER_ERROR_RATE = float(os.getenv("PROCESSED_FILTER_ERROR_RATE", "0.001"))
+PROCESSED_BUCKET_DAYS = int(os.getenv("PROCESSED_BUCKET_DAYS", "7"))
+PROCESSED_DAYS_THRESHOLD = int(os.getenv("PROCESSED_DAYS_THRESHOLD", "30"))
+
+# Characters of text around keyword matches searched for quotes (0 searches the whole article)
+KEYWORD_QUOTE_WINDOW = int(os.getenv("KEYWORD_QUOTE_WINDOW", "0"))
+
+# Headline keyword prefilter for homepage links: off, shadow, order or prune
+LINK_PREFILTER = os.getenv("LINK_PREFILTER", "off")
+LINK_PREFILTER_EXPLORE = int(os.getenv("LINK_PREFILTER_EXPLORE", "2"))
+
+# Article discovery: "html" scrapes front pages, "feeds" reads a site's RSS/Atom/sitemaps
+# first and falls back to the front page
+DISCOVERY_MODE = os.getenv("DISCOVERY_MODE", "html")
+FEED_MAX_AGE_HOURS = float(os.getenv("FEED_MAX_AGE_HOURS", "48"))
+
+# Retry backoff, per-run retry budget and per-host circuit breaker
+RETRY_BUDGET = int(os.getenv("RETRY_BUDGET", "30"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_RUNS = int(os.getenv("BREAKER_COOLDOWN_RUNS", "2"))
+HOST_HEALTH_PATH = os.getenv("HOST_HEALTH_PATH", "/tmp/sonder_host_health.json")
+
+# Local pre-scorer in front of the OpenAI scoring: off, shadow or gate
+PRESCORE_MODE = os.getenv("PRESCORE_MODE", "off")
+PRESCORE_MODEL_PATH = os.getenv("PRESCORE_MODEL_PATH", "/tmp/sonder_prescore.json")
+PRESCORE_LOW_SCORE = float(os.getenv("PRESCORE_LOW_SCORE", "0.17"))
+PRESCORE_CONFIDENCE = float(os.getenv("PRESCORE_CONFIDENCE", "0.7"))
+
+# Buffered quote writes shared by every collector
+QUOTE_SINK_BATCH_SIZE = int(os.getenv("QUOTE_SINK_BATCH_SIZE", "500"))
+QUOTE_SINK_FLUSH_SECONDS = float(os.getenv("QUOTE_SINK_FLUSH_SECONDS", "30"))
+QUOTE_SINK_WRITERS = int(os.getenv("QUOTE_SINK_WRITERS", "4"))
+
+# Near-duplicate quote check (MinHash LSH) before new quotes are stored
+NEAR_DUPLICATE_CHECK = os.getenv("NEAR_DUPLICATE_CHECK", "0") == "1"
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+NEAR_DUPLICATE_INDEX_PATH = os.getenv("NEAR_DUPLICATE_INDEX_PATH", "/tmp/sonder_near_duplicates.bin")
+
+# Streaming duplicate removal (local_clean_duplicates.py)
+DEDUPE_CHECKPOINT_PATH = os.getenv("DEDUPE_CHECKPOINT_PATH", "/tmp/sonder_dedupe_checkpoint.bin")
+DEDUPE_DELETE_WORKERS = int(os.getenv("DEDUPE_DELETE_WORKERS", "4"))
+
+# Concurrent OpenAI scoring in process_quotes (limits are refreshed from the API's rate-limit headers)
+SCORING_CONCURRENCY = int(os.getenv("SCORING_CONCURRENCY", "8"))
+SCORING_MAX_RETRIES = int(os.getenv("SCORING_MAX_RETRIES", "4"))
+SCORING_REQUESTS_PER_MINUTE = int(os.getenv("SCORING_REQUESTS_PER_MINUTE", "500"))
+SCORING_TOKENS_PER_MINUTE = int(os.getenv("SCORING_TOKENS_PER_MINUTE", "60000"))
+SCORING_COMMIT_SIZE = int(os.getenv("SCORING_COMMIT_SIZE", "100"))
+# Stop taking new quotes after this many seconds (0 for no limit), to finish inside a function timeout
+SCORING_DEADLINE_SECONDS = float(os.getenv("SCORING_DEADLINE_SECONDS", "0"))
+
+# Cache of remote quote scores by canonical quote, model and system prompt
+SCORE_CACHE = os.getenv("SCORE_CACHE", "0") == "1"
+SCORE_CACHE_PATH = os.getenv("SCORE_CACHE_PATH", "/tmp/sonder_score_cache.sqlite")
+SCORE_CACHE_LRU_SIZE = int(os.getenv("SCORE_CACHE_LRU_SIZE", "10000"))
@@ -0,0 +1,131 @@
+"""
+Yield-aware crawl budget per news site.
+
+Keeps per-site history in the site_stats collection: article fetches, keyword
+hits and quotes stored (written by the crawl), plus the number and sum of the
+scores those quotes later got (written by process_quotes). Each run, the total
+fetch budget (max_articles_to_check for every site) is redistributed toward
+the sites whose fetches have produced the most, and the best-scoring, quotes.
+Every site keeps a small exploration floor so a quiet site can recover.
+"""
+from firebase_init import db
+from google.cloud import firestore
+
+from config import BUDGET_EXPLORATION_FLOOR, BUDGET_MAX_MULTIPLIER
+
+SITE_STATS = "site_stats"
+
+# Smoothing so sites with little history start close to the average
+PRIOR_FETCHES = 10
+PRIOR_QUOTES = 2
+PRIOR_SCORE = 0.5
+
+
+def load_site_stats(site_names):
+    """Reads the stored history for each site in one multi-document read"""
+    stats = {name: {} for name in site_names}
+    try:
+        refs = [db.collection(SITE_STATS).document(name) for name in site_names]
+        for doc in db.get_all(refs):
+            if doc.exists:
+                stats[doc.id] = doc.to_dict()
+    except Exception as e:
+        print(f"Error loading site stats, using equal budgets: {e}")
+    return stats
+
+
+def site_yield(entry):
+    """Expected value of one fetch: smoothed quotes per fetch times mean score"""
+    fetches = entry.get("fetches", 0)
+    quotes = entry.get("quotes_stored", 0)
+    scored = entry.get("scored_quotes", 0)
+    score_sum = entry.get("score_sum", 0.0)
+
+    quotes_per_fetch = (quotes + PRIOR_QUOTES) / (fetches + PRIOR_FETCHES)
+    mean_score = (score_sum + PRIOR_SCORE * PRIOR_QUOTES) / (scored + PRIOR_QUOTES)
+    return quotes_per_fetch * mean_score
+
+
+def plan_budgets(site_names, max_articles_to_check, floor=BUDGET_EXPLORATION_FLOOR,
+                 max_multiplier=BUDGET_MAX_MULTIPLIER, stats=None):
+    """Splits len(site_names) * max_articles_to_check fetches across sites by yield.
+
+    Returns {site_name: number of articles to check}.
+    """
+    if stats is None:
+        stats = load_site_stats(site_names)
+
+    total = max_articles_to_check * len(site_names)
+    floor = min(floor, max_articles_to_check)
+    cap = max_articles_to_check * max_multiplier
+    yields = {name: site_yield(stats.get(name, {})) for name in site_names}
+
+    budgets = {name: floor for name in site_names}
+    remaining = total - floor * len(site_names)
+
+    # Hand out the rest proportionally to yield, re-spreading whatever a capped site can't take
+    while remaining > 0:
+        open_sites = [name for name in site_names if budgets[name] < cap]
+        if not open_sites:
+            break
+        weight = sum(yields[name] for name in open_sites)
+        shares = {name: remaining * yields[name] / weight for name in open_sites}
+        given = 0
+        for name in open_sites:
+            extra = min(int(shares[name]), cap - budgets[name])
+            budgets[name] += extra
+            given += extra
+        if given == 0:
+            # Largest remainders get the last few fetches
+            for name in sorted(open_sites, key=lambda n: shares[n] - int(shares[n]), reverse=True):
+                if given == remaining:
+                    break
+                budgets[name] += 1
+                given += 1
+        remaining -= given
+
+    print("\n=== Crawl budget ===")
+    print(f"{'site':<24}{'fetches':>8}{'stored':>8}{'avg score':>10}{'yield':>8}{'budget':>8}")
+    for name in sorted(site_names, key=lambda n: -budgets[n]):
+        entry = stats.get(name, {})
+        scored = entry.get("scored_quotes", 0)
+        avg = entry.get("score_sum", 0.0) / scored if scored else 0.0
+        print(f"{name:<24}{entry.get('fetches', 0):>8}{entry.get('quotes_stored', 0):>8}"
+              f"{avg:>10.2f}{yields[name]:>8.3f}{budgets[name]:>8}")
+
+    return budgets
+
+
+def record_site_run(site_name, fetches, keyword_hits, quotes_stored):
+    """Adds one run's crawl counts to a site's history"""
+    if fetches == 0:
+        return
+    try:
+        db.collection(SITE_STATS).document(site_name).set({
+            "fetches": firestore.Increment(fetches),
+            "keyword_hits": firestore.Increment(keyword_hits),
+            "quotes_stored": firestore.Increment(quotes_stored),
+            "runs": firestore.Increment(1),
+            "updated": firestore.SERVER_TIMESTAMP
+        }, merge=True)
+    except Exception as e:
+        print(f"Error recording site stats for {site_name}: {e}")
+
+
+def record_scores(scores_by_source):
+    """Adds quote scores from process_quotes to each source's history.
+
+    scores_by_source maps a crawled site's name to the remote scores its quotes got.
+    """
+    if not scores_by_source:
+        return
+    try:
+        batch = db.batch()
+        for source, scores in scores_by_source.items():
+            batch.set(db.collection(SITE_STATS).document(source), {
+                "scored_quotes": firestore.Increment(len(scores)),
+                "score_sum": firestore.Increment(sum(scores))
+            }, merge=True)
+        batch.commit()
+    except Exception as e:
+        print(f"Error recording quote scores in site stats: {e}")
@@ -0,0 +1,357 @@
+"""
+Concurrent crawl engine for the news site scraper.
+
+Runs every site in NEWS_SITES at the same time. Requests to the same host are
+limited by a per-host semaphore and spaced out by a politeness delay, so the
+crawl stays polite to each site while different sites are fetched in parallel.
+"""
+import asyncio
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from config import PER_HOST_CONCURRENCY, POLITENESS_DELAY, PARSE_WORKERS, ADAPTIVE_BUDGET
+import article_parser
+import crawl_budget
+import homepage_cache
+import host_health
+import http_client
+import link_prefilter
+import processed_index
+import quote_store
+import scraper
+from parse_pool import ParsePipeline
+
+
+class HostLimiter:
+    """Limits concurrent requests per host and enforces a delay between them"""
+
+    def __init__(self, max_concurrency=PER_HOST_CONCURRENCY, delay=POLITENESS_DELAY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._last_request = {}
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+
+    async def acquire(self, url):
+        host = self._host(url)
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_concurrency)
+            self._locks[host] = asyncio.Lock()
+
+        await self._semaphores[host].acquire()
+
+        # Space out request starts to the same host
+        async with self._locks[host]:
+            last = self._last_request.get(host)
+            if last is not None:
+                wait = self.delay - (time.monotonic() - last)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._last_request[host] = time.monotonic()
+
+    def release(self, url):
+        self._semaphores[self._host(url)].release()
+
+
+class CrawlStats:
+    """Wall-clock timings per site and per stage"""
+
+    def __init__(self):
+        self.stage_seconds = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.site_seconds = {}
+        self.started = time.monotonic()
+
+    def record(self, stage, seconds):
+        self.stage_seconds[stage] += seconds
+        self.stage_counts[stage] += 1
+
+    def report(self):
+        total = time.monotonic() - self.started
+        sequential = sum(self.site_seconds.values())
+
+        print("\n=== Crawl timing report ===")
+        print("Per site (wall clock):")
+        for site_name, seconds in sorted(self.site_seconds.items(), key=lambda item: -item[1]):
+            print(f"  - {site_name}: {seconds:.1f}s")
+
+        print("Per stage (summed over tasks):")
+        for stage, seconds in self.stage_seconds.items():
+            count = self.stage_counts[stage]
+            print(f"  - {stage}: {seconds:.1f}s over {count} calls ({seconds / count:.2f}s avg)")
+
+        print(f"Total wall clock: {total:.1f}s")
+        if total > 0:
+            print(f"Sum of site times: {sequential:.1f}s ({sequential / total:.1f}x overlap)")
+
+        return {
+            "total_seconds": total,
+            "site_seconds": dict(self.site_seconds),
+            "stage_seconds": dict(self.stage_seconds),
+        }
+
+
+async def timed(stats, stage, func, *args):
+    """Run a blocking function in a worker thread and record how long it took"""
+    start = time.monotonic()
+    try:
+        return await asyncio.to_thread(func, *args)
+    finally:
+        stats.record(stage, time.monotonic() - start)
+
+
+async def fetch_candidate(link, site_name, limiter, stats, seen_urls, processed, pipeline=None, cutoff=None):
+    """Check and fetch a single candidate article.
+
+    processed is the set of candidate links already in processed_urls.
+    Once the cutoff event is set, a link still waiting for its host slot is
+    skipped instead of fetched.
+
+    Returns (status, article, extracted). status is "fetched" unless the link
+    was skipped ("seen", "processed", or "skipped" for an open circuit or
+    the cut-off). extracted holds the keyword matches and quotes when the
+    article was parsed in the process pool, else None.
+    """
+    if link in seen_urls:
+        return "seen", None, None
+    seen_urls.add(link)
+
+    if link in processed:
+        return "processed", None, None
+
+    # Links of a host with an open circuit stay unmarked for a later run
+    if not host_health.health.allow(link):
+        return "skipped", None, None
+
+    if pipeline is None:
+        await limiter.acquire(link)
+        try:
+            if cutoff is not None and cutoff.is_set():
+                return "skipped", None, None
+            article = await timed(stats, "article_fetch", scraper.scrape_article, link, site_name)
+        finally:
+            limiter.release(link)
+        if article is None and not host_health.health.allow(link):
+            return "skipped", None, None
+        return "fetched", article, None
+
+    # Hold a pipeline slot from download to parsed result, so fetching
+    # pauses while the parser processes are behind
+    await pipeline.acquire()
+    try:
+        await limiter.acquire(link)
+        try:
+            if cutoff is not None and cutoff.is_set():
+                return "skipped", None, None
+            html = await timed(stats, "article_fetch", scraper.fetch_article_html, link, site_name)
+        finally:
+            limiter.release(link)
+        if html is None:
+            return "fetched" if host_health.health.allow(link) else "skipped", None, None
+
+        start = time.monotonic()
+        result = await pipeline.extract(html, link, site_name)
+        stats.record("parse", time.monotonic() - start)
+    finally:
+        pipeline.release()
+
+    return "fetched", result["article"], (result["matched_terms"], result["quotes"])
+
+
+async def handle_article(link, site_name, article, stats, markers, extracted=None):
+    """Keyword check, quote extraction and storage.
+
+    Returns (matched, quotes_added): whether the article matched any keyword
+    and the number of new quotes stored.
+    """
+    if not article:
+        print(f"Article could not be scraped or has invalid title/content")
+        markers.add(link, site_name)
+        return False, 0
+
+    if extracted is not None:
+        matched_terms, quotes = extracted
+    else:
+        start = time.monotonic()
+        matched_terms = scraper.search_keywords(article)
+        quotes = scraper.extract_article_quotes(article) if matched_terms else []
+        stats.record("extract", time.monotonic() - start)
+
+    if not matched_terms:
+        print(f"No relevant keywords found in: {article['title']}")
+    elif not quotes:
+        print(f"No quotes found in: {article['title']}")
+
+    quotes_added = 0
+    if quotes:
+        article_info = {
+            "url": article["url"],
+            "title": article["title"]
+        }
+        quotes_added = await timed(stats, "store", scraper.store_quotes, quotes, article_info, site_name)
+        if quotes_added == 0:
+            print(f"No new quotes were added (all were duplicates)")
+
+    markers.add(link, site_name)
+    return bool(matched_terms), quotes_added
+
+
+async def crawl_site(site_name, site_config, limiter, stats, seen_urls,
+                     max_articles_per_site, max_articles_to_check, pipeline=None):
+    """Crawl one site, fetching up to the per-host limit of articles at a time"""
+    site_start = time.monotonic()
+    quotes_added = 0
+    successful_articles = 0
+    attempted_articles = 0
+    fetches = 0
+    keyword_hits = 0
+    markers = processed_index.MarkerBuffer()
+
+    try:
+        await limiter.acquire(site_config["url"])
+        try:
+            article_links = await timed(stats, "homepage", lambda: scraper.discover_article_links(
+                site_name, site_config, with_text=True))
+        finally:
+            limiter.release(site_config["url"])
+
+        if not article_links:
+            print(f"No articles found for {site_name}, skipping site")
+            return 0
+
+        articles_to_check = link_prefilter.plan_fetches(site_name, article_links, max_articles_to_check)
+        print(f"Will check up to {len(articles_to_check)} {site_name} articles to find {max_articles_per_site} successful ones")
+
+        # One multi-document read for every candidate instead of a get() per link
+        processed = await timed(stats, "processed_check", processed_index.find_processed,
+                                [link for link in articles_to_check if link not in seen_urls])
+
+        # Sliding window of in-flight fetches; results are handled in link order
+        # so the max_articles_per_site cut-off matches the sequential crawl
+        pending = deque()
+        remaining = iter(articles_to_check)
+        cutoff = asyncio.Event()
+
+        def fill_window():
+            while len(pending) < limiter.max_concurrency:
+                link = next(remaining, None)
+                if link is None:
+                    return
+                task = asyncio.create_task(fetch_candidate(link, site_name, limiter, stats, seen_urls, processed,
+                                                           pipeline, cutoff))
+                pending.append((link, task))
+
+        try:
+            fill_window()
+            while pending:
+                link, task = pending.popleft()
+                attempted_articles += 1
+                try:
+                    status, article, extracted = await task
+                    if status == "fetched":
+                        fetches += 1
+                        matched, added = await handle_article(link, site_name, article, stats, markers, extracted)
+                        if article:
+                            link_prefilter.stats.record_fetch(site_name, link, matched)
+                        keyword_hits += matched
+                        if added > 0:
+                            successful_articles += 1
+                            quotes_added += added
+                            print(f"Success! Found and stored {added} new quotes from article")
+                except Exception as e:
+                    # Don't mark as processed so the article is retried next run
+                    print(f"Error processing article {link}: {e}")
+
+                if successful_articles >= max_articles_per_site:
+                    print(f"Reached target of {max_articles_per_site} successful articles for {site_name}")
+                    break
+                fill_window()
+        finally:
+            # Links queued ahead of the cut-off are skipped; fetches already running
+            # in a thread can't be cancelled, so wait for them. Either way the
+            # links are left unmarked for the next run.
+            cutoff.set()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+        print(f"Site {site_name} summary: attempted {attempted_articles}, successful {successful_articles}, added {quotes_added} quotes")
+        return quotes_added
+
+    except Exception as e:
+        print(f"Error processing site {site_name}: {e}")
+        return quotes_added
+
+    finally:
+        try:
+            # Quotes reach Firestore before their URLs are marked processed
+            await timed(stats, "store", quote_store.sink.flush)
+            await timed(stats, "store", markers.flush)
+        except Exception as e:
+            print(f"Error storing quotes or marking {len(markers)} {site_name} URLs as processed: {e}")
+        stats.site_seconds[site_name] = time.monotonic() - site_start
+        await asyncio.to_thread(crawl_budget.record_site_run, site_name, fetches, keyword_hits, quotes_added)
+
+
+async def crawl_all(sites, max_articles_per_site, max_articles_to_check,
+                    per_host_concurrency=PER_HOST_CONCURRENCY, politeness_delay=POLITENESS_DELAY,
+                    parse_workers=PARSE_WORKERS, adaptive_budget=ADAPTIVE_BUDGET):
+    if adaptive_budget:
+        budgets = await asyncio.to_thread(crawl_budget.plan_budgets, list(sites), max_articles_to_check)
+    else:
+        budgets = {site_name: max_articles_to_check for site_name in sites}
+
+    await asyncio.to_thread(processed_index.load_filter)
+    host_health.health.start_run()
+
+    limiter = HostLimiter(per_host_concurrency, politeness_delay)
+    stats = CrawlStats()
+    seen_urls = set()
+    pipeline = ParsePipeline(parse_workers) if parse_workers > 0 else None
+
+    # Blocking calls run in threads; size the pool so every host can use its full limit
+    executor = ThreadPoolExecutor(max_workers=len(sites) * limiter.max_concurrency + 4)
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    try:
+        results = await asyncio.gather(*[
+            crawl_site(site_name, site_config, limiter, stats, seen_urls,
+                       max_articles_per_site, budgets[site_name], pipeline)
+            for site_name, site_config in sites.items()
+        ])
+    finally:
+        if pipeline:
+            pipeline.shutdown()
+        executor.shutdown(wait=True)
+
+    homepage_cache.cache.save()
+    processed_index.save_filter()
+    host_health.health.save()
+    quote_store.sink.close()
+    stats.report()
+    processed_index.stats.report()
+    quote_store.stats.report()
+    link_prefilter.stats.report()
+    article_parser.stats.report()
+    http_client.client.report()
+    host_health.health.report()
+    return sum(results)
+
+
+def run_concurrent_crawl(max_articles_per_site=1, max_articles_to_check=16,
+                         per_host_concurrency=PER_HOST_CONCURRENCY, politeness_delay=POLITENESS_DELAY,
+                         adaptive_budget=ADAPTIVE_BUDGET):
+    """Entry point used by scraper.main when concurrent crawling is enabled"""
+    quotes_processed = asyncio.run(crawl_all(
+        scraper.NEWS_SITES,
+        max_articles_per_site,
+        max_articles_to_check,
+        per_host_concurrency,
+        politeness_delay,
+        adaptive_budget=adaptive_budget
+    ))
+    print(f"\nConcurrent crawl completed. Processed {quotes_processed} new quotes in total.")
+    return quotes_processed
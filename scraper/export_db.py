@@ -19,7 +19,7 @@ def export_quotes_to_csv():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"quotes_export_{timestamp}.csv"
         
-        fields = ['quote_id', 'text', 'article_title', 'source', 'manual_score', 'notes']
+        fields = ['quote_id', 'text', 'article_title', 'source', 'score', 'manual_score', 'notes']
         
         with open(filename, 'w', newline='', encoding='utf-8') as file:
             writer = csv.DictWriter(file, fieldnames=fields)
@@ -34,6 +34,9 @@ def export_quotes_to_csv():
                     'text': quote_data.get('text', ''),
                     'article_title': quote_data.get('article_title', ''),
                     'source': quote_data.get('source', ''),
+                    # The remote model's score, used to train and check prescore.py;
+                    # scores set by prescore.py itself are left out
+                    'score': quote_data.get('score', '') if quote_data.get('score_source') != 'prescore' else '',
                     'manual_score': '',  
                     'notes': ''        
                 })
@@ -0,0 +1,172 @@
+"""
+Article discovery from RSS, Atom and news sitemaps.
+
+Sites with a "feeds" list in NEWS_SITES can be discovered from their feeds
+instead of their HTML front page. Feeds are parsed incrementally with
+ElementTree's pull parser as the response streams in, and each entry's
+title, summary and publish date are read without building the document.
+Entries older than FEED_MAX_AGE_HOURS are dropped so stale articles are
+never fetched.
+"""
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+import http_client
+from config import FEED_MAX_AGE_HOURS
+from link_extractor import ExtractedLink, rules_for
+from url_utils import normalize_url
+
+CHUNK_SIZE = 16 * 1024
+
+# Elements holding one article: RSS 2.0 / RSS 1.0 item, Atom entry, sitemap url
+ENTRY_TAGS = {"item", "entry", "url"}
+# Sitemap index entries point at more sitemaps; only the first few are followed
+SITEMAP_TAG = "sitemap"
+MAX_CHILD_SITEMAPS = 3
+
+DATE_TAGS = ("pubDate", "published", "updated", "date", "publication_date", "lastmod")
+SUMMARY_TAGS = ("description", "summary")
+
+# RSS descriptions often hold escaped HTML
+HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_date(text):
+    """Publish date from RFC 822 (RSS) or ISO 8601 (Atom, sitemaps) text, as aware UTC"""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def entry_fields(element, base_url=None):
+    """(url, title, summary, published) of one feed entry.
+
+    Relative links are resolved against base_url, the feed's own URL.
+    """
+    url = None
+    title = ""
+    summary = ""
+    published = None
+    for child in element.iter():
+        name = local_name(child.tag)
+        if name == "link":
+            # Atom links carry the URL in href; prefer rel="alternate"
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                url = url or href
+            elif child.text and child.text.strip():
+                url = url or child.text.strip()
+        elif name == "loc" and url is None:
+            url = (child.text or "").strip()
+        elif name == "title" and not title:
+            title = (child.text or "").strip()
+        elif name in SUMMARY_TAGS and not summary:
+            summary = " ".join(HTML_TAG.sub(" ", child.text or "").split())
+        elif name in DATE_TAGS and published is None:
+            published = parse_date(child.text)
+    if url and base_url:
+        url = urljoin(base_url, url)
+    return url, title, summary, published
+
+
+def iter_feed(url, timeout=None):
+    """Yields (url, title, summary, published) from a feed or sitemap as it downloads.
+
+    Sitemap index files yield ("sitemap", loc, None, None) entries instead.
+    """
+    response = http_client.get(url, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+        # Links are relative to where the feed ended up after redirects
+        base_url = response.url or url
+        parser = ET.XMLPullParser(events=("end",))
+        body_bytes = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body_bytes += len(chunk)
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                name = local_name(element.tag)
+                if name in ENTRY_TAGS:
+                    entry = entry_fields(element, base_url)
+                    element.clear()
+                    if entry[0]:
+                        yield entry
+                elif name == SITEMAP_TAG:
+                    loc = next((c.text for c in element if local_name(c.tag) == "loc"), None)
+                    element.clear()
+                    if loc:
+                        yield "sitemap", urljoin(base_url, loc.strip()), None, None
+        parser.close()
+        http_client.client.count_response(response, body_bytes)
+    finally:
+        response.close()
+
+
+def feed_links(site_name, site_config, max_age_hours=FEED_MAX_AGE_HOURS, timeout=None):
+    """Article links from a site's feeds, newest first.
+
+    Returns a list of ExtractedLink, with the entry title and summary as the
+    link text, or None if the site has no feeds or none of them could be read.
+    """
+    feeds = site_config.get("feeds")
+    if not feeds:
+        return None
+
+    rules = rules_for(site_name, site_config)
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours) if max_age_hours else None
+    entries = {}
+    stale = 0
+    read_any = False
+    queue = list(feeds)
+    while queue:
+        feed_url = queue.pop(0)
+        children = 0
+        try:
+            for url, title, summary, published in iter_feed(feed_url, timeout):
+                if url == "sitemap":
+                    # Follow one level of sitemap index
+                    if feed_url in feeds and children < MAX_CHILD_SITEMAPS:
+                        queue.append(title)
+                        children += 1
+                    continue
+                # Same link rules as the front page, so feeds don't add video or sport pages
+                if rules.pattern not in url or (rules.regex and not rules.regex.search(url)):
+                    continue
+                if cutoff and published and published < cutoff:
+                    stale += 1
+                    continue
+                key = normalize_url(url)
+                if key not in entries:
+                    entries[key] = (published, ExtractedLink(url, f"{title} {summary}".strip()))
+            read_any = True
+        except Exception as e:
+            print(f"Could not read {site_name} feed {feed_url}: {e}")
+
+    if not read_any:
+        return None
+
+    # Undated entries keep their feed position after the dated ones
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    ordered = sorted(entries.values(), key=lambda entry: entry[0] or oldest, reverse=True)
+    if cutoff:
+        print(f"Found {len(ordered)} articles in {site_name} feeds ({stale} older than {max_age_hours:g}h skipped)")
+    else:
+        print(f"Found {len(ordered)} articles in {site_name} feeds")
+    return [link for _, link in ordered]
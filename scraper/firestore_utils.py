@@ -0,0 +1,20 @@
+"""
+Firestore helpers shared by the pipeline and the standalone tools.
+
+Takes the client as an argument instead of importing firebase_init, so tools
+that build their own client (rekey_quotes, local_clean_duplicates) can use it.
+"""
+
+# Documents per get_all call
+GET_ALL_CHUNK = 300
+
+
+def existing_ids(db, refs):
+    """IDs of the referenced quote documents that exist"""
+    found = set()
+    for start in range(0, len(refs), GET_ALL_CHUNK):
+        # Only existence matters, so read a single small field
+        for doc in db.get_all(refs[start:start + GET_ALL_CHUNK], field_paths=["processed"]):
+            if doc.exists:
+                found.add(doc.id)
+    return found
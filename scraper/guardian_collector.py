@@ -1,23 +1,19 @@
 import os
 from dotenv import load_dotenv
-from config import QUOTES_COLLECTION, KEYWORDS
-from firebase_init import db
 from quote_extractor import QuoteExtractor
-import requests
-from google.cloud import firestore
-import hashlib
-import re
+import keyword_matcher
+import http_client
+import quote_store
 
 load_dotenv()
 
-COLLECTION_NAME = QUOTES_COLLECTION
-
 # Get API key but don't fail immediately
 GUARDIAN_API_KEY = os.environ.get("GUARDIAN_API_KEY")
 
 class GuardianCollector:
     def __init__(self):
         self.quote_extractor = QuoteExtractor()
+        self.keyword_matcher = keyword_matcher.matcher
         self.base_url = "https://content.guardianapis.com/search"
         
     def get_articles(self, hours=24):
@@ -32,7 +28,7 @@ class GuardianCollector:
                 'show-tags': 'keyword'
             }
             
-            response = requests.get(self.base_url, params=params)
+            response = http_client.get(self.base_url, params=params, headers=http_client.API_HEADERS)
             response.raise_for_status()
             
             data = response.json()
@@ -52,13 +48,12 @@ class GuardianCollector:
             content = fields.get('bodyText', '')
             url = article.get('webUrl', '')
             
-            content_lower = content.lower()
-            matches = {kw for kw in KEYWORDS if kw.lower() in content_lower}
+            matches, content_matches = keyword_matcher.text_keywords(content, self.keyword_matcher)
             
             if matches:
                 print(f"Found keywords {matches} in article: {title}")
                 
-                quotes = self.quote_extractor.extract_quotes(content)
+                quotes = keyword_matcher.quotes_near_keywords(self.quote_extractor, content, content_matches)
                 if quotes:
                     article_info = {
                         "url": url,
@@ -72,41 +67,10 @@ class GuardianCollector:
             print(f"Error processing Guardian article: {e}")
             return None, None
     
-    def normalize_quote(self, text):
-        text = text.lower().strip()
-        text = re.sub(r'\s+', ' ', text)
-        #text = re.sub(r'[^\w\s]', '', text)
-        return text
-
-    def quote_id(self, text):
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()
-
     def store_quotes(self, quotes, article_info):
         """Store quotes in Firebase with duplicate prevention using hash-based document IDs"""
-        batch = db.batch()
-        stored_count = 0
-
-        for quote in quotes:
-            norm_quote = self.normalize_quote(quote)
-            if not norm_quote:
-                continue
-            doc_id = self.quote_id(norm_quote)
-            quote_ref = db.collection(COLLECTION_NAME).document(doc_id)
-            if quote_ref.get().exists:
-                continue  # Already exists, skip
-            batch.set(quote_ref, {
-                "text": quote.strip(),
-                "article_url": article_info["url"],
-                "article_title": article_info["title"],
-                "source": "The Guardian",
-                "timestamp": firestore.SERVER_TIMESTAMP,
-                "score": None,
-                "processed": False
-            })
-            stored_count += 1
-
+        stored_count = quote_store.sink.add(quotes, article_info, "The Guardian", origin="api")
         if stored_count > 0:
-            batch.commit()
             print(f"Stored {stored_count} new quotes from: {article_info['title']}")
         
         return stored_count
@@ -126,7 +90,9 @@ class GuardianCollector:
             if quotes and article_info:
                 quotes_processed += self.store_quotes(quotes, article_info)
                 
+        quote_store.sink.close()
         print(f"\nGuardian collection completed. Processed {quotes_processed} new quotes.")
+        quote_store.stats.report()
         return quotes_processed
 
 def main():
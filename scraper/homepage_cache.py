@@ -0,0 +1,109 @@
+"""
+Persistent cache of NEWS_SITES front pages.
+
+Stores the ETag / Last-Modified validators, a hash of the body and the
+extracted link list for each homepage URL, so unchanged front pages can be
+revalidated with a conditional GET and their links reused without parsing.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import HOMEPAGE_CACHE_PATH
+from link_extractor import ExtractedLink
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def link_set_hash(links):
+    """Order-independent hash of the URLs in a link list"""
+    urls = sorted({link.url for link in links})
+    return hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()
+
+
+def cached_links(entry):
+    """Links of a cache entry as ExtractedLink tuples"""
+    links = []
+    for link in entry.get("links", []):
+        # Entries written before anchor text was cached hold bare URLs
+        if isinstance(link, str):
+            links.append(ExtractedLink(link, ""))
+        else:
+            links.append(ExtractedLink(*link))
+    return links
+
+
+class HomepageCache:
+    def __init__(self, path=HOMEPAGE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Could not read homepage cache {self.path}: {e}")
+            return {}
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a cached homepage"""
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url, response, links, body_hash=None):
+        """Record a fetch result. Returns True if the link set is the same as last run."""
+        with self._lock:
+            previous = self.entries.get(url, {})
+            links_hash = link_set_hash(links)
+            entry = {
+                # A 304 may omit the validators, so keep the old ones
+                "etag": response.headers.get("ETag") or previous.get("etag"),
+                "last_modified": response.headers.get("Last-Modified") or previous.get("last_modified"),
+                "content_hash": body_hash or previous.get("content_hash"),
+                "links": [list(link) for link in links],
+                "links_hash": links_hash,
+                "fetched_at": time.time(),
+                "changed_at": previous.get("changed_at")
+            }
+            unchanged = previous.get("links_hash") == links_hash
+            if not unchanged:
+                entry["changed_at"] = entry["fetched_at"]
+            self.entries[url] = entry
+            self._dirty = True
+            return unchanged
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Could not write homepage cache {self.path}: {e}")
+
+
+# Shared cache, kept in memory across warm invocations
+cache = HomepageCache()
@@ -0,0 +1,190 @@
+"""
+Per-host health tracking, retry backoff and circuit breaker.
+
+Replaces the fixed retry_count * 2 second sleeps. Each retry waits a
+jittered exponential backoff (or the server's Retry-After) and draws on a
+retry budget shared by the whole run. A host that fails BREAKER_FAILURES
+times in a row has its circuit opened: it is skipped for the rest of the run
+and for the next BREAKER_COOLDOWN_RUNS runs, after which it is tried again.
+Open circuits are saved to HOST_HEALTH_PATH between runs.
+"""
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from requests.exceptions import RequestException
+
+from config import (
+    BREAKER_COOLDOWN_RUNS,
+    BREAKER_FAILURES,
+    HOST_HEALTH_PATH,
+    RETRY_BASE_DELAY,
+    RETRY_BUDGET,
+    RETRY_MAX_DELAY,
+)
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def retry_after_seconds(response):
+    """Seconds from a Retry-After header (delta or HTTP date), or None"""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_host_failure(error):
+    """Whether an error says something about the host rather than one page.
+
+    Connection errors, timeouts, 403, 429 and 5xx count; a 404 does not.
+    """
+    if not isinstance(error, RequestException):
+        return False
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return response.status_code in (403, 429) or response.status_code >= 500
+
+
+class HostHealth:
+    def __init__(self, path=HOST_HEALTH_PATH, failure_threshold=BREAKER_FAILURES,
+                 cooldown_runs=BREAKER_COOLDOWN_RUNS, retry_budget=RETRY_BUDGET,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown_runs = cooldown_runs
+        self.retry_budget = retry_budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.start_run()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Could not read host health state {self.path}: {e}")
+            return {}
+
+    def start_run(self):
+        """Resets per-run counters and reloads circuits left open by earlier runs"""
+        with self._lock:
+            # host -> {"runs_left", "reason"} for circuits opened in earlier runs
+            self.carried = self._load()
+            self.open = {host: entry.get("reason", "") for host, entry in self.carried.items()}
+            self.opened_this_run = set()
+            self.consecutive_failures = {}
+            self.failures = {}
+            self.successes = {}
+            self.retries = {}
+            self.retries_used = 0
+            self.budget_exhausted = 0
+
+    def allow(self, url):
+        """False if the host's circuit is open"""
+        return host_of(url) not in self.open
+
+    def record_success(self, url):
+        host = host_of(url)
+        with self._lock:
+            self.consecutive_failures[host] = 0
+            self.successes[host] = self.successes.get(host, 0) + 1
+
+    def record_failure(self, url, error):
+        """Counts a failed request; opens the circuit after too many in a row"""
+        if not is_host_failure(error):
+            return
+        host = host_of(url)
+        with self._lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            self.consecutive_failures[host] = self.consecutive_failures.get(host, 0) + 1
+            if self.consecutive_failures[host] >= self.failure_threshold and host not in self.open:
+                self.open[host] = str(error)[:200]
+                self.opened_this_run.add(host)
+                print(f"Circuit opened for {host} after {self.consecutive_failures[host]} failures, "
+                      f"skipping it for this run and the next {self.cooldown_runs}")
+
+    def retry_delay(self, url, attempt, error=None):
+        """Seconds to wait before retry number attempt (1-based), or None to give up"""
+        host = host_of(url)
+        if host in self.open:
+            return None
+
+        response = getattr(error, "response", None)
+        # Other client errors (404, 410, ...) won't change on a retry
+        if response is not None and 400 <= response.status_code < 500 and response.status_code not in (403, 408, 429):
+            return None
+
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None and retry_after > self.max_delay:
+            print(f"{host} asked to retry after {retry_after:.0f}s, not retrying this run")
+            return None
+
+        with self._lock:
+            if self.retries_used >= self.retry_budget:
+                self.budget_exhausted += 1
+                return None
+            self.retries_used += 1
+            self.retries[host] = self.retries.get(host, 0) + 1
+
+        if retry_after is not None:
+            return retry_after
+        # Full jitter keeps retries from many workers from lining up
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def save(self):
+        """Writes circuits that stay open for later runs"""
+        with self._lock:
+            state = {}
+            for host, entry in self.carried.items():
+                if entry.get("runs_left", 0) > 1:
+                    state[host] = dict(entry, runs_left=entry["runs_left"] - 1)
+            for host in self.opened_this_run:
+                if self.cooldown_runs > 0:
+                    state[host] = {"runs_left": self.cooldown_runs, "reason": self.open[host],
+                                   "opened_at": time.time()}
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Could not write host health state {self.path}: {e}")
+
+    def report(self):
+        print("\n=== Host health ===")
+        print(f"Retry budget: {self.retries_used}/{self.retry_budget} used"
+              f"{f', {self.budget_exhausted} retries refused' if self.budget_exhausted else ''}")
+        hosts = sorted(set(self.failures) | set(self.open))
+        for host in hosts:
+            if host in self.opened_this_run:
+                state = f"OPEN (opened this run, skipped for {self.cooldown_runs} more runs)"
+            elif host in self.open:
+                state = f"OPEN (carried over, {self.carried[host].get('runs_left', 0) - 1} more runs)"
+            else:
+                state = "closed"
+            print(f"  - {host}: {state}; {self.successes.get(host, 0)} ok, "
+                  f"{self.failures.get(host, 0)} failed, {self.retries.get(host, 0)} retries")
+        if not hosts:
+            print("  - No host failures")
+
+
+health = HostHealth()
@@ -0,0 +1,165 @@
+"""
+Append-only compressed archive of fetched pages.
+
+Every homepage and article the scraper downloads can be written to WARC-like
+segment files so it can be re-extracted later without touching the network.
+Each record is its own gzip member, so a record can be read by seeking to its
+offset. index.jsonl maps the processed_urls hash of each URL (url_utils.url_hash)
+to the segment, offset and length of its records.
+
+Enabled by setting HTML_ARCHIVE_DIR.
+"""
+import gzip
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from config import HTML_ARCHIVE_DIR, HTML_ARCHIVE_SEGMENT_BYTES
+from url_utils import normalize_url, url_hash
+
+INDEX_FILE = "index.jsonl"
+
+# The stored body is already decoded, so these no longer describe it
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class HtmlArchive:
+    def __init__(self, directory, segment_bytes=HTML_ARCHIVE_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segment = self._latest_segment()
+        # url_hash -> index entries, read from index.jsonl on the first lookup
+        self._by_hash = None
+        self._index_offset = 0
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"segment-{number:05d}.warc.gz")
+
+    def _latest_segment(self):
+        numbers = [
+            int(name[len("segment-"):-len(".warc.gz")])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".warc.gz")
+        ]
+        return max(numbers, default=1)
+
+    def record(self, url, body, headers=None, status=200, site_name=None, kind="article", fetched_at=None):
+        """Appends one fetched page. body is the decoded response bytes."""
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() not in DROPPED_HEADERS}
+
+        http_block = f"HTTP/1.1 {status}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        payload = http_block.encode("utf-8") + body
+        warc_header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {fetched_at.strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            "Content-Type: application/http; msgtype=response\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        member = gzip.compress(warc_header + payload + b"\r\n\r\n")
+
+        with self._lock:
+            path = self._segment_path(self.segment)
+            if os.path.exists(path) and os.path.getsize(path) + len(member) > self.segment_bytes:
+                self.segment += 1
+                path = self._segment_path(self.segment)
+
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+
+            entry = {
+                "url_hash": url_hash(url),
+                "url": url,
+                "normalized_url": normalize_url(url),
+                "site_name": site_name,
+                "kind": kind,
+                "status": status,
+                "fetched_at": fetched_at.isoformat(),
+                "segment": os.path.basename(path),
+                "offset": offset,
+                "length": len(member)
+            }
+            with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def index(self, kind=None):
+        """Yields index entries in the order they were written"""
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if kind is None or entry["kind"] == kind:
+                    yield entry
+
+    def _refresh_lookup(self):
+        """Adds index lines written since the last lookup (by this or another process)"""
+        if self._by_hash is None:
+            self._by_hash = {}
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; read it next time
+                    break
+                self._index_offset += len(line)
+                if line.strip():
+                    entry = json.loads(line)
+                    self._by_hash.setdefault(entry["url_hash"], []).append(entry)
+
+    def lookup(self, hash_or_url):
+        """Index entries for a URL or its url_hash, oldest first"""
+        key = hash_or_url if "/" not in hash_or_url else url_hash(hash_or_url)
+        with self._lock:
+            self._refresh_lookup()
+            return list(self._by_hash.get(key, ()))
+
+    def read(self, entry):
+        """Returns (headers, body) for an index entry"""
+        with open(os.path.join(self.directory, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            data = gzip.decompress(f.read(entry["length"]))
+
+        _, _, payload = data.partition(b"\r\n\r\n")
+        payload = payload[:-len(b"\r\n\r\n")]
+        http_block, _, body = payload.partition(b"\r\n\r\n")
+        headers = {}
+        for line in http_block.decode("utf-8").split("\r\n")[1:]:
+            name, _, value = line.partition(": ")
+            headers[name] = value
+        return headers, body
+
+
+def record_response(url, response, site_name, kind="article", body=None):
+    """Archives a requests response under the URL it was requested with, if archiving is enabled"""
+    if archive is None:
+        return
+    try:
+        archive.record(
+            url,
+            body if body is not None else response.content,
+            headers=dict(response.headers),
+            status=response.status_code,
+            site_name=site_name,
+            kind=kind
+        )
+    except Exception as e:
+        print(f"Could not archive {url}: {e}")
+
+
+archive = HtmlArchive(HTML_ARCHIVE_DIR) if HTML_ARCHIVE_DIR else None
@@ -0,0 +1,157 @@
+"""
+Shared HTTP client for every fetch path in the scraper.
+
+One requests.Session is reused for the whole process so connections to each
+host stay pooled and kept alive between requests and retries. User agent
+rotation and the default browser headers live here instead of being rebuilt
+by each caller.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE
+
+# requests only decodes brotli responses when one of these is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# List of different user agents to try if we get blocked
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/117.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1'
+]
+
+BROWSER_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Referer': 'https://www.google.com/',
+    'Cache-Control': 'no-cache',
+    'Pragma': 'no-cache'
+}
+
+# For JSON APIs: replaces the browser Accept header, and None drops the Referer
+API_HEADERS = {
+    'Accept': 'application/json',
+    'Referer': None
+}
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP client with user agent rotation and transfer counters"""
+
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 pool_maxsize=HTTP_POOL_MAXSIZE):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(BROWSER_HEADERS)
+
+        # One pool per host, each holding up to pool_maxsize keep-alive connections
+        self.adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.bytes_received = 0
+        self.wire_bytes_received = 0
+
+    def user_agent(self, attempt=0):
+        """Pick a different user agent for each retry attempt"""
+        return USER_AGENTS[attempt % len(USER_AGENTS)]
+
+    def get(self, url, attempt=0, headers=None, timeout=None, **kwargs):
+        """GET a URL through the shared session.
+
+        attempt selects the user agent so retries rotate through USER_AGENTS.
+        timeout may be a single number (as callers used with requests.get) or a
+        (connect, read) tuple; defaults to the configured timeouts.
+        """
+        request_headers = {'User-Agent': self.user_agent(attempt)}
+        if headers:
+            request_headers.update(headers)
+
+        response = self.session.get(
+            url,
+            headers=request_headers,
+            timeout=timeout or self.timeout,
+            **kwargs
+        )
+
+        if not kwargs.get("stream"):
+            self.count_response(response)
+        return response
+
+    def count_response(self, response, body_bytes=None):
+        """Add a finished response to the transfer counters"""
+        if body_bytes is None:
+            body_bytes = len(response.content)
+        try:
+            # Bytes read from the socket, before gzip/brotli decoding
+            wire_bytes = response.raw.tell()
+        except Exception:
+            wire_bytes = body_bytes
+
+        with self._lock:
+            self.requests_sent += 1
+            self.bytes_received += body_bytes
+            self.wire_bytes_received += wire_bytes
+
+    def connection_stats(self):
+        """Per-host connection counts taken from the urllib3 pools"""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        with pools.lock:
+            pool_list = list(pools._container.values())
+        for pool in pool_list:
+            host = pool.host
+            entry = hosts.setdefault(host, {"connections": 0, "requests": 0})
+            entry["connections"] += pool.num_connections
+            entry["requests"] += pool.num_requests
+        for entry in hosts.values():
+            entry["reused"] = max(0, entry["requests"] - entry["connections"])
+        return hosts
+
+    def stats(self):
+        hosts = self.connection_stats()
+        connections = sum(h["connections"] for h in hosts.values())
+        reused = sum(h["reused"] for h in hosts.values())
+        return {
+            "requests": self.requests_sent,
+            "connections_opened": connections,
+            "connections_reused": reused,
+            "bytes_received": self.bytes_received,
+            "wire_bytes_received": self.wire_bytes_received,
+            "hosts": hosts
+        }
+
+    def report(self):
+        stats = self.stats()
+        print("\n=== HTTP client report ===")
+        print(f"Requests: {stats['requests']}")
+        print(f"Connections opened: {stats['connections_opened']}, reused: {stats['connections_reused']}")
+        print(f"Received {stats['bytes_received'] / 1024:.0f} KB "
+              f"({stats['wire_bytes_received'] / 1024:.0f} KB on the wire)")
+        for host, entry in sorted(stats["hosts"].items()):
+            print(f"  - {host}: {entry['requests']} requests over {entry['connections']} connections")
+        return stats
+
+
+# Shared client used by every fetch path
+client = HttpClient()
+
+
+def get(url, attempt=0, **kwargs):
+    return client.get(url, attempt=attempt, **kwargs)
@@ -0,0 +1,234 @@
+"""
+Shared keyword matcher for scraped and API-collected articles.
+
+All keywords are compiled once, so an article is scanned once instead of
+once per keyword. Matches are whole words ("war" matches "war" and "War",
+not "award" or "warm") and come back with their positions, so quote
+extraction can be limited to the text around them. Common inflections count
+as the keyword: "wars", "conflicts", "battled", "hostages" (see
+inflections()). Irregular forms such as "warring" need their own keyword.
+
+finditer() has three backends, all returning the same matches:
+
+    ahocorasick  an Aho-Corasick automaton from pyahocorasick, used when it
+                 is installed
+    find         one str.find scan per keyword stem, used otherwise
+    regex        a precompiled word-boundary alternation, for the rare text
+                 whose offsets change when lowercased
+
+terms() only answers which keywords occur. For a short list such as KEYWORDS
+it stops at the first hit of each keyword, which costs about as much as the
+old per-keyword substring test (see benchmarks/bench_keywords.py).
+"""
+import os
+import re
+from collections import namedtuple
+
+from config import KEYWORDS, KEYWORD_QUOTE_WINDOW
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+Match = namedtuple("Match", ["keyword", "start", "end"])
+
+# Above this many stems terms() uses finditer instead of one str.find scan per stem
+FIND_MAX_STEMS = 12
+# The rest of a word, from a stem match to its end
+WORD_TAIL = re.compile(r"\w*")
+
+
+def is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+def inflections(keyword):
+    """The keyword with its regular plural, past and -ing forms.
+
+    Keywords ending in "s" are taken to be inflected already.
+    """
+    forms = {keyword}
+    if keyword.endswith("s") or not keyword.isalpha():
+        return forms
+    forms.add(keyword + "es" if keyword.endswith(("x", "z", "ch", "sh")) else keyword + "s")
+    if keyword.endswith("e") and not keyword.endswith("ee"):
+        forms.update({keyword + "d", keyword[:-1] + "ing"})
+    else:
+        forms.update({keyword + "ed", keyword + "ing"})
+    return forms
+
+
+class KeywordMatcher:
+    def __init__(self, keywords=KEYWORDS, backend="auto", inflect=True):
+        self.keywords = sorted({kw.lower() for kw in keywords}, key=len, reverse=True)
+        # Every form matched -> the keyword it is reported as (a keyword is always its own form)
+        self.forms = {}
+        for kw in self.keywords:
+            for form in (inflections(kw) if inflect else {kw}):
+                self.forms.setdefault(form, kw)
+        self.forms.update({kw: kw for kw in self.keywords})
+
+        # Scan stems: the common prefix of each keyword's forms ("battl" for battle,
+        # battles, battled, battling), dropping stems that start with a shorter one
+        stems = sorted({os.path.commonprefix([form for form, kw in self.forms.items() if kw == keyword])
+                        for keyword in self.keywords}, key=len)
+        self.stems = []
+        for stem in stems:
+            if not any(stem.startswith(shorter) for shorter, _ in self.stems):
+                keywords = {kw for form, kw in self.forms.items() if form.startswith(stem)}
+                self.stems.append((stem, keywords))
+
+        if backend == "auto":
+            backend = "ahocorasick" if ahocorasick is not None else "find"
+        self.backend = backend
+
+        if backend == "ahocorasick":
+            self.automaton = ahocorasick.Automaton()
+            for form, kw in self.forms.items():
+                self.automaton.add_word(form, (form, kw))
+            self.automaton.make_automaton()
+        # The lookahead on first letters lets the regex engine skip most positions cheaply
+        ordered = sorted(self.forms, key=len, reverse=True)
+        first_chars = "".join(sorted({re.escape(form[0]) for form in ordered}))
+        self.pattern = re.compile(
+            r"(?<!\w)(?=[" + first_chars + r"])(?:" + "|".join(re.escape(form) for form in ordered) + r")(?!\w)",
+            re.IGNORECASE
+        )
+
+    def finditer(self, text):
+        """Yields a Match for every whole-word keyword occurrence, in text order"""
+        if self.backend == "regex":
+            return self._regex_matches(text)
+        lowered = text.lower()
+        # lower() can change the length of a few characters, and with it the offsets
+        if len(lowered) != len(text):
+            return self._regex_matches(text)
+        if self.backend == "find":
+            return iter(self._find_matches(lowered))
+        return self._automaton_matches(lowered)
+
+    def _regex_matches(self, text):
+        for m in self.pattern.finditer(text):
+            yield Match(self.forms[m.group(0).lower()], m.start(), m.end())
+
+    def _stem_hits(self, lowered, stem):
+        """(start, end, keyword) of each whole word starting with stem that is a keyword form"""
+        forms = self.forms
+        tail = WORD_TAIL.match
+        size = len(stem)
+        start = lowered.find(stem)
+        while start != -1:
+            # is_word_char inlined
+            before = lowered[start - 1] if start else " "
+            if not (before.isalnum() or before == "_"):
+                end = tail(lowered, start + size).end()
+                kw = forms.get(lowered[start:end])
+                if kw:
+                    yield start, end, kw
+            start = lowered.find(stem, start + size)
+
+    def _find_matches(self, lowered):
+        matches = [Match(kw, start, end) for stem, _ in self.stems for start, end, kw in self._stem_hits(lowered, stem)]
+        if len(self.stems) > 1:
+            matches.sort(key=lambda m: m.start)
+        return matches
+
+    def _automaton_matches(self, lowered):
+        last_end = -1
+        for end_index, (form, kw) in self.automaton.iter_long(lowered):
+            start = end_index - len(form) + 1
+            end = end_index + 1
+            if start < last_end:
+                continue
+            if start > 0 and is_word_char(lowered[start - 1]):
+                continue
+            if end < len(lowered) and is_word_char(lowered[end]):
+                continue
+            last_end = end
+            yield Match(kw, start, end)
+
+    def find(self, text):
+        return list(self.finditer(text))
+
+    def search(self, text):
+        """First Match in text, or None"""
+        return next(iter(self.finditer(text)), None)
+
+    def terms(self, text):
+        """The set of keywords in text; stops scanning a stem once its keywords are found"""
+        lowered = text.lower()
+        if len(self.stems) > FIND_MAX_STEMS or len(lowered) != len(text):
+            return {m.keyword for m in self.finditer(text)}
+        found = set()
+        forms = self.forms
+        tail = WORD_TAIL.match
+        # _stem_hits inlined: this is the keyword check on every fetched article
+        for stem, keywords in self.stems:
+            size = len(stem)
+            start = lowered.find(stem)
+            while start != -1:
+                before = lowered[start - 1] if start else " "
+                if not (before.isalnum() or before == "_"):
+                    kw = forms.get(lowered[start:tail(lowered, start + size).end()])
+                    if kw:
+                        found.add(kw)
+                        if keywords <= found:
+                            break
+                start = lowered.find(stem, start + size)
+        return found
+
+matcher = KeywordMatcher()
+
+
+def text_keywords(text, keyword_matcher=None, radius=KEYWORD_QUOTE_WINDOW):
+    """Returns (terms, matches): the keywords in text, and their Match list when
+    quotes are limited to keyword windows (None otherwise, as no one needs it)."""
+    keyword_matcher = keyword_matcher or matcher
+    if radius <= 0:
+        return keyword_matcher.terms(text), None
+    matches = keyword_matcher.find(text)
+    return {m.keyword for m in matches}, matches
+
+
+def article_keywords(article, keyword_matcher=None, radius=KEYWORD_QUOTE_WINDOW):
+    """Keyword check for a parsed article.
+
+    Returns (matched_terms, content_matches): the set of keywords found in the
+    title or content, and the content's Match list (see text_keywords).
+    """
+    keyword_matcher = keyword_matcher or matcher
+    content_terms, content_matches = text_keywords(article["content"], keyword_matcher, radius)
+    return keyword_matcher.terms(article["title"]) | content_terms, content_matches
+
+
+def keyword_windows(text, matches, radius=KEYWORD_QUOTE_WINDOW):
+    """Merged (start, end) spans of text within radius characters of a match.
+
+    Spans are widened to the nearest space so words aren't cut. A radius of 0
+    returns the whole text.
+    """
+    if radius <= 0 or not matches:
+        return [(0, len(text))]
+
+    spans = []
+    for m in matches:
+        start = max(0, m.start - radius)
+        end = min(len(text), m.end + radius)
+        space = text.rfind(" ", 0, start)
+        start = space + 1 if space != -1 else 0
+        space = text.find(" ", end)
+        end = space if space != -1 else len(text)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def quotes_near_keywords(quote_extractor, text, matches, radius=KEYWORD_QUOTE_WINDOW):
+    """Runs quote_extractor over the text around keyword matches only"""
+    quotes = []
+    for start, end in keyword_windows(text, matches, radius):
+        quotes.extend(quote_extractor.extract_quotes(text[start:end]))
+    return quotes
@@ -0,0 +1,101 @@
+"""
+Single-pass article link extraction for NEWS_SITES homepages.
+
+Each site's link pattern and article regex are compiled once at import. A
+homepage is parsed with the fastest available backend and its anchors are
+walked once, normalizing and deduplicating URLs as they are found.
+"""
+import re
+from collections import namedtuple
+
+from config import LINK_PARSER
+from news_sites import NEWS_SITES
+from url_utils import normalize_url
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = "lxml"
+except ImportError:
+    BS4_PARSER = "html.parser"
+
+# Only build tree nodes for anchors when parsing with BeautifulSoup
+ANCHORS_ONLY = SoupStrainer("a", href=True)
+
+ExtractedLink = namedtuple("ExtractedLink", ["url", "text"])
+
+
+class SiteLinkRules:
+    """Compiled link matching rules for one site"""
+
+    def __init__(self, site_config):
+        self.pattern = site_config["article_link_pattern"]
+        self.base_url = site_config["base_url"]
+        self.regex = None
+        if site_config.get("require_regex") and site_config.get("article_regex"):
+            self.regex = re.compile(site_config["article_regex"])
+
+    def full_url(self, href):
+        return href if href.startswith("http") else f"{self.base_url}{href}"
+
+
+SITE_RULES = {name: SiteLinkRules(config) for name, config in NEWS_SITES.items()}
+
+
+def rules_for(site_name, site_config):
+    rules = SITE_RULES.get(site_name)
+    if rules is None or rules.base_url != site_config["base_url"]:
+        rules = SiteLinkRules(site_config)
+    return rules
+
+
+def iter_anchors(html, parser=LINK_PARSER):
+    """Yields (href, anchor text) for every anchor with an href"""
+    if parser == "auto":
+        parser = "selectolax" if SelectolaxParser else BS4_PARSER
+
+    if parser == "selectolax":
+        tree = SelectolaxParser(html)
+        for node in tree.css("a[href]"):
+            yield node.attributes.get("href") or "", node.text(separator=" ", strip=True)
+    else:
+        soup = BeautifulSoup(html, parser, parse_only=ANCHORS_ONLY)
+        for a in soup.find_all("a", href=True):
+            yield a["href"], a.get_text(" ", strip=True)
+
+
+def extract_links(site_name, site_config, html, parser=LINK_PARSER):
+    """Extracts unique article links with their anchor text, in page order.
+
+    Returns (links, pattern_matches) where pattern_matches is the number of
+    anchors that matched the site's link pattern before regex filtering.
+    """
+    rules = rules_for(site_name, site_config)
+    links = []
+    index_by_url = {}
+    pattern_matches = 0
+
+    for href, text in iter_anchors(html, parser):
+        if rules.pattern not in href:
+            continue
+        pattern_matches += 1
+        if rules.regex and not rules.regex.search(href):
+            continue
+
+        url = rules.full_url(href)
+        normalized = normalize_url(url)
+        index = index_by_url.get(normalized)
+        if index is None:
+            index_by_url[normalized] = len(links)
+            links.append(ExtractedLink(url, text))
+        elif len(text) > len(links[index].text):
+            # The same story is often linked from an image first; keep the headline text
+            links[index] = ExtractedLink(links[index].url, text)
+
+    return links, pattern_matches
@@ -0,0 +1,120 @@
+"""
+Headline-level keyword prefilter for homepage links.
+
+Scores every candidate link on its anchor text (the headline, and on most
+sites the teaser inside the same card) and on the words in its URL slug,
+before any article is fetched. Depending on LINK_PREFILTER:
+
+    off     links are fetched in page order, nothing is scored
+    shadow  links are scored but fetched in page order, to measure the prefilter
+    order   keyword-likely links are fetched first
+    prune   links with no keyword signal are dropped, except for a few kept
+            (LINK_PREFILTER_EXPLORE) so the recall lost can still be estimated;
+            a site with fewer signalled links than its budget needs fewer fetches
+
+The report at the end of a run compares the keyword hit rate of scored and
+unscored links that were fetched, and estimates the hits missed in dropped links.
+"""
+import re
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from config import LINK_PREFILTER, LINK_PREFILTER_EXPLORE
+import keyword_matcher
+
+SLUG_SEPARATORS = re.compile(r"[-_/.+]+")
+
+# A keyword in the headline is stronger evidence than one in the slug
+HEADLINE_WEIGHT = 2
+SLUG_WEIGHT = 1
+
+
+def slug_text(url):
+    return SLUG_SEPARATORS.sub(" ", urlparse(url).path)
+
+
+def score_link(link, matcher=None):
+    """Keyword score of an ExtractedLink from its anchor text and URL slug"""
+    matcher = matcher or keyword_matcher.matcher
+    headline = {m.keyword for m in matcher.finditer(link.text)}
+    slug = {m.keyword for m in matcher.finditer(slug_text(link.url))}
+    return HEADLINE_WEIGHT * len(headline) + SLUG_WEIGHT * len(slug)
+
+
+class PrefilterStats:
+    def __init__(self):
+        self.scores = {}
+        self.candidates = defaultdict(int)
+        self.dropped = defaultdict(int)
+        # [fetched, keyword hits] for links with and without a prefilter score
+        self.scored = defaultdict(lambda: [0, 0])
+        self.unscored = defaultdict(lambda: [0, 0])
+
+    def record_fetch(self, site_name, url, matched):
+        """Records whether a fetched article matched the keywords"""
+        score = self.scores.get(url)
+        if score is None:
+            return
+        counts = self.scored[site_name] if score > 0 else self.unscored[site_name]
+        counts[0] += 1
+        counts[1] += bool(matched)
+
+    def report(self, mode=LINK_PREFILTER):
+        if not self.candidates:
+            return
+        print(f"\n=== Link prefilter ({mode}) ===")
+        for site_name in self.candidates:
+            scored = self.scored[site_name]
+            unscored = self.unscored[site_name]
+            print(f"  - {site_name}: {self.candidates[site_name]} links, {self.dropped[site_name]} dropped; "
+                  f"fetched {scored[0]} scored ({scored[1]} hits), {unscored[0]} unscored ({unscored[1]} hits)")
+
+        dropped = sum(self.dropped.values())
+        scored_fetched = sum(c[0] for c in self.scored.values())
+        scored_hits = sum(c[1] for c in self.scored.values())
+        unscored_fetched = sum(c[0] for c in self.unscored.values())
+        unscored_hits = sum(c[1] for c in self.unscored.values())
+
+        if scored_fetched:
+            print(f"Keyword hit rate of scored links: {scored_hits / scored_fetched:.0%} ({scored_hits}/{scored_fetched})")
+        if unscored_fetched:
+            unscored_rate = unscored_hits / unscored_fetched
+            print(f"Keyword hit rate of unscored links: {unscored_rate:.0%} ({unscored_hits}/{unscored_fetched})")
+            # Dropped links are assumed to hit as often as the unscored links we did fetch
+            missed = dropped * unscored_rate
+            found = scored_hits + unscored_hits
+            if found + missed:
+                print(f"Fetches avoided: {dropped}, estimated keyword articles missed: {missed:.1f} "
+                      f"(recall lost {missed / (found + missed):.0%})")
+            if mode == "shadow" and found:
+                print(f"Share of keyword hits a prune would keep: {scored_hits / found:.0%}")
+        elif dropped:
+            print(f"Fetches avoided: {dropped} (no unscored links fetched, recall lost unknown)")
+
+
+stats = PrefilterStats()
+
+
+def plan_fetches(site_name, links, budget, mode=LINK_PREFILTER, explore=LINK_PREFILTER_EXPLORE):
+    """The up to budget URLs to check for a site, in fetch order"""
+    if mode == "off":
+        return [link.url for link in links[:budget]]
+
+    scores = {link.url: score_link(link) for link in links}
+    stats.scores.update(scores)
+    stats.candidates[site_name] += len(links)
+
+    if mode == "shadow":
+        return [link.url for link in links[:budget]]
+
+    # sorted() is stable, so links with equal scores stay in page order
+    ordered = sorted(links, key=lambda link: -scores[link.url])
+    if mode == "prune":
+        scored = [link for link in ordered if scores[link.url] > 0]
+        unscored = [link for link in ordered if scores[link.url] == 0]
+        ordered = scored + unscored[:explore]
+        # Fetches saved against checking the first budget links in page order
+        stats.dropped[site_name] += len(links[:budget]) - len(ordered[:budget])
+
+    print(f"Prefilter: {sum(1 for s in scores.values() if s > 0)} of {len(links)} {site_name} links have keyword signals")
+    return [link.url for link in ordered[:budget]]
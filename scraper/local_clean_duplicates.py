@@ -1,10 +1,53 @@
+"""
+Streaming duplicate removal for the quotes collection.
+
+Quotes are read in pages of PAGE_SIZE with a cursor, selecting only text and
+timestamp, so the collection is never held in memory. For every quote kept,
+only an 8-byte digest of its normalized text (and a 4-byte tag of its
+document ID) is remembered; a later quote with the same digest is a
+duplicate and is deleted. Deletes are committed in 500-write batches from
+DEDUPE_DELETE_WORKERS threads while the scan goes on.
+
+Progress is checkpointed to DEDUPE_CHECKPOINT_PATH (local or gs://) every
+CHECKPOINT_PAGES pages, after the deletes so far have been committed, so an
+interrupted run resumes where it stopped. After a completed run the digests
+are kept, and --since-last-run only scans quotes stored since that run
+started, comparing them against the saved digests. A saved digest may
+belong to a quote removed since (by reset_quotes, rekey_quotes or by hand),
+so there a duplicate is only deleted once the copy at its canonical ID
+(quote_text.canonical_id, whose first 8 bytes are the digest) is read back;
+otherwise it is kept in place of the old one.
+
+Usage:
+    python local_clean_duplicates.py                  # full scan (resumes an interrupted one)
+    python local_clean_duplicates.py --since-last-run # only quotes added since the last run
+    python local_clean_duplicates.py --restart --dry-run
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
 import os
+import time
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
 from google.cloud import firestore
 from dotenv import load_dotenv
-from config import QUOTES_COLLECTION
+from config import CLOCK_SKEW_SECONDS, QUOTES_COLLECTION, DEDUPE_CHECKPOINT_PATH, DEDUPE_DELETE_WORKERS
+from firestore_utils import existing_ids
+from quote_text import NORMALIZATION_VERSION, canonical_id, normalize_quote
+import url_filter
 
 load_dotenv()  # Load environment variables from .env file
 
+PAGE_SIZE = 500
+BATCH_LIMIT = 500
+CHECKPOINT_PAGES = 10
+
 # Initialize Firebase with explicit credentials for local testing
 def initialize_firestore():
     try:
@@ -16,65 +59,273 @@ def initialize_firestore():
         print(f"Error initializing Firebase: {e}")
         return None
 
-def remove_duplicates(db):
-    """Remove duplicate quotes from the database"""
-    quotes = {}
-    COLLECTION = QUOTES_COLLECTION
-    
-    # Get all quotes
-    print(f"Fetching all quotes from collection: {COLLECTION}")
-    all_quotes = db.collection(COLLECTION).get()
-    
-    # Count total quotes
-    total_quotes = len(list(all_quotes))
-    print(f"Found {total_quotes} total quotes")
-    
-    # Find duplicates
-    for doc in all_quotes:
-        quote_text = doc.get("text")
-        if quote_text not in quotes:
-            quotes[quote_text] = []
-        quotes[quote_text].append(doc.id)
-    
-    # Count duplicates
-    duplicate_texts = sum(1 for text, doc_ids in quotes.items() if len(doc_ids) > 1)
-    print(f"Found {duplicate_texts} quotes with duplicates")
-    
-    # Delete duplicates (keep the first one of each)
-    batch = db.batch()
-    deleted = 0
-    
-    for text, doc_ids in quotes.items():
-        if len(doc_ids) > 1:
-            print(f"Found {len(doc_ids)} duplicates for: {text[:30]}...")
-            # Skip the first one, delete the rest
-            for doc_id in doc_ids[1:]:
-                batch.delete(db.collection(COLLECTION).document(doc_id))
-                deleted += 1
-                
-                # Commit in batches of 500 (Firestore limit)
-                if deleted % 500 == 0:
-                    batch.commit()
-                    print(f"Committed batch of {deleted} deletes")
-                    batch = db.batch()
-    
-    # Commit any remaining deletes
-    if deleted % 500 != 0:
+
+def text_digest(text):
+    """First 8 bytes of the SHA-256 of the normalized text, as an int"""
+    return int.from_bytes(hashlib.sha256(normalize_quote(text).encode("utf-8")).digest()[:8], "big")
+
+
+def id_tag(doc_id):
+    return zlib.crc32(doc_id.encode("utf-8"))
+
+
+class DedupeState:
+    """Digests of kept quotes plus the scan cursor, saved between runs"""
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        # digest -> id_tag of the quote kept for it
+        self.kept = {}
+        # None when no scan is in progress
+        self.mode = None
+        self.cursor = None
+        self.started_at = None
+        self.since = None
+        self.last_completed = None
+        self.scanned = 0
+        self.deleted = 0
+
+    def to_bytes(self):
+        digests = array("Q", self.kept.keys())
+        tags = array("I", self.kept.values())
+        return gzip.compress(json.dumps({
+            "version": 1,
+            "normalization": NORMALIZATION_VERSION,
+            "collection": self.collection_name,
+            "mode": self.mode,
+            "cursor": self.cursor,
+            "started_at": self.started_at,
+            "since": self.since,
+            "last_completed": self.last_completed,
+            "scanned": self.scanned,
+            "deleted": self.deleted,
+            "digests": base64.b64encode(digests.tobytes()).decode("ascii"),
+            "tags": base64.b64encode(tags.tobytes()).decode("ascii"),
+        }).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data):
+        header = json.loads(gzip.decompress(data))
+        if "tags" not in header:
+            raise ValueError("checkpoint has no kept document tags")
+        if header.get("normalization", 1) != NORMALIZATION_VERSION:
+            raise ValueError("digests were made with an older quote normalization")
+        state = cls(header["collection"])
+        digests = array("Q")
+        digests.frombytes(base64.b64decode(header["digests"]))
+        tags = array("I")
+        tags.frombytes(base64.b64decode(header["tags"]))
+        state.kept = dict(zip(digests, tags))
+        for key in ("mode", "cursor", "started_at", "since", "last_completed", "scanned", "deleted"):
+            setattr(state, key, header.get(key))
+        return state
+
+
+def load_state(collection_name, path=DEDUPE_CHECKPOINT_PATH):
+    try:
+        data = url_filter.read_snapshot(path)
+        if data:
+            state = DedupeState.from_bytes(data)
+            if state.collection_name == collection_name:
+                return state
+            print(f"Checkpoint {path} is for {state.collection_name}, starting over")
+    except Exception as e:
+        print(f"Could not read dedupe checkpoint {path}, starting over: {e}")
+    return DedupeState(collection_name)
+
+
+def save_state(state, path=DEDUPE_CHECKPOINT_PATH):
+    url_filter.write_snapshot(path, state.to_bytes())
+
+
+def page_query(collection, state, last_snapshot):
+    """The next page of quotes after the cursor"""
+    if state.mode == "full":
+        query = collection.order_by("__name__")
+        if state.cursor:
+            query = query.where("__name__", ">", collection.document(state.cursor["id"]))
+    else:
+        query = collection.order_by("timestamp")
+        if last_snapshot is not None:
+            query = query.start_after(last_snapshot)
+        else:
+            # Resuming: quotes at the cursor's timestamp are read again, which is harmless
+            since = state.cursor["timestamp"] if state.cursor else state.since
+            query = query.where("timestamp", ">=", datetime.fromtimestamp(since, tz=timezone.utc))
+    return query.select(["text", "timestamp"]).limit(PAGE_SIZE)
+
+
+def confirmed_duplicates(db, collection, state, docs, candidates):
+    """The candidates whose text still has a copy stored under its canonical ID.
+
+    The saved digests only tag the kept quote, which may have been deleted
+    since; only the colliding digests of this page are read back. A
+    candidate that is itself the canonical copy, or has none, is kept in
+    place of the old quote.
+    """
+    page_ids = {doc.id for doc in docs}
+    canonical = {doc.id: canonical_id(text) for doc, _, text in candidates}
+    unread = sorted(set(canonical.values()) - page_ids)
+    stored = page_ids | existing_ids(db, [collection.document(doc_id) for doc_id in unread])
+    confirmed = []
+    for doc, digest, text in candidates:
+        if canonical[doc.id] != doc.id and canonical[doc.id] in stored:
+            confirmed.append((doc, digest, text))
+        else:
+            state.kept[digest] = id_tag(doc.id)
+    return confirmed
+
+
+class Deleter:
+    """Commits delete batches in parallel while the scan continues"""
+
+    def __init__(self, db, workers=DEDUPE_DELETE_WORKERS, dry_run=False):
+        self.db = db
+        self.dry_run = dry_run
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+        self.futures = []
+
+    def _commit(self, refs):
+        batch = self.db.batch()
+        for ref in refs:
+            batch.delete(ref)
         batch.commit()
-        
-    print(f"Removed {deleted} duplicate quotes")
+        return len(refs)
+
+    def delete(self, ref):
+        if self.dry_run:
+            return
+        self.pending.append(ref)
+        if len(self.pending) >= BATCH_LIMIT:
+            self.futures.append(self.executor.submit(self._commit, self.pending))
+            self.pending = []
+
+    def wait(self):
+        """Commits what is pending and waits for every batch; raises if any failed"""
+        if self.pending:
+            self.futures.append(self.executor.submit(self._commit, self.pending))
+            self.pending = []
+        futures, self.futures = self.futures, []
+        return sum(future.result() for future in futures)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def remove_duplicates(db, collection_name=None, since_last_run=False, restart=False, dry_run=False):
+    """Remove duplicate quotes from the database"""
+    collection_name = collection_name or QUOTES_COLLECTION
+    collection = db.collection(collection_name)
+    state = DedupeState(collection_name) if restart else load_state(collection_name)
+
+    if state.mode:
+        print(f"Resuming {state.mode} scan of {collection_name}: "
+              f"{state.scanned} scanned, {state.deleted} deleted so far")
+    else:
+        if since_last_run and state.last_completed:
+            state.mode = "since"
+            state.since = state.last_completed
+            print(f"Scanning quotes in {collection_name} stored since "
+                  f"{datetime.fromtimestamp(state.since, tz=timezone.utc):%Y-%m-%d %H:%M} UTC "
+                  f"against {len(state.kept)} saved digests")
+        else:
+            if since_last_run:
+                print("No completed run to continue from, doing a full scan")
+            state.mode = "full"
+            state.kept = {}
+            print(f"Scanning all quotes in {collection_name}")
+        state.cursor = None
+        state.scanned = 0
+        state.deleted = 0
+        state.started_at = time.time()
+
+    deleter = Deleter(db, dry_run=dry_run)
+    start = time.monotonic()
+    pages = 0
+    duplicates = 0
+    last_snapshot = None
+    try:
+        while True:
+            docs = list(page_query(collection, state, last_snapshot).stream())
+            if not docs:
+                break
+            candidates = []
+            for doc in docs:
+                text = doc.to_dict().get("text")
+                if not text:
+                    continue
+                digest = text_digest(text)
+                tag = id_tag(doc.id)
+                kept_tag = state.kept.get(digest)
+                if kept_tag is None:
+                    state.kept[digest] = tag
+                elif kept_tag != tag:
+                    candidates.append((doc, digest, text))
+
+            if state.mode == "since" and candidates:
+                candidates = confirmed_duplicates(db, collection, state, docs, candidates)
+            for doc, digest, text in candidates:
+                # Keep the first one, delete the rest
+                duplicates += 1
+                if duplicates <= 20:
+                    print(f"Duplicate: {text[:30]}...")
+                deleter.delete(doc.reference)
+            state.scanned += len(docs)
+            last = docs[-1]
+            timestamp = last.to_dict().get("timestamp")
+            state.cursor = {"id": last.id, "timestamp": timestamp.timestamp() if timestamp else None}
+            last_snapshot = last
+            pages += 1
+
+            if pages % CHECKPOINT_PAGES == 0:
+                state.deleted += deleter.wait()
+                if not dry_run:
+                    save_state(state)
+                print(f"Scanned {state.scanned} quotes ({state.scanned / (time.monotonic() - start):.0f}/sec), "
+                      f"{duplicates} duplicates found")
+            if len(docs) < PAGE_SIZE:
+                break
+
+        state.deleted += deleter.wait()
+        # The next --since-last-run starts where this scan started
+        state.last_completed = state.started_at - CLOCK_SKEW_SECONDS
+        state.mode = None
+        state.cursor = None
+        if not dry_run:
+            save_state(state)
+    finally:
+        deleter.close()
+
+    elapsed = time.monotonic() - start
+    print(f"Scanned {state.scanned} quotes in {elapsed:.1f}s "
+          f"({state.scanned / elapsed if elapsed else 0:.0f}/sec), {len(state.kept)} unique digests kept")
+    if dry_run:
+        print(f"Dry run: {duplicates} duplicate quotes would be removed")
+    else:
+        print(f"Removed {state.deleted} duplicate quotes")
+    return state.deleted
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Remove duplicate quotes from the quotes collection')
+    parser.add_argument('--collection', default=QUOTES_COLLECTION, help=f'Collection (default: {QUOTES_COLLECTION})')
+    parser.add_argument('--since-last-run', action='store_true',
+                        help='Only check quotes stored since the last completed run')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and scan everything')
+    parser.add_argument('--dry-run', action='store_true', help='Report duplicates without deleting them')
+    args = parser.parse_args()
+
     print("Starting duplicate removal process...")
-    
+
     # Authenticate with gcloud if needed
     os.system("gcloud auth application-default login")
-    
+
     # Initialize Firestore
     db = initialize_firestore()
-    
+
     if db:
-        remove_duplicates(db)
+        remove_duplicates(db, args.collection, args.since_last_run, args.restart, args.dry_run)
         print("Process completed successfully")
     else:
-        print("Failed to initialize Firestore. Cannot proceed.") 
\ No newline at end of file
+        print("Failed to initialize Firestore. Cannot proceed.")
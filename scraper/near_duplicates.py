@@ -0,0 +1,302 @@
+"""
+Near-duplicate quote index.
+
+Exact dedupe (quote_id of the normalized text) treats "the same quote,"
+and "The same quote" with curly marks, or a truncated fragment of it, as
+different quotes. This index finds them with MinHash locality-sensitive
+hashing over word-bigram shingles of a canonical form of the text:
+
+    - each quote gets a MinHash signature of NUM_PERM values
+    - the signature is cut into bands of BAND_ROWS values; quotes sharing
+      any band land in the same bucket and become candidates
+    - candidates are confirmed by their shingle overlap: the share of the
+      smaller quote's shingles found in the other (so a fragment matches
+      the full quote), or plain Jaccard for very short quotes; a new quote
+      much longer than a stored fragment is not its duplicate, so the fuller
+      version is still stored
+
+A lookup costs one signature and NUM_PERM / BAND_ROWS bucket probes, not a
+scan of every stored quote. With two rows per band, quotes at 0.3 overlap
+are still candidates 95% of the time; the threshold is applied on the
+exact overlap afterwards.
+
+With NEAR_DUPLICATE_CHECK=1 the quote sink skips any new quote at or above
+NEAR_DUPLICATE_THRESHOLD similarity to a stored one. A quote that passes is
+held in the index as pending, so a near-copy queued in the same run is
+caught too, and becomes permanent once the sink has written it. Pending
+entries are never saved. The index is snapshotted to
+NEAR_DUPLICATE_INDEX_PATH (local or gs://), and quotes stored since the
+snapshot are read from Firestore when it is loaded.
+"""
+import base64
+import gzip
+import json
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from datetime import datetime, timezone
+
+from firebase_init import db
+
+import config
+from config import CLOCK_SKEW_SECONDS, NEAR_DUPLICATE_CHECK, NEAR_DUPLICATE_INDEX_PATH, NEAR_DUPLICATE_THRESHOLD
+import url_filter
+
+NUM_PERM = 64
+BAND_ROWS = 2
+# Below this many shingles the overlap of a fragment says too little; use Jaccard
+MIN_OVERLAP_SHINGLES = 4
+# A new quote this many times longer than a stored fragment it contains is kept
+KEEP_LONGER_RATIO = 2
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# Fixed permutations, so signatures in a snapshot stay valid
+_PERMUTATIONS = [
+    (zlib.crc32(f"a{i}".encode()) * 2654435761 % MERSENNE_PRIME | 1,
+     zlib.crc32(f"b{i}".encode()) * 40503 % MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+WORD = re.compile(r"\w+")
+APOSTROPHES = re.compile(r"['’‘`]")
+
+
+def shingles(text):
+    """Word bigrams of the canonical text (single words for one-word quotes)"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    words = WORD.findall(APOSTROPHES.sub("", text))
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def signature(shingle_set):
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingle_set] or [0]
+    return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(first, second):
+    """Overlap of two shingle sets, relative to the smaller one"""
+    if not first or not second:
+        return 0.0
+    common = len(first & second)
+    smaller = min(len(first), len(second))
+    if smaller < MIN_OVERLAP_SHINGLES:
+        return common / len(first | second)
+    return common / smaller
+
+
+class NearDuplicateIndex:
+    def __init__(self, collection_name=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.collection_name = collection_name
+        self.threshold = threshold
+        self.ids = []
+        self.texts = []
+        self.signatures = array("I")
+        # doc_id -> position in ids
+        self.positions = {}
+        # Reserved by check_and_reserve but not yet written
+        self.pending = set()
+        # One dict per band: band values -> positions in ids
+        self.buckets = [{} for _ in range(NUM_PERM // BAND_ROWS)]
+        self.watermark = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _band_keys(self, values):
+        return [tuple(values[i:i + BAND_ROWS]) for i in range(0, NUM_PERM, BAND_ROWS)]
+
+    def _insert(self, doc_id, text, values):
+        position = len(self.ids)
+        self.ids.append(doc_id)
+        self.texts.append(text)
+        self.signatures.extend(values)
+        self.positions[doc_id] = position
+        for band, key in zip(self.buckets, self._band_keys(values)):
+            band.setdefault(key, []).append(position)
+
+    def _find(self, shingle_set, values):
+        candidates = set()
+        for band, key in zip(self.buckets, self._band_keys(values)):
+            candidates.update(band.get(key, ()))
+        best = None
+        for position in candidates:
+            doc_id, stored_text = self.ids[position], self.texts[position]
+            stored = shingles(stored_text)
+            if len(shingle_set) > KEEP_LONGER_RATIO * len(stored):
+                continue
+            score = similarity(shingle_set, stored)
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (doc_id, stored_text, score)
+        return best
+
+    def find(self, text):
+        """(doc_id, text, similarity) of the closest stored quote at or above the threshold, or None"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+        values = signature(shingle_set)
+        with self._lock:
+            return self._find(shingle_set, values)
+
+    def add(self, doc_id, text):
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return
+        values = signature(shingle_set)
+        with self._lock:
+            if doc_id not in self.positions:
+                self._insert(doc_id, text, values)
+            else:
+                self.pending.discard(doc_id)
+
+    def check_and_reserve(self, doc_id, text):
+        """Returns the near-duplicate (doc_id, text, similarity) of text, or adds it as pending and returns None"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+        values = signature(shingle_set)
+        # Held across the lookup and the insert so two copies added at once can't both pass
+        with self._lock:
+            match = self._find(shingle_set, values)
+            if match is None and doc_id not in self.positions:
+                self._insert(doc_id, text, values)
+                self.pending.add(doc_id)
+        return match
+
+    def confirm(self, doc_ids):
+        """Makes pending entries permanent once their quotes are written"""
+        with self._lock:
+            self.pending.difference_update(doc_ids)
+
+    def to_bytes(self):
+        with self._lock:
+            kept = [position for position in range(len(self.ids)) if self.ids[position] not in self.pending]
+            signatures = array("I")
+            for position in kept:
+                signatures.extend(self.signatures[position * NUM_PERM:(position + 1) * NUM_PERM])
+            header = {
+                "version": 1,
+                "num_perm": NUM_PERM,
+                "band_rows": BAND_ROWS,
+                "collection": self.collection_name,
+                "watermark": self.watermark,
+                "ids": [self.ids[position] for position in kept],
+                "texts": [self.texts[position] for position in kept],
+                "signatures": base64.b64encode(signatures.tobytes()).decode("ascii"),
+            }
+        return gzip.compress(json.dumps(header).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data, threshold=NEAR_DUPLICATE_THRESHOLD):
+        header = json.loads(gzip.decompress(data))
+        if header.get("num_perm") != NUM_PERM or header.get("band_rows") != BAND_ROWS:
+            raise ValueError("snapshot was built with different LSH settings")
+        index = cls(header.get("collection"), threshold)
+        signatures = array("I")
+        signatures.frombytes(base64.b64decode(header["signatures"]))
+        for position, (doc_id, text) in enumerate(zip(header["ids"], header["texts"])):
+            index._insert(doc_id, text, signatures[position * NUM_PERM:(position + 1) * NUM_PERM])
+        index.watermark = header.get("watermark")
+        return index
+
+
+class IndexStats:
+    def __init__(self):
+        self.loaded = 0
+        self.checked = 0
+        self.skipped = 0
+        self.examples = []
+        # check() runs in the sink's callers' threads
+        self._lock = threading.Lock()
+
+    def record_check(self, text, match):
+        with self._lock:
+            self.checked += 1
+            if match:
+                self.skipped += 1
+                if len(self.examples) < 5:
+                    self.examples.append((text, match[1], match[2]))
+
+    def report(self):
+        if _index is None:
+            return
+        print("\n=== Near-duplicate index ===")
+        print(f"  - Indexed quotes: {len(_index)} ({self.loaded} read from Firestore this run)")
+        print(f"  - New quotes checked: {self.checked}, skipped as near-duplicates: {self.skipped} "
+              f"(threshold {_index.threshold:g})")
+        for text, match_text, score in self.examples:
+            print(f"    {score:.2f}: {text[:60]!r} ~ {match_text[:60]!r}")
+
+
+stats = IndexStats()
+
+# Kept at module level so warm invocations reuse it
+_index = None
+
+
+def _catch_up(index, collection_name):
+    """Adds quotes stored since the index's watermark (the whole collection for a new index)"""
+    started = time.time()
+    query = db.collection(collection_name)
+    if index.watermark:
+        since = datetime.fromtimestamp(index.watermark, tz=timezone.utc)
+        query = query.where("timestamp", ">=", since)
+    for doc in query.select(["text"]).stream():
+        text = doc.to_dict().get("text")
+        if text:
+            index.add(doc.id, text)
+            stats.loaded += 1
+    index.watermark = started - CLOCK_SKEW_SECONDS
+
+
+def load_index():
+    """Prepares the index for a run. Returns None when it is disabled or unavailable."""
+    global _index
+    if not NEAR_DUPLICATE_CHECK:
+        return None
+    collection_name = config.QUOTES_COLLECTION
+    try:
+        if _index is None or _index.collection_name != collection_name:
+            data = url_filter.read_snapshot(NEAR_DUPLICATE_INDEX_PATH)
+            index = NearDuplicateIndex.from_bytes(data) if data else None
+            if index is None or index.collection_name != collection_name:
+                print(f"Building near-duplicate index from {collection_name}")
+                index = NearDuplicateIndex(collection_name)
+            _index = index
+        _index.threshold = NEAR_DUPLICATE_THRESHOLD
+        _catch_up(_index, collection_name)
+    except Exception as e:
+        print(f"Near-duplicate index unavailable, using exact dedupe only: {e}")
+        _index = None
+    return _index
+
+
+def save_index():
+    if _index is None:
+        return
+    try:
+        url_filter.write_snapshot(NEAR_DUPLICATE_INDEX_PATH, _index.to_bytes())
+    except Exception as e:
+        print(f"Could not save near-duplicate index {NEAR_DUPLICATE_INDEX_PATH}: {e}")
+
+
+def check(doc_id, text):
+    """The near-duplicate (doc_id, text, similarity) of a new quote, or None after reserving it"""
+    if _index is None:
+        return None
+    match = _index.check_and_reserve(doc_id, text)
+    stats.record_check(text, match)
+    return match
+
+
+def confirm(doc_ids):
+    """Called once the quotes are written"""
+    if _index is not None:
+        _index.confirm(doc_ids)
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+News sites crawled by the scraper.
+
+"extraction" holds CSS selectors for the article title, the body container and
+elements to strip from the body. They only need to be roughly right: if a
+profile matches nothing, article_parser falls back to the generic heuristic.
+
+"feeds" lists RSS/Atom feeds or news sitemaps used when DISCOVERY_MODE is
+"feeds" (see feed_discovery.py).
+"""
+
+NEWS_SITES = {
+    "BBC": {
+        "url": "https://www.bbc.com/",
+        "article_link_pattern": "/news/",
+        "base_url": "https://www.bbc.com",
+        "feeds": ["https://feeds.bbci.co.uk/news/world/rss.xml"],
+        # BBC articles have several formats:
+        # 1. /news/articles/c5ype8w6ynwo - main format
+        # 2. /news/world-europe-12345678 - regional format
+        # 3. /news/uk-12345678 - UK format
+        # 4. /news/technology-12345678 - topical format
+        "article_regex": r"/news/(articles/[a-z0-9]+|[a-z0-9\-]+)",
+        # Only BBC links are filtered by article_regex; the other regexes are reference only
+        "require_regex": True,
+        "extraction": {
+            "title": "h1",
+            "body": "article",
+            "strip": ["figure", "aside", "[data-component='links-block']", "[data-component='tag-list']"]
+        }
+    },
+    # "NPR": {
+    #     "url": "https://www.npr.org/sections/world/",
+    #     "article_link_pattern": "/sections/",
+    #     "base_url": "https://www.npr.org"
+    # },
+    "AP News": {
+        "url": "https://apnews.com/hub/world-news",
+        "article_link_pattern": "/article/",
+        "base_url": "https://apnews.com",
+        # AP News articles look like /article/israel-hamas-war-gaza-casualties-2024-xxx
+        "article_regex": r"/article/[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".RichTextStoryBody",
+            "strip": [".Advertisement", ".Enhancement", ".RelatedLinks"]
+        }
+    },
+    "The Guardian": {
+        "url": "https://www.theguardian.com/world",
+        "article_link_pattern": "/world/",
+        "base_url": "https://www.theguardian.com",
+        "feeds": ["https://www.theguardian.com/world/rss"],
+        # Guardian articles have year/month/day in the URL 
+        # Example: /world/2023/may/01/article-title
+        "article_regex": r"/world/\d{4}/[a-z]{3}/\d{2}/[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".article-body-commercial-selector",
+            "strip": ["aside", "figure", "gu-island"]
+        }
+    },
+    "Al Jazeera": {
+        "url": "https://www.aljazeera.com/news/",
+        "article_link_pattern": "/news/",
+        "base_url": "https://www.aljazeera.com",
+        "feeds": ["https://www.aljazeera.com/xml/rss/all.xml"],
+        # Al Jazeera articles typically have year/month/day in them
+        # Example: /news/2023/5/1/article-title
+        "article_regex": r"/news/\d{4}/\d{1,2}/\d{1,2}/[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".wysiwyg",
+            "strip": [".more-on", ".ad-container", "figure"]
+        }
+    },
+    # "Times of Israel": {
+    #     "url": "https://www.timesofisrael.com/",
+    #     "article_link_pattern": "/",
+    #     "base_url": "https://www.timesofisrael.com"
+    # },
+    "The Independent": {
+        "url": "https://www.independent.co.uk/news/world",
+        "article_link_pattern": "/news/world/",
+        "base_url": "https://www.independent.co.uk",
+        # The Independent articles include some kind of article ID
+        "article_regex": r"/news/world/[a-z0-9\-]+-[a-z0-9]+",
+        "extraction": {
+            "title": "h1",
+            "body": "[itemprop='articleBody']",
+            "strip": ["aside", "figure", ".inline-readmore"]
+        }
+    },
+    "France 24": {
+        "url": "https://www.france24.com/en/",
+        "article_link_pattern": "/en/",
+        "base_url": "https://www.france24.com",
+        "feeds": ["https://www.france24.com/en/rss"],
+        # France24 articles typically have dates or numbers in them
+        # Example: /en/middle-east/20230501-israel-strikes-gaza-after-rocket-fire
+        "article_regex": r"/en/[a-z0-9\-]+/\d{8}-[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".t-content__body",
+            "strip": [".m-em-image", ".o-self-promo", "aside"]
+        }
+    },
+    "Deutsche Welle": {
+        "url": "https://www.dw.com/en/middle-east/s-14207", 
+        "article_link_pattern": "/en/",
+        "base_url": "https://www.dw.com",
+        "feeds": ["https://rss.dw.com/rdf/rss-en-world"],
+        # Deutsche Welle articles have a specific format with an article ID at the end
+        # Example: /en/title-goes-here/a-12345678
+        "article_regex": r"/en/[a-z0-9\-]+/a-\d+",
+        "extraction": {
+            "title": "h1",
+            "body": ".rich-text",
+            "strip": ["figure", ".embed"]
+        }
+    },
+    "Jerusalem Post": {
+        "url": "https://www.jpost.com/",
+        "article_link_pattern": "/",
+        "base_url": "https://www.jpost.com",
+        # Jerusalem Post URLs typically include a specific article number
+        "article_regex": r"/[a-z\-]+/article-\d+",
+        "extraction": {
+            "title": "h1",
+            "body": "[itemprop='articleBody'], .article-inner-content",
+            "strip": ["aside", "figure", ".hide-for-premium"]
+        }
+    },
+    "The New Humanitarian": {
+        "url": "https://www.thenewhumanitarian.org/",
+        "article_link_pattern": "/",
+        "base_url": "https://www.thenewhumanitarian.org",
+        # The New Humanitarian articles usually have year/month/day
+        # Example: /news/2023/05/01/article-title
+        "article_regex": r"/news/\d{4}/\d{2}/\d{2}/[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".field--name-body",
+            "strip": ["aside", "figure"]
+        }
+    },
+    "Foreign Policy": {
+        "url": "https://foreignpolicy.com/",
+        "article_link_pattern": "/",
+        "base_url": "https://foreignpolicy.com",
+        "feeds": ["https://foreignpolicy.com/feed/"],
+        # Foreign Policy articles usually have year/month/day
+        # Example: /2023/05/01/article-title
+        "article_regex": r"/\d{4}/\d{2}/\d{2}/[a-z0-9\-]+",
+        "extraction": {
+            "title": "h1",
+            "body": ".content-ungated, .post-content-main",
+            "strip": [".fp_choose_placement_related_posts", "aside", "figure"]
+        }
+    }
+}
@@ -1,17 +1,14 @@
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from firebase_init import db
 from quote_extractor import QuoteExtractor
-import requests
-from google.cloud import firestore
-import hashlib
-import re
+import keyword_matcher
+import http_client
+import quote_store
 
 load_dotenv()
 
 # Constants
-COLLECTION_NAME = "quotes_v1"  
 NYT_API_KEY = os.getenv('NYT_API_KEY')
 if not NYT_API_KEY:
     raise ValueError("NYT_API_KEY not found in environment variables")
@@ -21,6 +18,7 @@ KEYWORDS = ["war", "fight", "fighting", "hostage", "hostages", "prisoner", "pris
 class NYTCollector:
     def __init__(self):
         self.quote_extractor = QuoteExtractor()
+        self.keyword_matcher = keyword_matcher.KeywordMatcher(KEYWORDS)
         self.base_url = "https://api.nytimes.com/svc/topstories/v2/world.json"
         
     def get_articles(self):
@@ -29,7 +27,7 @@ class NYTCollector:
                 'api-key': NYT_API_KEY
             }
             
-            response = requests.get(self.base_url, params=params)
+            response = http_client.get(self.base_url, params=params, headers=http_client.API_HEADERS)
             response.raise_for_status()
             
             articles = response.json().get('results', [])
@@ -48,13 +46,12 @@ class NYTCollector:
             content = (article.get('abstract', '') + ' ' + 
                       ''.join([m.get('caption', '') for m in article.get('multimedia', [])]))
             
-            content_lower = content.lower()
-            matches = {kw for kw in KEYWORDS if kw.lower() in content_lower}
+            matches, content_matches = keyword_matcher.text_keywords(content, self.keyword_matcher)
             
             if matches:
                 print(f"Found keywords {matches} in article: {title}")
                 
-                quotes = self.quote_extractor.extract_quotes(content)
+                quotes = keyword_matcher.quotes_near_keywords(self.quote_extractor, content, content_matches)
                 if quotes:
                     article_info = {
                         "url": url,
@@ -68,40 +65,9 @@ class NYTCollector:
             print(f"Error processing NYT article: {e}")
             return None, None
     
-    def normalize_quote(self, text):
-        text = text.lower().strip()
-        text = re.sub(r'\s+', ' ', text)
-        #text = re.sub(r'[^\w\s]', '', text)
-        return text
-
-    def quote_id(self, text):
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()
-
     def store_quotes(self, quotes, article_info):
-        batch = db.batch()
-        stored_count = 0
-
-        for quote in quotes:
-            norm_quote = self.normalize_quote(quote)
-            if not norm_quote:
-                continue
-            doc_id = self.quote_id(norm_quote)
-            quote_ref = db.collection(COLLECTION_NAME).document(doc_id)
-            if quote_ref.get().exists:
-                continue  # Already exists, skip
-            batch.set(quote_ref, {
-                "text": quote.strip(),
-                "article_url": article_info["url"],
-                "article_title": article_info["title"],
-                "source": "NYT",
-                "timestamp": firestore.SERVER_TIMESTAMP,
-                "score": None,
-                "processed": False
-            })
-            stored_count += 1
-
+        stored_count = quote_store.sink.add(quotes, article_info, "NYT", origin="api")
         if stored_count > 0:
-            batch.commit()
             print(f"Stored {stored_count} new quotes from: {article_info['title']}")
         
         return stored_count
@@ -116,7 +82,9 @@ class NYTCollector:
             if quotes and article_info:
                 quotes_processed += self.store_quotes(quotes, article_info)
                 
+        quote_store.sink.close()
         print(f"\nNYT collection completed. Processed {quotes_processed} new quotes.")
+        quote_store.stats.report()
         return quotes_processed
 
 def main():
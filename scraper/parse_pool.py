@@ -0,0 +1,84 @@
+"""
+Process pool for the CPU-bound part of the crawl.
+
+The crawl engine's network tasks only download article HTML. Title/content
+extraction, the keyword check and quote extraction run in worker processes so
+parsing can use more than one core. A fixed number of slots bounds how many
+pages can be in flight between fetching and parsing; when the workers fall
+behind, fetchers wait for a free slot before downloading more.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from config import PARSE_WORKERS, PARSE_QUEUE_SIZE
+import article_parser
+import keyword_matcher
+from quote_extractor import QuoteExtractor
+
+# Created lazily in each worker process
+_quote_extractor = None
+
+
+def extract_article(html, url, site_name):
+    """Worker entry point: parse the page, check keywords and extract quotes.
+
+    Returns {"article", "matched_terms", "quotes", "extraction_path", "parse_seconds"}.
+    """
+    global _quote_extractor
+    if _quote_extractor is None:
+        _quote_extractor = QuoteExtractor()
+
+    local_stats = article_parser.ParseStats()
+    article = article_parser.parse_article(html, url, site_name, parse_stats=local_stats)
+    result = {
+        "article": article,
+        "matched_terms": None,
+        "quotes": [],
+        "extraction_path": next(iter(local_stats.paths)),
+        "parse_seconds": local_stats.parse_seconds
+    }
+    if not article:
+        return result
+
+    matches, content_matches = keyword_matcher.article_keywords(article)
+    if matches:
+        result["matched_terms"] = list(matches)
+        result["quotes"] = keyword_matcher.quotes_near_keywords(_quote_extractor, article["content"], content_matches)
+    return result
+
+
+class ParsePipeline:
+    """Bounded hand-off from async fetchers to a pool of parser processes"""
+
+    def __init__(self, workers=PARSE_WORKERS, queue_size=PARSE_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+        # spawn, not fork: the parent has crawl threads running when the pool starts
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.slots = asyncio.Semaphore(self.queue_size)
+        self.waits = 0
+
+    async def acquire(self):
+        """Wait for a free slot before fetching a page"""
+        if self.slots.locked():
+            self.waits += 1
+        await self.slots.acquire()
+
+    def release(self):
+        self.slots.release()
+
+    async def extract(self, html, url, site_name):
+        future = self.executor.submit(extract_article, html, url, site_name)
+        result = await asyncio.wrap_future(future)
+        # Worker-side stats don't reach this process, so record them here
+        article_parser.stats.record(site_name, result["extraction_path"], result["parse_seconds"])
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        print(f"Parse pool: {self.workers} workers, {self.queue_size} slots, "
+              f"fetchers waited for a slot {self.waits} times")
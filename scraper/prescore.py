@@ -0,0 +1,294 @@
+"""
+Local pre-scorer in front of the fine-tuned scoring model.
+
+Two checks run on the CPU before a quote is sent to run_model.evaluate_quote:
+
+    rules   the fine_tune.py rubric gives 0 to any quote naming Trump or
+            another world leader, or a country or city such as Gaza, Israel
+            or Ukraine
+    model   a logistic regression over hashed word and character n-grams,
+            trained on the scored CSVs in this directory, that estimates the
+            chance the remote model scores the quote low (PRESCORE_LOW_SCORE
+            or less)
+
+With PRESCORE_MODE:
+
+    off     every quote goes to the remote model
+    shadow  every quote still goes to the remote model, and the pre-scorer's
+            verdicts are compared with the remote scores
+    gate    quotes hit by a rule, or rated low with at least
+            PRESCORE_CONFIDENCE, get score 0 without an API call
+
+The trained model is saved to PRESCORE_MODEL_PATH and retrained when missing.
+Run this module to evaluate the pre-scorer on held-out rows:
+
+    python prescore.py --evaluate
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import random
+import re
+import zlib
+
+from config import (
+    PRESCORE_CONFIDENCE,
+    PRESCORE_LOW_SCORE,
+    PRESCORE_MODE,
+    PRESCORE_MODEL_PATH,
+)
+from keyword_matcher import KeywordMatcher
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Names the rubric scores 0 on sight
+HARD_ZERO_TERMS = [
+    # World leaders
+    "trump", "biden", "putin", "zelensky", "zelenskyy", "netanyahu", "xi jinping",
+    "kim jong un", "macron", "starmer", "modi", "erdogan", "khamenei", "assad",
+    # Countries and cities
+    "gaza", "israel", "ukraine", "russia", "iran", "lebanon", "syria", "china",
+    "palestine", "america", "united states", "west bank", "rafah", "kyiv", "moscow",
+    "jerusalem", "tehran", "beijing", "beirut", "damascus", "washington",
+]
+
+HASH_BITS = 18
+WORD = re.compile(r"[a-z0-9']+")
+
+# Training settings
+EPOCHS = 30
+LEARNING_RATE = 0.5
+L2 = 1e-4
+HOLDOUT_SHARE = 0.2
+
+
+def features(text):
+    """Hashed, L2-normalized word 1-2 gram and character 4-gram counts"""
+    text = " ".join(text.lower().split())
+    words = WORD.findall(text)
+    tokens = [f"w:{w}" for w in words]
+    tokens += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {text} "
+    tokens += [f"c:{padded[i:i + 4]}" for i in range(len(padded) - 3)]
+    # Length says a lot about fragments like "cumulative impact"
+    tokens.append(f"len:{min(len(words), 30) // 3}")
+
+    mask = (1 << HASH_BITS) - 1
+    counts = {}
+    for token in tokens:
+        index = zlib.crc32(token.encode("utf-8")) & mask
+        counts[index] = counts.get(index, 0) + 1
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {index: value / norm for index, value in counts.items()}
+
+
+def sigmoid(z):
+    if z < -35:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def load_examples(paths=None):
+    """(quote, score) pairs from every CSV with a score.
+
+    training-examples-v0.csv has total_score; exports carry the remote score in
+    score (export_db.py) or a hand score in manual_score.
+    """
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(SCRAPER_DIR, "*.csv")))
+    examples = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = (row.get("quote") or row.get("text") or "").strip()
+                for column in ("total_score", "score", "manual_score"):
+                    value = (row.get(column) or "").strip()
+                    if value:
+                        break
+                if not text or not value:
+                    continue
+                try:
+                    examples.append((text, float(value)))
+                except ValueError:
+                    continue
+    return examples
+
+
+def is_held_out(text, share=HOLDOUT_SHARE):
+    """Stable train/held-out split on the quote text"""
+    return zlib.crc32(text.encode("utf-8")) % 1000 < share * 1000
+
+
+class PreScorer:
+    def __init__(self, weights=None, bias=0.0, low_score=PRESCORE_LOW_SCORE):
+        self.weights = weights or {}
+        self.bias = bias
+        self.low_score = low_score
+        self.rules = KeywordMatcher(HARD_ZERO_TERMS, inflect=False)
+
+    def train(self, examples, epochs=EPOCHS, learning_rate=LEARNING_RATE, l2=L2, seed=0):
+        """Fits P(remote score <= low_score) by stochastic gradient descent"""
+        data = [(features(text), 1.0 if score <= self.low_score else 0.0) for text, score in examples]
+        rng = random.Random(seed)
+        weights = {}
+        bias = 0.0
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for x, y in data:
+                z = bias + sum(weights.get(i, 0.0) * v for i, v in x.items())
+                gradient = sigmoid(z) - y
+                bias -= rate * gradient
+                for i, v in x.items():
+                    w = weights.get(i, 0.0)
+                    weights[i] = w - rate * (gradient * v + l2 * w)
+        self.weights = {i: w for i, w in weights.items() if abs(w) > 1e-6}
+        self.bias = bias
+        return self
+
+    def low_probability(self, text):
+        x = features(text)
+        return sigmoid(self.bias + sum(self.weights.get(i, 0.0) * v for i, v in x.items()))
+
+    def rule_hit(self, text):
+        """The first hard-zero term in text, or None"""
+        match = self.rules.search(text)
+        return match.keyword if match else None
+
+    def verdict(self, text, confidence=PRESCORE_CONFIDENCE):
+        """(reason, low_probability): reason is "rule:<term>", "model" or None to send to the API"""
+        term = self.rule_hit(text)
+        if term:
+            return f"rule:{term}", 1.0
+        probability = self.low_probability(text)
+        return ("model" if probability >= confidence else None), probability
+
+    def save(self, path=PRESCORE_MODEL_PATH):
+        state = {"hash_bits": HASH_BITS, "low_score": self.low_score, "bias": self.bias,
+                 "weights": {str(i): w for i, w in self.weights.items()}}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=PRESCORE_MODEL_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("hash_bits") != HASH_BITS or state.get("low_score") != PRESCORE_LOW_SCORE:
+            raise ValueError("saved model was trained with different settings")
+        return cls({int(i): w for i, w in state["weights"].items()}, state["bias"], state["low_score"])
+
+
+def load_prescorer(path=PRESCORE_MODEL_PATH):
+    """The saved pre-scorer, or a new one trained on the local CSVs"""
+    try:
+        return PreScorer.load(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Could not load pre-scorer {path}, retraining: {e}")
+    examples = load_examples()
+    scorer = PreScorer().train(examples)
+    print(f"Trained pre-scorer on {len(examples)} scored quotes")
+    try:
+        scorer.save(path)
+    except Exception as e:
+        print(f"Could not save pre-scorer {path}: {e}")
+    return scorer
+
+
+class PrescoreStats:
+    def __init__(self):
+        self.api_calls = 0
+        self.rule_skips = 0
+        self.model_skips = 0
+        # Shadow mode: pre-scorer verdicts against the remote scores
+        self.shadow_low = 0
+        self.shadow_low_agreed = 0
+        self.remote_low = 0
+
+    def record_skip(self, reason):
+        if reason.startswith("rule:"):
+            self.rule_skips += 1
+        else:
+            self.model_skips += 1
+
+    def record_shadow(self, reason, remote_score, low_score=PRESCORE_LOW_SCORE):
+        remote_low = remote_score <= low_score
+        self.remote_low += remote_low
+        if reason:
+            self.shadow_low += 1
+            self.shadow_low_agreed += remote_low
+
+    def report(self, mode=PRESCORE_MODE):
+        if mode == "off":
+            return
+        print(f"\n=== Pre-scorer ({mode}) ===")
+        skipped = self.rule_skips + self.model_skips
+        total = skipped + self.api_calls
+        if mode == "gate" and total:
+            print(f"API calls saved: {skipped} of {total} ({skipped / total:.0%}); "
+                  f"{self.rule_skips} by rubric rules, {self.model_skips} by the model")
+        if mode == "shadow":
+            print(f"Would have saved {self.shadow_low} of {self.api_calls} API calls")
+            if self.shadow_low:
+                print(f"Remote model agreed the quote was low on {self.shadow_low_agreed} of "
+                      f"{self.shadow_low} ({self.shadow_low_agreed / self.shadow_low:.0%})")
+            if self.remote_low:
+                print(f"Low remote scores caught: {self.shadow_low_agreed} of {self.remote_low}")
+
+
+stats = PrescoreStats()
+
+
+def evaluate(confidence=PRESCORE_CONFIDENCE, examples=None):
+    """Trains on the non-held-out rows and reports agreement on the held-out rows"""
+    examples = examples if examples is not None else load_examples()
+    train_rows = [e for e in examples if not is_held_out(e[0])]
+    held_out = [e for e in examples if is_held_out(e[0])]
+    if not held_out:
+        print("No held-out rows")
+        return
+    scorer = PreScorer().train(train_rows)
+    print(f"Trained on {len(train_rows)} rows, evaluating on {len(held_out)} held-out rows "
+          f"(low = score <= {scorer.low_score})")
+
+    low_total = sum(1 for _, score in held_out if score <= scorer.low_score)
+    verdicts = [(scorer.verdict(text, confidence), score) for text, score in held_out]
+    for label, prefix in (("rules", "rule:"), ("model", "model"), ("all", "")):
+        gated = [score for (reason, _), score in verdicts if reason and reason.startswith(prefix)]
+        agreed = sum(1 for score in gated if score <= scorer.low_score)
+        print(f"  {label:<6} gated {len(gated):>4} ({len(gated) / len(held_out):.0%} of calls saved), "
+              f"agreed low {agreed}/{len(gated)}"
+              f"{f' ({agreed / len(gated):.0%})' if gated else ''}, "
+              f"highest remote score gated {max(gated, default=0):.2f}")
+    caught = sum(1 for (reason, _), score in verdicts if reason and score <= scorer.low_score)
+    if low_total:
+        print(f"  Low quotes caught: {caught}/{low_total} ({caught / low_total:.0%})")
+
+    print("  Model threshold sweep (agreement / share gated):")
+    probabilities = [(scorer.low_probability(text), score) for text, score in held_out]
+    for threshold in (0.5, 0.6, 0.7, 0.8, 0.9, 0.95):
+        gated = [score for p, score in probabilities if p >= threshold]
+        agreed = sum(1 for score in gated if score <= scorer.low_score)
+        if gated:
+            print(f"    {threshold:.2f}: {agreed / len(gated):.0%} / {len(gated) / len(held_out):.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train or evaluate the local quote pre-scorer')
+    parser.add_argument('--evaluate', action='store_true', help='Report agreement on held-out rows')
+    parser.add_argument('--train', action='store_true', help=f'Retrain and save to {PRESCORE_MODEL_PATH}')
+    parser.add_argument('--confidence', type=float, default=PRESCORE_CONFIDENCE,
+                        help=f'Low-score probability needed to skip the API (default: {PRESCORE_CONFIDENCE})')
+    args = parser.parse_args()
+    if args.train:
+        examples = load_examples()
+        PreScorer().train(examples).save()
+        print(f"Trained pre-scorer on {len(examples)} scored quotes, saved to {PRESCORE_MODEL_PATH}")
+    if args.evaluate or not args.train:
+        evaluate(args.confidence)
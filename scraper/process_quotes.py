@@ -1,10 +1,18 @@
 from openai import OpenAI
 from dotenv import load_dotenv
-from config import QUOTES_COLLECTION, MODEL_ID
+from config import (
+    QUOTES_COLLECTION, MODEL_ID, PRESCORE_MODE, SCORE_CACHE,
+    SCORING_COMMIT_SIZE, SCORING_CONCURRENCY, SCORING_DEADLINE_SECONDS,
+)
 from firebase_init import db
-from run_model import evaluate_quote
+from quote_text import canonical_id, clean_quote
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, wait
+import crawl_budget
+import prescore
+import score_cache
+import scoring_engine
 import os
-import re
 import time
 
 load_dotenv()
@@ -12,73 +20,177 @@ client = OpenAI()
 
 COLLECTION_NAME = QUOTES_COLLECTION
 
-def clean_quote(quote):
-    quote = re.sub(r'^[\'""]|[\'""]$', '', quote)
-    quote = re.sub(r',$', '', quote)
-    quote = quote.strip()
-    return quote
-
-def process_quotes(batch_size=100):
-    """Process ALL unscored quotes in batches"""
-    total_processed = 0
-    
-    while True:  
+# Seconds a scored quote may wait for its commit
+COMMIT_SECONDS = 5
+
+
+def budget_site(quote_data):
+    """The crawled site a quote's score counts toward in the crawl budget, or None"""
+    # API collectors share site names with NEWS_SITES, and older quotes have no origin
+    return quote_data.get("source") if quote_data.get("origin") == "crawl" else None
+
+
+class ScoreWriter:
+    """Commits score updates in batches while scoring goes on"""
+
+    def __init__(self, commit_size=SCORING_COMMIT_SIZE):
+        self.commit_size = commit_size
+        self.pending = []
+        self.oldest = None
+        self.committed = 0
+        self.failed = 0
+
+    def add(self, reference, update, site):
+        if not self.pending:
+            self.oldest = time.monotonic()
+        self.pending.append((reference, update, site))
+        if len(self.pending) >= self.commit_size:
+            self.commit()
+
+    def commit_if_due(self):
+        if self.pending and time.monotonic() - self.oldest >= COMMIT_SECONDS:
+            self.commit()
+
+    def commit(self):
+        items, self.pending = self.pending, []
+        if not items:
+            return
+        batch = db.batch()
+        for reference, update, _ in items:
+            batch.update(reference, update)
         try:
-            quotes_ref = db.collection(QUOTES_COLLECTION)\
-                .where("processed", "==", False)\
-                .where("score", "==", None)\
-                .limit(batch_size)
-            
-            quotes = quotes_ref.get()
-            
-            if not quotes:
-                break
-                
-            batch = db.batch()
-            batch_processed = 0
-            
-            for doc in quotes:
+            batch.commit()
+        except Exception as e:
+            # These quotes stay unscored and are picked up by the next run
+            self.failed += len(items)
+            print(f"Error committing {len(items)} scores: {e}")
+            return
+        self.committed += len(items)
+        # Remote scores per crawled site, fed back into the crawl budget; pre-scorer
+        # zeros and API-collector quotes are added with no site
+        scores_by_source = defaultdict(list)
+        for _, update, site in items:
+            if site:
+                scores_by_source[site].append(update["score"])
+        crawl_budget.record_scores(scores_by_source)
+        print(f"\nCommitted {len(items)} scores. Total processed so far: {self.committed}")
+
+
+def next_page(batch_size, last_doc):
+    """The next unscored quotes after last_doc, so quotes that failed are not read again this run"""
+    query = db.collection(QUOTES_COLLECTION)\
+        .where("processed", "==", False)\
+        .where("score", "==", None)
+    if last_doc is not None:
+        query = query.start_after(last_doc)
+    return query.limit(batch_size).get()
+
+
+def process_quotes(batch_size=100, concurrency=SCORING_CONCURRENCY, deadline_seconds=SCORING_DEADLINE_SECONDS):
+    """Process ALL unscored quotes, scoring them concurrently"""
+    prescorer = prescore.load_prescorer() if PRESCORE_MODE != "off" else None
+    scorer = scoring_engine.Scorer(MODEL_ID, concurrency)
+    writer = ScoreWriter()
+    started = time.monotonic()
+    # future -> [(doc reference, budget site, cleaned text, pre-scorer reason)], one per copy of the quote
+    in_flight = {}
+    # canonical quote ID -> future, so copies of a quote being scored wait for that call (with SCORE_CACHE)
+    by_quote = {}
+    last_doc = None
+    exhausted = False
+
+    try:
+        while True:
+            # Read the next page while the current one is still being scored
+            if not exhausted and len(in_flight) < batch_size:
+                if deadline_seconds and time.monotonic() - started >= deadline_seconds:
+                    print(f"Scoring deadline of {deadline_seconds:g}s reached; the rest waits for the next run")
+                    exhausted = True
+                else:
+                    try:
+                        quotes = next_page(batch_size, last_doc)
+                    except Exception as e:
+                        print(f"Error reading unscored quotes: {e}")
+                        quotes = []
+                    exhausted = len(quotes) < batch_size
+                    for doc in quotes:
+                        last_doc = doc
+                        quote_data = doc.to_dict()
+                        quote_text = clean_quote(quote_data['text'])
+                        reason = prescorer.verdict(quote_text)[0] if prescorer else None
+                        if PRESCORE_MODE == "gate" and reason:
+                            # The rubric or the local model says this scores low; skip the API call
+                            prescore.stats.record_skip(reason)
+                            writer.add(doc.reference, {
+                                "text": quote_text,
+                                "score": 0.0,
+                                "processed": True,
+                                "score_source": "prescore",
+                                "prescore_reason": reason
+                            }, None)
+                            continue
+                        score = score_cache.get(quote_text, MODEL_ID)
+                        if score is not None:
+                            # Scored before, by this model and prompt
+                            if PRESCORE_MODE == "shadow":
+                                prescore.stats.record_shadow(reason, score)
+                            writer.add(doc.reference, {
+                                "text": quote_text,
+                                "score": score,
+                                "processed": True
+                            }, budget_site(quote_data))
+                            continue
+                        entry = (doc.reference, budget_site(quote_data), quote_text, reason)
+                        if SCORE_CACHE:
+                            key = canonical_id(quote_text)
+                            if key in by_quote:
+                                score_cache.stats.shared += 1
+                                in_flight[by_quote[key]].append(entry)
+                                continue
+                        future = scorer.submit(quote_text)
+                        if SCORE_CACHE:
+                            by_quote[key] = future
+                        in_flight[future] = [entry]
+
+            if not in_flight:
+                if exhausted:
+                    break
+                continue
+
+            done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                entries = in_flight.pop(future)
+                if SCORE_CACHE:
+                    by_quote.pop(canonical_id(entries[0][2]), None)
                 try:
-                    quote_data = doc.to_dict()
-                    quote_text = clean_quote(quote_data['text'])
-                    score = evaluate_quote(quote_text, MODEL_ID)
-                    
-                    if score is not None:
-                        batch.update(doc.reference, {
-                            "text": quote_text,
-                            "score": score,
-                            "processed": True
-                        })
-                        batch_processed += 1
-                        print(f"\nProcessed quote: {quote_text}")
-                        print(f"Score: {score}")
-                    else:
-                        print(f"Skipped quote (evaluate_quote returned None): {quote_text}")
-                    
-                    if batch_processed % 500 == 0:
-                        batch.commit()
-                        batch = db.batch()
-                        time.sleep(1)  
-                        
+                    score = future.result()
                 except Exception as e:
-                    print(f"Error processing quote: {quote_text if 'quote_text' in locals() else 'Unknown'}")
-                    print(f"Error details: {e}")
+                    print(f"Skipped quote (scoring failed: {e}): {entries[0][2]}")
                     continue
-            
-            if batch_processed % 500 != 0:
-                batch.commit()
-            
-            total_processed += batch_processed
-            print(f"\nBatch complete. Total processed so far: {total_processed}")
-            
-            time.sleep(2)
-            
-        except Exception as e:
-            print(f"Error in batch processing: {e}")
-            continue
-    
-    print(f"\nAll done! Total quotes processed: {total_processed}")
-    return total_processed
+                prescore.stats.api_calls += 1
+                score_cache.put(entries[0][2], MODEL_ID, score)
+                for reference, site, quote_text, reason in entries:
+                    if PRESCORE_MODE == "shadow":
+                        prescore.stats.record_shadow(reason, score)
+                    writer.add(reference, {
+                        "text": quote_text,
+                        "score": score,
+                        "processed": True
+                    }, site)
+                    print(f"\nProcessed quote: {quote_text}")
+                    print(f"Score: {score}")
+            writer.commit_if_due()
+    finally:
+        scorer.close()
+        writer.commit()
+
+    scoring_engine.stats.report(scorer.limit)
+    score_cache.stats.report()
+    prescore.stats.report()
+    if writer.failed:
+        print(f"{writer.failed} scores could not be committed")
+    print(f"\nAll done! Total quotes processed: {writer.committed}")
+    return writer.committed
 
 def main():
     return process_quotes()
@@ -0,0 +1,184 @@
+"""
+Batched access to the processed_urls collection.
+
+Candidate links for a site are checked with one multi-document read instead
+of a get() per link, and processed markers are buffered and written in
+batches when the site is finished.
+
+With PROCESSED_FILTER=1, a time-bucketed Bloom filter of processed URL hashes
+(url_filter.py) is kept in module memory across warm invocations and
+snapshotted between cold starts. Only links the filter reports as possibly
+processed are read from Firestore.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from firebase_init import db
+from google.cloud import firestore
+
+from config import CLOCK_SKEW_SECONDS, PROCESSED_FILTER, PROCESSED_FILTER_SNAPSHOT, PROCESSED_BUCKET_DAYS, PROCESSED_DAYS_THRESHOLD
+from firestore_utils import GET_ALL_CHUNK
+from url_utils import normalize_url, url_hash
+import url_filter
+
+COLLECTION = "processed_urls"
+
+# Writes per batch commit
+BATCH_LIMIT = 500
+
+
+class IndexStats:
+    """Firestore round trips made for processed_urls during a run"""
+
+    def __init__(self):
+        # Crawl workers check and mark links from threads
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.filter_negatives = 0
+        self.filter_false_positives = 0
+        self.filter_loaded = 0
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def report(self):
+        print("\n=== processed_urls round trips ===")
+        print(f"  - Links checked: {self.lookups} in {self.reads} multi-document reads")
+        if _filter is not None:
+            print(f"  - Skipped by URL filter: {self.filter_negatives}, "
+                  f"false positives: {self.filter_false_positives}")
+            print(f"  - Markers loaded into URL filter from Firestore: {self.filter_loaded}")
+        print(f"  - Markers written: {self.writes} in {self.commits} batch commits")
+
+
+stats = IndexStats()
+
+# Kept at module level so warm invocations reuse it
+_filter = None
+
+
+def _catch_up(bucketed):
+    """Adds markers written since the filter's watermark (all of the retention window for a new filter)"""
+    started = time.time()
+    since = bucketed.watermark or started - bucketed.retention_days * url_filter.DAY
+    query = db.collection(COLLECTION)\
+        .where("timestamp", ">=", datetime.fromtimestamp(since, tz=timezone.utc))\
+        .select(["timestamp"])
+    for doc in query.stream():
+        timestamp = doc.to_dict().get("timestamp")
+        bucketed.add(doc.id, timestamp.timestamp() if timestamp else None)
+        stats.increment("filter_loaded")
+    bucketed.watermark = max(since, started - CLOCK_SKEW_SECONDS)
+
+
+def load_filter():
+    """Prepares the URL filter for a run. Returns None when it is disabled or unavailable."""
+    global _filter
+    if not PROCESSED_FILTER:
+        return None
+    try:
+        if _filter is None:
+            data = url_filter.read_snapshot(PROCESSED_FILTER_SNAPSHOT)
+            bucketed = url_filter.BucketedFilter.from_bytes(data) if data else None
+            # A snapshot with other buckets or a shorter window can't answer for the current settings
+            if (bucketed is None or bucketed.bucket_days != PROCESSED_BUCKET_DAYS
+                    or bucketed.retention_days < PROCESSED_DAYS_THRESHOLD):
+                print("Building URL filter from processed_urls")
+                bucketed = url_filter.BucketedFilter()
+            bucketed.retention_days = PROCESSED_DAYS_THRESHOLD
+            _filter = bucketed
+        _catch_up(_filter)
+        _filter.expire()
+    except Exception as e:
+        print(f"URL filter unavailable, checking Firestore for every link: {e}")
+        _filter = None
+    return _filter
+
+
+def save_filter():
+    """Snapshots the URL filter so the next cold start can skip the rebuild"""
+    if _filter is None:
+        return
+    try:
+        url_filter.write_snapshot(PROCESSED_FILTER_SNAPSHOT, _filter.to_bytes())
+    except Exception as e:
+        print(f"Could not save URL filter snapshot {PROCESSED_FILTER_SNAPSHOT}: {e}")
+
+
+def marker(url, site_name):
+    return {
+        "url": url,
+        "normalized_url": normalize_url(url),
+        "site_name": site_name,
+        "timestamp": firestore.SERVER_TIMESTAMP
+    }
+
+
+def find_processed(urls, days_threshold=PROCESSED_DAYS_THRESHOLD):
+    """Returns the subset of urls marked as processed in the last days_threshold days"""
+    by_hash = {}
+    for url in urls:
+        by_hash.setdefault(url_hash(url), []).append(url)
+
+    hashes = list(by_hash)
+    use_filter = _filter is not None and _filter.covers(days_threshold)
+    if use_filter:
+        hashes = [h for h in hashes if _filter.might_contain(h, days_threshold)]
+        stats.increment("filter_negatives", len(by_hash) - len(hashes))
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days_threshold)
+    processed = set()
+    confirmed = 0
+    for start in range(0, len(hashes), GET_ALL_CHUNK):
+        refs = [db.collection(COLLECTION).document(h) for h in hashes[start:start + GET_ALL_CHUNK]]
+        for doc in db.get_all(refs, field_paths=["timestamp"]):
+            if not doc.exists:
+                continue
+            timestamp = doc.to_dict().get("timestamp")
+            if timestamp is None or timestamp >= cutoff:
+                processed.update(by_hash[doc.id])
+                confirmed += 1
+        stats.increment("reads")
+
+    if use_filter:
+        stats.increment("filter_false_positives", len(hashes) - confirmed)
+    stats.increment("lookups", len(urls))
+    return processed
+
+
+class MarkerBuffer:
+    """Collects processed markers and writes them with batch commits on flush()"""
+
+    def __init__(self):
+        self.pending = {}
+
+    def add(self, url, site_name):
+        self.pending[url_hash(url)] = marker(url, site_name)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def flush(self):
+        """Writes all buffered markers. Returns the number written."""
+        written = 0
+        while self.pending:
+            chunk = list(self.pending.items())[:BATCH_LIMIT]
+            batch = db.batch()
+            for doc_id, data in chunk:
+                batch.set(db.collection(COLLECTION).document(doc_id), data)
+            batch.commit()
+            stats.increment("commits")
+
+            # Only drop markers once they are committed
+            for doc_id, _ in chunk:
+                del self.pending[doc_id]
+                if _filter is not None:
+                    _filter.add(doc_id)
+            written += len(chunk)
+            stats.increment("writes", len(chunk))
+        return written
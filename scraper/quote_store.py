@@ -0,0 +1,327 @@
+"""
+Shared, buffered quote storage for every collector.
+
+The scraper, the concurrent crawl and the Guardian and NYT collectors all
+push quotes into one QuoteSink (sink). For each article the sink:
+
+    - normalizes the quotes and hashes them into document IDs
+    - drops quotes already seen earlier in the run, in memory
+    - checks the rest for existing documents with one multi-document read
+    - with NEAR_DUPLICATE_CHECK=1, drops near-duplicates of stored and
+      queued quotes (near_duplicates.py); a quote's own entry in that index
+      is kept only once it has been written
+    - queues the new ones and returns how many there were
+
+Queued quotes are written with create(), which never overwrites, once
+QUOTE_SINK_BATCH_SIZE are waiting or QUOTE_SINK_FLUSH_SECONDS have passed,
+and whenever flush() is called. Writes go through Firestore's BulkWriter,
+which commits batches in parallel. Without it, 500-write batches are
+committed from a small thread pool. A quote created by a concurrent
+pipeline run in the meantime is counted as a conflict, not overwritten.
+Quotes that still fail are queued again and flush() raises.
+
+Callers flush before marking URLs processed, so a URL is never marked while
+its quotes are still only in memory.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_init import db
+from google.api_core.exceptions import Conflict
+from google.cloud import firestore
+
+import config
+import firestore_utils
+from config import QUOTE_SINK_BATCH_SIZE, QUOTE_SINK_FLUSH_SECONDS, QUOTE_SINK_WRITERS
+import near_duplicates
+from quote_text import normalize_quote, quote_id
+
+# Writes per batch commit
+BATCH_LIMIT = 500
+
+# gRPC status code of a create() on an existing document
+ALREADY_EXISTS = 6
+
+
+def quote_document(quote, article_info, source, origin="crawl"):
+    return {
+        "text": quote.strip(),
+        "article_url": article_info["url"],
+        "article_title": article_info["title"],
+        "source": source,
+        # "crawl" for NEWS_SITES pages, "api" for the Guardian and NYT collectors
+        "origin": origin,
+        "timestamp": firestore.SERVER_TIMESTAMP,
+        "score": None,
+        "processed": False
+    }
+
+
+class StoreStats:
+    """Round trips, latency and throughput of the quote sink during a run"""
+
+    def __init__(self):
+        # Counters are also bumped from writer threads and BulkWriter callbacks
+        self._lock = threading.Lock()
+        self.articles = 0
+        self.checked = 0
+        self.run_duplicates = 0
+        self.near_duplicates = 0
+        self.queued = 0
+        self.reads = 0
+        self.add_seconds = []
+        self.flushes = 0
+        self.written = 0
+        self.conflicts = 0
+        self.errors = 0
+        self.flush_seconds = []
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def report(self):
+        if not self.articles:
+            return
+        print("\n=== Quote store ===")
+        print(f"  - Articles: {self.articles}, quotes checked: {self.checked}, "
+              f"duplicates within the run: {self.run_duplicates}, near-duplicates: {self.near_duplicates}, "
+              f"new quotes queued: {self.queued}")
+        add_seconds = sorted(self.add_seconds)
+        print(f"  - Per-article store latency: mean {sum(add_seconds) / len(add_seconds) * 1000:.0f} ms, "
+              f"p95 {percentile(add_seconds, 0.95) * 1000:.0f} ms ({self.reads} multi-document reads)")
+        if self.flushes:
+            flush_seconds = sorted(self.flush_seconds)
+            total = sum(flush_seconds)
+            print(f"  - Flushes: {self.flushes}, mean {total / self.flushes * 1000:.0f} ms, "
+                  f"p95 {percentile(flush_seconds, 0.95) * 1000:.0f} ms")
+            print(f"  - Written: {self.written} ({self.written / total if total else 0:.0f} writes/sec while flushing), "
+                  f"conflicts: {self.conflicts}, errors: {self.errors}")
+        near_duplicates.stats.report()
+
+
+def percentile(ordered, share):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+stats = StoreStats()
+
+
+def existing_ids(refs):
+    """IDs of the referenced documents that already exist"""
+    found = firestore_utils.existing_ids(db, refs)
+    stats.increment("reads", -(-len(refs) // firestore_utils.GET_ALL_CHUNK))
+    return found
+
+
+class QuoteSink:
+    def __init__(self, collection_name=None, batch_size=QUOTE_SINK_BATCH_SIZE,
+                 flush_seconds=QUOTE_SINK_FLUSH_SECONDS, writers=QUOTE_SINK_WRITERS):
+        # None follows config.QUOTES_COLLECTION, which main.py can change per request
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.writers = writers
+        self.pending = []
+        self.seen = set()
+        self.oldest_pending = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._stopped = threading.Event()
+        self._index_lock = threading.Lock()
+        self._index_loaded = False
+
+    def add(self, quotes, article_info, source, origin="crawl"):
+        """Queues an article's new quotes. Returns the number of new quotes."""
+        started = time.perf_counter()
+        self._load_index()
+        collection = db.collection(self.collection_name or config.QUOTES_COLLECTION)
+        docs = {}
+        with self._lock:
+            for quote in quotes:
+                norm_quote = normalize_quote(quote)
+                if not norm_quote:
+                    continue
+                doc_id = quote_id(norm_quote)
+                if doc_id in self.seen or doc_id in docs:
+                    stats.run_duplicates += 1
+                    continue
+                docs[doc_id] = quote_document(quote, article_info, source, origin)
+            # Claimed now so a concurrent add of the same quote doesn't check it too
+            self.seen.update(docs)
+
+        refs = {doc_id: collection.document(doc_id) for doc_id in docs}
+        try:
+            existing = existing_ids(list(refs.values())) if refs else set()
+        except Exception:
+            with self._lock:
+                self.seen.difference_update(docs)
+            raise
+        new = []
+        near = 0
+        for doc_id, data in docs.items():
+            if doc_id in existing:
+                continue
+            if near_duplicates.check(doc_id, data["text"]):
+                near += 1
+                continue
+            new.append((refs[doc_id], data))
+
+        with self._lock:
+            if new and not self.pending:
+                self.oldest_pending = time.monotonic()
+            self.pending.extend(new)
+            full = len(self.pending) >= self.batch_size
+            stats.articles += 1
+            stats.checked += len(quotes)
+            stats.queued += len(new)
+            stats.near_duplicates += near
+            stats.add_seconds.append(time.perf_counter() - started)
+        self._start_timer()
+        if full:
+            self.flush()
+        return len(new)
+
+    def _load_index(self):
+        """Loads the near-duplicate index once per run (a no-op when it is disabled)"""
+        if self._index_loaded:
+            return
+        with self._index_lock:
+            if not self._index_loaded:
+                near_duplicates.load_index()
+                self._index_loaded = True
+
+    def _start_timer(self):
+        if self.flush_seconds <= 0 or self._timer is not None:
+            return
+        self._timer = threading.Thread(target=self._flush_on_timer, name="quote-sink-flush", daemon=True)
+        self._timer.start()
+
+    def _flush_on_timer(self):
+        while not self._stopped.wait(self.flush_seconds / 2):
+            oldest = self.oldest_pending
+            if oldest is not None and time.monotonic() - oldest >= self.flush_seconds:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing quotes on timer: {e}")
+
+    def flush(self):
+        """Writes every queued quote. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                items = self.pending
+                self.pending = []
+                self.oldest_pending = None
+            if not items:
+                return 0
+            started = time.perf_counter()
+            try:
+                if hasattr(db, "bulk_writer"):
+                    written, failed = self._write_bulk(items)
+                else:
+                    written, failed = self._write_batches(items)
+            except Exception:
+                self._requeue(items)
+                stats.increment("errors")
+                raise
+            # Written, or created by another run: their near-duplicate entries can be kept
+            failed_ids = {reference.id for reference, _ in failed}
+            near_duplicates.confirm([reference.id for reference, _ in items if reference.id not in failed_ids])
+            if failed:
+                # Keep them for the next flush, and raise so the caller doesn't mark their URLs
+                self._requeue(failed)
+                stats.increment("errors")
+                raise RuntimeError(f"{len(failed)} of {len(items)} quotes could not be written")
+            stats.increment("flushes")
+            stats.increment("written", written)
+            stats.flush_seconds.append(time.perf_counter() - started)
+            return written
+
+    def _requeue(self, items):
+        with self._lock:
+            self.pending = items + self.pending
+            self.oldest_pending = self.oldest_pending or time.monotonic()
+
+    def _write_bulk(self, items):
+        """Returns (written, [(reference, data)] that failed for a reason other than a conflict)"""
+        # Callbacks run on BulkWriter threads
+        lock = threading.Lock()
+        outcome = {"written": 0, "failed": set()}
+
+        def on_result(reference, result, bulk_writer):
+            with lock:
+                outcome["written"] += 1
+
+        def on_error(failure, bulk_writer):
+            if failure.code == ALREADY_EXISTS:
+                stats.increment("conflicts")
+                return False
+            if failure.attempts < 3:
+                return True
+            print(f"Error writing quote: {failure.message}")
+            with lock:
+                outcome["failed"].add(failure.operation.reference.path)
+            return False
+
+        writer = db.bulk_writer()
+        writer.on_write_result(on_result)
+        writer.on_write_error(on_error)
+        for reference, data in items:
+            writer.create(reference, data)
+        writer.close()
+        failed = [(reference, data) for reference, data in items if reference.path in outcome["failed"]]
+        return outcome["written"], failed
+
+    def _commit_chunk(self, chunk):
+        """Commits one create-only batch, rechecking and dropping conflicts"""
+        while chunk:
+            batch = db.batch()
+            for reference, data in chunk:
+                batch.create(reference, data)
+            try:
+                batch.commit()
+                return len(chunk)
+            except Conflict:
+                # AlreadyExists: another run created some of these since the check
+                stats.increment("conflicts")
+                existing = existing_ids([reference for reference, _ in chunk])
+                if not existing:
+                    raise
+                chunk = [(reference, data) for reference, data in chunk if reference.id not in existing]
+        return 0
+
+    def _write_batches(self, items):
+        """Returns (written, [(reference, data)] of the batches that failed)"""
+        chunks = [items[i:i + BATCH_LIMIT] for i in range(0, len(items), BATCH_LIMIT)]
+        with ThreadPoolExecutor(max_workers=self.writers) as executor:
+            futures = [(chunk, executor.submit(self._commit_chunk, chunk)) for chunk in chunks]
+        written = 0
+        failed = []
+        for chunk, future in futures:
+            try:
+                written += future.result()
+            except Exception as e:
+                print(f"Error writing {len(chunk)} quotes: {e}")
+                failed.extend(chunk)
+        return written, failed
+
+    def close(self):
+        """Stops the flush timer, writes what is left and forgets the run's quotes"""
+        self._stopped.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self._stopped.clear()
+        written = self.flush()
+        with self._lock:
+            self.seen = set()
+        if self._index_loaded:
+            near_duplicates.save_index()
+            self._index_loaded = False
+        return written
+
+
+sink = QuoteSink()
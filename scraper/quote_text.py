@@ -0,0 +1,53 @@
+"""
+Quote text normalization shared by storage, scoring and dedupe.
+
+Quote document IDs are the hash of normalize_quote(text), so every place
+that derives or compares IDs must use these functions. normalize_quote
+applies Unicode NFKC, maps curly and angled quote marks and dash variants to
+their ASCII forms, lowercases, collapses whitespace and trims quote marks
+and punctuation from both ends. clean_quote, which process_quotes applies
+to the stored text, only trims things normalize_quote trims too, so a
+document's ID still matches the hash of its cleaned text.
+"""
+import hashlib
+import re
+import unicodedata
+
+# Bumped whenever normalize_quote changes, so saved digests and IDs are rebuilt
+NORMALIZATION_VERSION = 2
+
+# Compiled once at import
+QUOTE_CHARS = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'", "`": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"', "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+})
+WHITESPACE = re.compile(r"\s+")
+EDGE_PUNCTUATION = re.compile(r"^[\s\"'.,;:\-]+|[\s\"'.,;:\-]+$")
+# What clean_quote trims: quote marks at either end and a trailing comma
+EDGE_QUOTES = re.compile(r"^[\"'“”‘’]+|[\"'“”‘’]+$")
+TRAILING_COMMA = re.compile(r",$")
+
+
+def normalize_quote(text):
+    """Canonical form of a quote, used for IDs and duplicate lookups"""
+    text = unicodedata.normalize("NFKC", text).translate(QUOTE_CHARS).lower()
+    text = WHITESPACE.sub(" ", text)
+    return EDGE_PUNCTUATION.sub("", text)
+
+
+def quote_id(text):
+    #using hash to avoid long document IDs
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def canonical_id(text):
+    """Document ID of a quote's text"""
+    return quote_id(normalize_quote(text))
+
+
+def clean_quote(quote):
+    """Display text: quote marks at the ends and a trailing comma removed"""
+    quote = EDGE_QUOTES.sub("", quote.strip())
+    quote = TRAILING_COMMA.sub("", quote)
+    return quote.strip()
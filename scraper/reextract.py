@@ -0,0 +1,128 @@
+"""
+Replays archived article pages through the current extraction code.
+
+Reads the HTML archive written when HTML_ARCHIVE_DIR is set and runs every
+archived article through article_parser, the keyword check and
+QuoteExtractor in a process pool, without any network access. Results can be
+written to a JSONL file and, optionally, stored in the quotes collection.
+"""
+import argparse
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config import HTML_ARCHIVE_DIR
+from article_stream import content_type_encoding
+from html_archive import HtmlArchive
+from parse_pool import extract_article
+
+# Pages submitted ahead per worker; executor.map would read the whole archive up front
+WINDOW_PER_WORKER = 4
+
+
+def iter_archived_articles(archive, site_name=None, latest_only=True):
+    """Yields (entry, html) for archived articles"""
+    entries = [entry for entry in archive.index(kind="article") if entry["status"] == 200]
+    if site_name:
+        entries = [entry for entry in entries if entry["site_name"] == site_name]
+    if latest_only:
+        latest = {}
+        for entry in entries:
+            latest[entry["url_hash"]] = entry
+        entries = list(latest.values())
+
+    for entry in entries:
+        headers, body = archive.read(entry)
+        encoding = content_type_encoding(headers.get("Content-Type", ""))
+        yield entry, body.decode(encoding, errors="replace")
+
+
+def _extract(entry, html):
+    return entry, extract_article(html, entry["url"], entry["site_name"])
+
+
+def extract_pages(executor, pages, window):
+    """Yields (entry, result) in archive order, with at most window pages decoded or in flight"""
+    pending = deque()
+    for entry, html in pages:
+        pending.append(executor.submit(_extract, entry, html))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def reextract(archive_dir=HTML_ARCHIVE_DIR, site_name=None, workers=4, output=None, store=False):
+    archive = HtmlArchive(archive_dir)
+    start = time.monotonic()
+    articles = 0
+    parsed = 0
+    matched = 0
+    quote_count = 0
+    stored = 0
+    out = open(output, "w", encoding="utf-8") if output else None
+
+    if store:
+        # Only needed when writing back to Firestore
+        from scraper import store_quotes
+        import quote_store
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pages = iter_archived_articles(archive, site_name)
+            for entry, result in extract_pages(executor, pages, workers * WINDOW_PER_WORKER):
+                articles += 1
+                article = result["article"]
+                if not article:
+                    continue
+                parsed += 1
+                if not result["matched_terms"]:
+                    continue
+                matched += 1
+                quote_count += len(result["quotes"])
+
+                if out:
+                    out.write(json.dumps({
+                        "url": entry["url"],
+                        "site_name": entry["site_name"],
+                        "fetched_at": entry["fetched_at"],
+                        "title": article["title"],
+                        "extraction_path": result["extraction_path"],
+                        "matched_terms": result["matched_terms"],
+                        "quotes": result["quotes"]
+                    }) + "\n")
+
+                if store and result["quotes"]:
+                    article_info = {"url": article["url"], "title": article["title"]}
+                    stored += store_quotes(result["quotes"], article_info, entry["site_name"])
+    finally:
+        if out:
+            out.close()
+        if store:
+            quote_store.sink.close()
+
+    elapsed = time.monotonic() - start
+    print(f"\nRe-extracted {articles} archived articles in {elapsed:.1f}s "
+          f"({articles / elapsed if elapsed else 0:.1f} pages/sec)")
+    print(f"  - Parsed: {parsed}")
+    print(f"  - Matched keywords: {matched}")
+    print(f"  - Quotes extracted: {quote_count}")
+    if store:
+        print(f"  - New quotes stored: {stored}")
+    return quote_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-run extraction over the HTML archive')
+    parser.add_argument('--archive-dir', default=HTML_ARCHIVE_DIR,
+                        help='Archive directory (default: HTML_ARCHIVE_DIR)')
+    parser.add_argument('--site', default=None, help='Only re-extract one site')
+    parser.add_argument('--workers', type=int, default=4, help='Parser processes (default: 4)')
+    parser.add_argument('--output', default=None, help='Write extracted quotes to this JSONL file')
+    parser.add_argument('--store', action='store_true', help='Store new quotes in the quotes collection')
+    args = parser.parse_args()
+
+    if not args.archive_dir:
+        parser.error("--archive-dir is required when HTML_ARCHIVE_DIR is not set")
+    reextract(args.archive_dir, args.site, args.workers, args.output, args.store)
@@ -0,0 +1,182 @@
+"""
+Re-keys a quotes collection to the canonical document IDs of quote_text.
+
+Quotes stored before the canonical normalization (or whose text was later
+rewritten by process_quotes) sit under IDs that no longer match the hash of
+their text, so the exact-duplicate check misses them. This tool pages
+through the collection, and for each quote whose ID differs from
+canonical_id(text) it creates the document under the new ID and deletes the
+old one in the same batch. When the new ID is already taken, by a quote
+already at its canonical ID or by an earlier move in this run, the old
+document is a duplicate and is only deleted.
+
+Batches of up to 500 writes are committed from --workers threads while the
+scan goes on. display_queue entries pointing at moved quotes get their
+source_id updated at the end.
+
+Usage:
+    python rekey_quotes.py [--collection quotes_v7] [--workers 8] [--dry-run]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core.exceptions import Conflict
+from google.cloud import firestore
+from dotenv import load_dotenv
+from config import QUOTES_COLLECTION
+from firestore_utils import existing_ids
+from quote_text import canonical_id
+
+load_dotenv()
+
+PAGE_SIZE = 500
+BATCH_LIMIT = 500
+DISPLAY_QUEUE = "display_queue"
+
+
+class RekeyStats:
+    def __init__(self):
+        self.scanned = 0
+        self.canonical = 0
+        self.moved = 0
+        self.merged = 0
+        self.conflicts = 0
+        self.queue_updated = 0
+
+
+stats = RekeyStats()
+
+
+def commit_chunk(db, collection, moves, deletes):
+    """Commits moves ((old_ref, new_id, data)) and deletes; a taken target turns a move into a delete"""
+    taken = existing_ids(db, [collection.document(new_id) for _, new_id, _ in moves])
+    deletes = deletes + [old_ref for old_ref, new_id, _ in moves if new_id in taken]
+    moves = [move for move in moves if move[1] not in taken]
+    while moves or deletes:
+        batch = db.batch()
+        for old_ref, new_id, data in moves:
+            batch.create(collection.document(new_id), data)
+            batch.delete(old_ref)
+        for ref in deletes:
+            batch.delete(ref)
+        try:
+            batch.commit()
+            return len(moves), len(deletes)
+        except Conflict:
+            # A target was created since the check, by the pipeline or another run
+            stats.conflicts += 1
+            taken = existing_ids(db, [collection.document(new_id) for _, new_id, _ in moves])
+            if not taken:
+                raise
+            deletes = deletes + [old_ref for old_ref, new_id, _ in moves if new_id in taken]
+            moves = [move for move in moves if move[1] not in taken]
+    return 0, 0
+
+
+def rekey_collection(db, collection_name=None, workers=8, dry_run=False):
+    collection_name = collection_name or QUOTES_COLLECTION
+    collection = db.collection(collection_name)
+    start = time.monotonic()
+    # New IDs created in this run, so two old copies of a quote don't both move
+    claimed = set()
+    # Old ID -> new ID, for the display queue
+    moved_ids = {}
+    futures = []
+    moves = []
+    deletes = []
+    cursor = None
+
+    def submit():
+        nonlocal moves, deletes
+        if (moves or deletes) and not dry_run:
+            futures.append(executor.submit(commit_chunk, db, collection, moves, deletes))
+        moves, deletes = [], []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            query = collection.order_by("__name__").limit(PAGE_SIZE)
+            if cursor:
+                query = query.where("__name__", ">", collection.document(cursor))
+            docs = list(query.stream())
+            if not docs:
+                break
+            for doc in docs:
+                stats.scanned += 1
+                data = doc.to_dict()
+                text = data.get("text")
+                if not text:
+                    continue
+                new_id = canonical_id(text)
+                if new_id == doc.id:
+                    # Quotes moved here earlier in this run are not counted again
+                    if new_id not in claimed:
+                        stats.canonical += 1
+                    continue
+                if new_id in claimed:
+                    deletes.append(doc.reference)
+                else:
+                    claimed.add(new_id)
+                    moves.append((doc.reference, new_id, data))
+                moved_ids[doc.id] = new_id
+                if 2 * len(moves) + len(deletes) >= BATCH_LIMIT - 1:
+                    submit()
+            cursor = docs[-1].id
+            print(f"Scanned {stats.scanned} quotes ({stats.scanned / (time.monotonic() - start):.0f}/sec), "
+                  f"{len(moved_ids)} to re-key")
+            if len(docs) < PAGE_SIZE:
+                break
+        submit()
+        for future in futures:
+            moved, merged = future.result()
+            stats.moved += moved
+            stats.merged += merged
+
+    if moved_ids and not dry_run:
+        update_display_queue(db, moved_ids)
+
+    elapsed = time.monotonic() - start
+    print(f"\nScanned {stats.scanned} quotes in {elapsed:.1f}s ({stats.scanned / elapsed if elapsed else 0:.0f}/sec)")
+    print(f"  - Already canonical: {stats.canonical}")
+    if dry_run:
+        print(f"  - Would re-key: {len(moved_ids)} ({len(moved_ids) - len(claimed)} of them duplicates)")
+        return 0
+    print(f"  - Moved to canonical IDs: {stats.moved}")
+    print(f"  - Deleted as duplicates of a canonical quote: {stats.merged}")
+    print(f"  - Batch conflicts retried: {stats.conflicts}")
+    print(f"  - Display queue entries updated: {stats.queue_updated}")
+    return stats.moved
+
+
+def update_display_queue(db, moved_ids):
+    """Points display_queue entries at the new IDs of moved quotes"""
+    batch = db.batch()
+    pending = 0
+    for doc in db.collection(DISPLAY_QUEUE).select(["source_id"]).stream():
+        new_id = moved_ids.get(doc.to_dict().get("source_id"))
+        if not new_id:
+            continue
+        batch.update(doc.reference, {"source_id": new_id})
+        pending += 1
+        stats.queue_updated += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-key quotes to canonical document IDs')
+    parser.add_argument('--collection', default=QUOTES_COLLECTION, help=f'Collection (default: {QUOTES_COLLECTION})')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel batch commits (default: 8)')
+    parser.add_argument('--dry-run', action='store_true', help='Count the quotes to re-key without writing')
+    args = parser.parse_args()
+
+    # Authenticate with gcloud if needed
+    os.system("gcloud auth application-default login")
+
+    db = firestore.Client(project="sonder-2813")
+    rekey_collection(db, args.collection, args.workers, args.dry_run)
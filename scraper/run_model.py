@@ -6,16 +6,27 @@ import os
 load_dotenv()
 client=OpenAI()
 
+SYSTEM_PROMPT = "You evaluate quotes based on emotional weight (0-2), interpretative space (0-2), and memorability (0-2). Calculate score as (sum of scores)/6. Return ONLY the final score as a number between 0 and 1, with no explanation."
+
+
+def messages_for(quote):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Evaluate this quote: '{quote}'"}
+    ]
+
+
+def request_score(quote, model_id, max_retries=None):
+    """Scores a quote and returns (score, response headers); API and parse errors are raised"""
+    api = client if max_retries is None else client.with_options(max_retries=max_retries)
+    raw = api.chat.completions.with_raw_response.create(model=model_id, messages=messages_for(quote))
+    response = raw.parse()
+    return float(response.choices[0].message.content), raw.headers
+
+
 def evaluate_quote(quote, model_id):
     try:
-        response = client.chat.completions.create(
-            model=model_id,
-            messages=[
-                {"role": "system", "content": "You evaluate quotes based on emotional weight (0-2), interpretative space (0-2), and memorability (0-2). Calculate score as (sum of scores)/6. Return ONLY the final score as a number between 0 and 1, with no explanation."},
-                {"role": "user", "content": f"Evaluate this quote: '{quote}'"}
-            ]
-        )
-        score = float(response.choices[0].message.content)
+        score = request_score(quote, model_id)[0]
         return score
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,147 @@
+"""
+Cache of remote quote scores.
+
+A score is keyed by the canonical_id of the quote, the model ID and a hash
+of run_model.SYSTEM_PROMPT. The same quote text stored again, in another
+run or another collection, reuses its score. A new model or prompt starts
+from an empty cache.
+
+Lookups go to an in-process LRU of SCORE_CACHE_LRU_SIZE entries first and
+then to a SQLite file at SCORE_CACHE_PATH, which outlives the process. With
+SCORE_CACHE=0 (the default) nothing is looked up or stored, and
+process_quotes scores every copy of a quote separately.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import SCORE_CACHE, SCORE_CACHE_LRU_SIZE, SCORE_CACHE_PATH
+from quote_text import canonical_id
+from run_model import SYSTEM_PROMPT
+
+PROMPT_HASH = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    quote_id TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    score REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (quote_id, model_id, prompt_hash)
+) WITHOUT ROWID
+"""
+
+
+def cache_key(quote, model_id, prompt_hash=PROMPT_HASH):
+    return (canonical_id(quote), model_id, prompt_hash)
+
+
+class CacheStats:
+    def __init__(self):
+        self.lookups = 0
+        self.lru_hits = 0
+        self.store_hits = 0
+        self.stored = 0
+        # Copies of a quote that waited for the call already scoring it
+        self.shared = 0
+
+    def report(self):
+        if not self.lookups and not self.shared:
+            return
+        hits = self.lru_hits + self.store_hits
+        avoided = hits + self.shared
+        print("\n=== Score cache ===")
+        if self.lookups:
+            print(f"  - Lookups: {self.lookups}, hits: {hits} ({hits / self.lookups:.0%}; "
+                  f"{self.lru_hits} in memory, {self.store_hits} from {SCORE_CACHE_PATH})")
+        print(f"  - API calls avoided: {avoided} ({self.shared} by copies sharing a call), "
+              f"new scores cached: {self.stored}")
+
+
+stats = CacheStats()
+
+
+class ScoreCache:
+    def __init__(self, path=SCORE_CACHE_PATH, lru_size=SCORE_CACHE_LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._unavailable = False
+
+    def _store(self):
+        """The SQLite connection, opened on first use; None if the file can't be used"""
+        if self._connection is None and not self._unavailable:
+            try:
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.execute(SCHEMA)
+                self._connection = connection
+            except sqlite3.Error as e:
+                print(f"Score cache {self.path} unavailable, caching in memory only: {e}")
+                self._unavailable = True
+        return self._connection
+
+    def _remember(self, key, score):
+        self.lru[key] = score
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            stats.lookups += 1
+            score = self.lru.get(key)
+            if score is not None:
+                self.lru.move_to_end(key)
+                stats.lru_hits += 1
+                return score
+            store = self._store()
+            if store is None:
+                return None
+            try:
+                row = store.execute(
+                    "SELECT score FROM scores WHERE quote_id = ? AND model_id = ? AND prompt_hash = ?", key
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Error reading score cache: {e}")
+                return None
+            if row is None:
+                return None
+            stats.store_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, score):
+        with self._lock:
+            self._remember(key, score)
+            stats.stored += 1
+            store = self._store()
+            if store is None:
+                return
+            try:
+                with store:
+                    store.execute("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                                  key + (score, time.time()))
+            except sqlite3.Error as e:
+                print(f"Error writing score cache: {e}")
+
+
+cache = ScoreCache()
+
+
+def get(quote, model_id):
+    """The cached score of a quote for this model and prompt, or None"""
+    if not SCORE_CACHE:
+        return None
+    return cache.get(cache_key(quote, model_id))
+
+
+def put(quote, model_id, score):
+    if SCORE_CACHE and score is not None:
+        cache.put(cache_key(quote, model_id), score)
@@ -0,0 +1,292 @@
+"""
+Concurrent, rate-limit-aware quote scoring for process_quotes.
+
+Quotes are scored from a thread pool instead of one blocking request at a
+time. Three things keep the pool inside the OpenAI limits:
+
+    - token buckets for requests and tokens per minute, refilled at the
+      rate the API reports in its x-ratelimit-* headers and trimmed to the
+      remaining counts it reports after each response
+    - an adaptive concurrency limit that halves on a 429 and grows by one
+      after ADAPT_SUCCESSES successful calls, up to SCORING_CONCURRENCY
+    - 429s and transient errors are retried up to SCORING_MAX_RETRIES times,
+      after the delay the API asks for or an exponential backoff
+
+Scorer.submit returns a future per quote, so the caller can handle (and
+commit) results as they complete.
+"""
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from config import (
+    SCORING_CONCURRENCY,
+    SCORING_MAX_RETRIES,
+    SCORING_REQUESTS_PER_MINUTE,
+    SCORING_TOKENS_PER_MINUTE,
+)
+from run_model import SYSTEM_PROMPT, request_score
+
+# Successful calls before the concurrency limit grows by one again
+ADAPT_SUCCESSES = 20
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# Token estimate for the bucket: about 4 characters a token, plus message overhead and the reply
+CHARS_PER_TOKEN = 4
+REQUEST_OVERHEAD_TOKENS = 20
+
+RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+             openai.InternalServerError)
+
+# x-ratelimit-reset-* values look like "1s", "6m0s" or "20ms"
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Seconds in a rate-limit reset header, or None"""
+    if not value:
+        return None
+    parts = DURATION.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def int_header(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(headers):
+    """The wait the API asks for after a 429, from retry-after or the exhausted limit's reset"""
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+    delay = parse_duration(headers.get("retry-after"))
+    if delay:
+        return delay
+    resets = [parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+              for kind in ("requests", "tokens")
+              if int_header(headers, f"x-ratelimit-remaining-{kind}") == 0]
+    resets = [reset for reset in resets if reset]
+    return max(resets) if resets else None
+
+
+def estimate_tokens(quote):
+    return (len(SYSTEM_PROMPT) + len(quote)) // CHARS_PER_TOKEN + REQUEST_OVERHEAD_TOKENS
+
+
+class TokenBucket:
+    """A per-minute budget, refilled continuously"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Takes amount, waiting for it if needed. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                amount = min(amount, self.capacity)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def sync(self, limit, remaining):
+        """Adopts the limit and remaining count from a response's headers"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self.capacity = float(limit)
+                self.rate = limit / 60.0
+            if remaining is not None:
+                # Requests still in flight are not in the API's count yet, so never raise it
+                self.tokens = min(self.tokens, float(remaining))
+
+    def pause(self, seconds):
+        """Empties the bucket so nothing more is taken for about seconds"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AdaptiveLimit:
+    """Concurrency limit that halves on a 429 and grows back after successes"""
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+        self.limit = maximum
+        self.lowest = maximum
+        self.active = 0
+        self.successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def succeeded(self):
+        with self._condition:
+            self.successes += 1
+            if self.successes >= ADAPT_SUCCESSES and self.limit < self.maximum:
+                self.limit += 1
+                self.successes = 0
+                self._condition.notify_all()
+
+    def throttled(self):
+        with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self.lowest = min(self.lowest, self.limit)
+            self.successes = 0
+
+
+def percentile(ordered, share):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+class ScoringStats:
+    def __init__(self):
+        # Updated from the scorer threads
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.api_calls = 0
+        self.scored = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttle_seconds = 0.0
+        self.latencies = []
+        # Exception type name -> quotes given up on
+        self.errors = {}
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_success(self, latency):
+        with self._lock:
+            self.api_calls += 1
+            self.scored += 1
+            self.latencies.append(latency)
+
+    def record_error(self, error):
+        name = type(error).__name__
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, limit=None):
+        if not self.api_calls:
+            return
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        print("\n=== Scoring ===")
+        print(f"  - Scored {self.scored} quotes in {elapsed:.1f}s ({self.scored / elapsed if elapsed else 0:.1f}/sec), "
+              f"{self.api_calls} API calls")
+        print(f"  - Latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms")
+        print(f"  - Retries: {self.retries}, rate limited (429): {self.rate_limited}, "
+              f"waiting on the rate limit: {self.throttle_seconds:.1f}s")
+        if limit is not None:
+            print(f"  - Concurrency: {limit.limit} at the end, {limit.lowest} lowest, {limit.maximum} maximum")
+        errors = ", ".join(f"{name}: {count}" for name, count in sorted(self.errors.items()))
+        print(f"  - Errors: {sum(self.errors.values())}" + (f" ({errors})" if errors else ""))
+
+
+stats = ScoringStats()
+
+
+class Scorer:
+    def __init__(self, model_id, concurrency=SCORING_CONCURRENCY, max_retries=SCORING_MAX_RETRIES):
+        self.model_id = model_id
+        self.max_retries = max_retries
+        self.requests = TokenBucket(SCORING_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(SCORING_TOKENS_PER_MINUTE)
+        self.limit = AdaptiveLimit(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scorer")
+        stats.started = time.monotonic()
+
+    def submit(self, quote):
+        """Future of the quote's score; it raises if the quote could not be scored"""
+        return self.executor.submit(self.score, quote)
+
+    def score(self, quote):
+        tokens = estimate_tokens(quote)
+        attempt = 0
+        while True:
+            with self.limit:
+                stats.increment("throttle_seconds", self.requests.acquire() + self.tokens.acquire(tokens))
+                started = time.perf_counter()
+                try:
+                    # Retries are ours, so a 429 also slows down every other worker
+                    score, headers = request_score(quote, self.model_id, max_retries=0)
+                except RETRYABLE as e:
+                    stats.increment("api_calls")
+                    if attempt >= self.max_retries or getattr(e, "code", None) == "insufficient_quota":
+                        stats.record_error(e)
+                        raise
+                    delay = self._back_off(e, attempt)
+                except Exception as e:
+                    stats.increment("api_calls")
+                    stats.record_error(e)
+                    raise
+                else:
+                    stats.record_success(time.perf_counter() - started)
+                    self._sync(headers)
+                    self.limit.succeeded()
+                    return score
+            attempt += 1
+            stats.increment("retries")
+            time.sleep(delay)
+
+    def _sync(self, headers):
+        self.requests.sync(int_header(headers, "x-ratelimit-limit-requests"),
+                           int_header(headers, "x-ratelimit-remaining-requests"))
+        self.tokens.sync(int_header(headers, "x-ratelimit-limit-tokens"),
+                         int_header(headers, "x-ratelimit-remaining-tokens"))
+
+    def _back_off(self, error, attempt):
+        """Seconds to wait before retrying; a 429 also lowers concurrency and pauses the buckets"""
+        response = getattr(error, "response", None)
+        delay = retry_delay(response.headers) if response is not None else None
+        delay = min(delay or BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+        if isinstance(error, openai.RateLimitError):
+            stats.increment("rate_limited")
+            self.limit.throttled()
+            self.requests.pause(delay)
+            self.tokens.pause(delay)
+        # Jitter so the workers don't all retry at once
+        return delay * random.uniform(1.0, 1.25)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -1,254 +1,121 @@
 from firebase_init import db
 from google.cloud import firestore
-from config import QUOTES_COLLECTION, KEYWORDS
+from config import QUOTES_COLLECTION, KEYWORDS, CONCURRENT_CRAWL, SKIP_UNCHANGED_SITES, STREAM_ARTICLES, ADAPTIVE_BUDGET, PROCESSED_DAYS_THRESHOLD, DISCOVERY_MODE
 from quote_extractor import QuoteExtractor
-import requests
-from bs4 import BeautifulSoup
+import keyword_matcher
+import link_prefilter
+import http_client
+import homepage_cache
+import link_extractor
+import feed_discovery
+import article_parser
+import article_stream
+import html_archive
+import host_health
+import crawl_budget
+import processed_index
+import quote_store
+from news_sites import NEWS_SITES
+from url_utils import normalize_url, url_hash as hash_url
 import time
 from requests.exceptions import RequestException, Timeout
 import argparse
 from datetime import datetime, timedelta
-import hashlib
-import re
 
 COLLECTION = QUOTES_COLLECTION
 
 quote_extractor = QuoteExtractor()
 
-NEWS_SITES = {
-    "BBC": {
-        "url": "https://www.bbc.com/",
-        "article_link_pattern": "/news/",
-        "base_url": "https://www.bbc.com",
-        # BBC articles have several formats:
-        # 1. /news/articles/c5ype8w6ynwo - main format
-        # 2. /news/world-europe-12345678 - regional format
-        # 3. /news/uk-12345678 - UK format
-        # 4. /news/technology-12345678 - topical format
-        "article_regex": r"/news/(articles/[a-z0-9]+|[a-z0-9\-]+)"
-    },
-    # "NPR": {
-    #     "url": "https://www.npr.org/sections/world/",
-    #     "article_link_pattern": "/sections/",
-    #     "base_url": "https://www.npr.org"
-    # },
-    "AP News": {
-        "url": "https://apnews.com/hub/world-news",
-        "article_link_pattern": "/article/",
-        "base_url": "https://apnews.com",
-        # AP News articles look like /article/israel-hamas-war-gaza-casualties-2024-xxx
-        "article_regex": r"/article/[a-z0-9\-]+"
-    },
-    "The Guardian": {
-        "url": "https://www.theguardian.com/world",
-        "article_link_pattern": "/world/",
-        "base_url": "https://www.theguardian.com",
-        # Guardian articles have year/month/day in the URL 
-        # Example: /world/2023/may/01/article-title
-        "article_regex": r"/world/\d{4}/[a-z]{3}/\d{2}/[a-z0-9\-]+"
-    },
-    "Al Jazeera": {
-        "url": "https://www.aljazeera.com/news/",
-        "article_link_pattern": "/news/",
-        "base_url": "https://www.aljazeera.com",
-        # Al Jazeera articles typically have year/month/day in them
-        # Example: /news/2023/5/1/article-title
-        "article_regex": r"/news/\d{4}/\d{1,2}/\d{1,2}/[a-z0-9\-]+"
-    },
-    # "Times of Israel": {
-    #     "url": "https://www.timesofisrael.com/",
-    #     "article_link_pattern": "/",
-    #     "base_url": "https://www.timesofisrael.com"
-    # },
-    "The Independent": {
-        "url": "https://www.independent.co.uk/news/world",
-        "article_link_pattern": "/news/world/",
-        "base_url": "https://www.independent.co.uk",
-        # The Independent articles include some kind of article ID
-        "article_regex": r"/news/world/[a-z0-9\-]+-[a-z0-9]+"
-    },
-    "France 24": {
-        "url": "https://www.france24.com/en/",
-        "article_link_pattern": "/en/",
-        "base_url": "https://www.france24.com",
-        # France24 articles typically have dates or numbers in them
-        # Example: /en/middle-east/20230501-israel-strikes-gaza-after-rocket-fire
-        "article_regex": r"/en/[a-z0-9\-]+/\d{8}-[a-z0-9\-]+"
-    },
-    "Deutsche Welle": {
-        "url": "https://www.dw.com/en/middle-east/s-14207", 
-        "article_link_pattern": "/en/",
-        "base_url": "https://www.dw.com",
-        # Deutsche Welle articles have a specific format with an article ID at the end
-        # Example: /en/title-goes-here/a-12345678
-        "article_regex": r"/en/[a-z0-9\-]+/a-\d+"
-    },
-    "Jerusalem Post": {
-        "url": "https://www.jpost.com/",
-        "article_link_pattern": "/",
-        "base_url": "https://www.jpost.com",
-        # Jerusalem Post URLs typically include a specific article number
-        "article_regex": r"/[a-z\-]+/article-\d+"
-    },
-    "The New Humanitarian": {
-        "url": "https://www.thenewhumanitarian.org/",
-        "article_link_pattern": "/",
-        "base_url": "https://www.thenewhumanitarian.org",
-        # The New Humanitarian articles usually have year/month/day
-        # Example: /news/2023/05/01/article-title
-        "article_regex": r"/news/\d{4}/\d{2}/\d{2}/[a-z0-9\-]+"
-    },
-    "Foreign Policy": {
-        "url": "https://foreignpolicy.com/",
-        "article_link_pattern": "/",
-        "base_url": "https://foreignpolicy.com",
-        # Foreign Policy articles usually have year/month/day
-        # Example: /2023/05/01/article-title
-        "article_regex": r"/\d{4}/\d{2}/\d{2}/[a-z0-9\-]+"
-    }
-}
-
-def get_article_links(site_name, site_config, timeout=10, max_retries=3):
-    """Scrapes article links with timeout and error handling"""
+def extract_article_links(site_name, site_config, html):
+    """Extracts unique article links (with anchor text) from a homepage"""
+    links, pattern_matches = link_extractor.extract_links(site_name, site_config, html)
+    print(f"Found {pattern_matches} total links with '{site_config['article_link_pattern']}' on {site_name}")
+    print(f"Found {len(links)} unique articles on {site_name}")
+
+    if len(links) == 0 and pattern_matches > 0:
+        print(f"WARNING: Found {pattern_matches} links matching the pattern but none matched the regex.")
+        if site_config.get("require_regex"):
+            print(f"{site_name} article regex pattern may need to be updated.")
+
+    return links
+
+def get_article_links(site_name, site_config, timeout=10, max_retries=3, skip_unchanged=None, with_text=False):
+    """Scrapes article links with timeout and error handling.
+
+    Returns a list of URLs, or ExtractedLink (url, text) tuples if with_text is set.
+    """
     print(f"Scraping {site_name}...")
+    if skip_unchanged is None:
+        skip_unchanged = SKIP_UNCHANGED_SITES
     
-    # List of different user agents to try if we get blocked
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/117.0',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1'
-    ]
-    
+    url = site_config["url"]
+    if not host_health.health.allow(url):
+        print(f"Circuit open for {site_name}, skipping site")
+        return []
+
     retry_count = 0
     last_error = None
     
     while retry_count < max_retries:
-        # Get a different user agent each retry
-        user_agent = user_agents[retry_count % len(user_agents)]
-        
-        headers = {
-            'User-Agent': user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Referer': 'https://www.google.com/',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        }
-        
         try:
             if retry_count > 0:
                 print(f"Retry {retry_count + 1}/{max_retries} for {site_name}...")
             
-            response = requests.get(
-                site_config["url"], 
-                headers=headers,
+            cached = homepage_cache.cache.get(url)
+
+            # Shared keep-alive client; attempt rotates the user agent
+            response = http_client.get(
+                url,
+                attempt=retry_count,
                 timeout=timeout,
-                allow_redirects=True
+                allow_redirects=True,
+                headers=homepage_cache.cache.conditional_headers(url)
             )
-            response.raise_for_status()
-            
-            # If we get here, the request was successful
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # First get all links to count them
-            all_links = []
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                if site_config["article_link_pattern"] in href:
-                    full_url = href if href.startswith("http") else f"{site_config['base_url']}{href}"
-                    all_links.append(full_url)
-            
-            print(f"Found {len(all_links)} total links with '{site_config['article_link_pattern']}' on {site_name}")
-            
-            # if len(all_links) > 0:
-            #     sample_size = min(5, len(all_links))
-            #     print(f"Sample links from {site_name}:")
-            #     for i in range(sample_size):
-            #         print(f"  - {all_links[i]}")
-            
-            links = []
-            
-            # Special handling for BBC news
-            if site_name == "BBC" and "article_regex" in site_config:
-                article_regex = re.compile(site_config["article_regex"])
-                
-                # Find all links
-                for a in soup.find_all("a", href=True):
-                    href = a["href"]
-                    # Check if it matches BBC article pattern
-                    if article_regex.search(href):
-                        full_url = href if href.startswith("http") else f"{site_config['base_url']}{href}"
-                        links.append(full_url)
-                
-                print(f"Found {len(links)} {site_name} article links matching regex")
+
+            body_hash = None
+            if response.status_code == 304 and cached:
+                print(f"{site_name} homepage not modified, reusing {len(cached['links'])} cached links")
+                links = homepage_cache.cached_links(cached)
             else:
-                # Standard pattern matching for other sites
-                for a in soup.find_all("a", href=True):
-                    href = a["href"]
-                    if site_config["article_link_pattern"] in href:
-                        full_url = href if href.startswith("http") else f"{site_config['base_url']}{href}"
-                        links.append(full_url)
-            
-            for article_container in soup.find_all(["div", "article", "li"], class_=lambda c: c and any(cls in str(c).lower() for cls in ["article", "story", "news", "post", "entry", "item"])):
-                for a in article_container.find_all("a", href=True):
-                    href = a["href"]
-                    # For BBC, apply the regex check
-                    if site_name == "BBC" and "article_regex" in site_config:
-                        article_regex = re.compile(site_config["article_regex"])
-                        if article_regex.search(href):
-                            full_url = href if href.startswith("http") else f"{site_config['base_url']}{href}"
-                            links.append(full_url)
-                    else:
-                        # Standard check for other sites
-                        if site_config["article_link_pattern"] in href:
-                            full_url = href if href.startswith("http") else f"{site_config['base_url']}{href}"
-                            links.append(full_url)
-            
-            # Remove duplicates and non-articles
-            unique_links = []
-            seen = set()
-            for link in links:
-                normalized = normalize_url(link)
-                
-                # For BBC, double check the article pattern
-                if site_name == "BBC" and "article_regex" in site_config:
-                    article_regex = re.compile(site_config["article_regex"])
-                    if not article_regex.search(link):
-                        continue
-                        
-                if normalized not in seen and site_config["article_link_pattern"] in link:
-                    unique_links.append(link)
-                    seen.add(normalized)
-            
-            print(f"Found {len(unique_links)} unique articles on {site_name}")
-            
-            # If we didn't find any links, let's print part of the HTML for debugging
-            if len(unique_links) == 0 and len(all_links) > 0:
-                print(f"WARNING: Found {len(all_links)} links matching the pattern but none matched the regex.")
-                if site_name == "BBC":
-                    print("BBC article regex pattern may need to be updated.")
-                    print(f"First 3 links that didn't match the regex pattern:")
-                    for i in range(min(3, len(all_links))):
-                        print(f"  - {all_links[i]}")
-            
-            return unique_links
+                response.raise_for_status()
+                body_hash = homepage_cache.content_hash(response.content)
+                if cached and cached.get("content_hash") == body_hash:
+                    print(f"{site_name} homepage is identical to last run, reusing {len(cached['links'])} cached links")
+                    links = homepage_cache.cached_links(cached)
+                else:
+                    links = extract_article_links(site_name, site_config, response.text)
+                html_archive.record_response(url, response, site_name, kind="homepage")
+
+            host_health.health.record_success(url)
+            unchanged = homepage_cache.cache.update(url, response, links, body_hash)
+            if unchanged and skip_unchanged:
+                print(f"Link set for {site_name} has not changed since last run, skipping site")
+                return []
+
+            if with_text:
+                return links
+            return [link.url for link in links]
             
         except RequestException as e:
             retry_count += 1
             last_error = e
             print(f"Request error on try {retry_count} for {site_name}: {e}")
+            host_health.health.record_failure(url, e)
             
-            # If it's a 403 error, definitely retry with a different user agent
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 403:
-                print(f"Received 403 Forbidden from {site_name}, will retry with different user agent")
-            elif retry_count >= max_retries:
+            if retry_count >= max_retries:
                 print(f"Max retries ({max_retries}) reached for {site_name}, giving up")
                 break
+
+            # If it's a 403 error, retry with a different user agent
+            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 403:
+                print(f"Received 403 Forbidden from {site_name}, will retry with different user agent")
                 
-            # Wait longer between retries
-            time.sleep(retry_count * 2)
+            # Jittered backoff (or Retry-After) from the run's retry budget
+            delay = host_health.health.retry_delay(url, retry_count, e)
+            if delay is None:
+                print(f"Not retrying {site_name} (not retryable, circuit open or retry budget used up)")
+                break
+            time.sleep(delay)
             continue
             
         except Exception as e:
@@ -260,8 +127,11 @@ def get_article_links(site_name, site_config, timeout=10, max_retries=3):
                 print(f"Max retries ({max_retries}) reached for {site_name}, giving up")
                 break
                 
-            # Wait longer between retries
-            time.sleep(retry_count * 2)
+            delay = host_health.health.retry_delay(url, retry_count, e)
+            if delay is None:
+                print(f"Not retrying {site_name} (not retryable, circuit open or retry budget used up)")
+                break
+            time.sleep(delay)
             continue
     
     # If we get here, all retries failed
@@ -274,135 +144,76 @@ def get_article_links(site_name, site_config, timeout=10, max_retries=3):
         
     return []
 
-def scrape_article(url, site_name, timeout=10, max_retries=3):
-    """Scrapes an article with timeout, retry logic, and error handling"""
-    # List of different user agents to try if we get blocked
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/117.0',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1'
-    ]
-    
+def discover_article_links(site_name, site_config, with_text=False, mode=None):
+    """Article links from the site's feeds in "feeds" mode, else (or if that fails) its front page"""
+    if mode is None:
+        mode = DISCOVERY_MODE
+    if mode == "feeds":
+        try:
+            links = feed_discovery.feed_links(site_name, site_config)
+        except Exception as e:
+            print(f"Feed discovery failed for {site_name}: {e}")
+            links = None
+        if links:
+            return links if with_text else [link.url for link in links]
+        if site_config.get("feeds"):
+            print(f"No usable feed entries for {site_name}, falling back to the front page")
+    return get_article_links(site_name, site_config, with_text=with_text)
+
+def fetch_article_html(url, site_name, timeout=10, max_retries=3):
+    """Downloads an article's HTML with timeout, retry logic, and error handling"""
+    if not host_health.health.allow(url):
+        print(f"Circuit open for {site_name}, not fetching {url}")
+        return None
+
     retry_count = 0
     last_error = None
     
     while retry_count < max_retries:
-        # Get a different user agent each retry
-        user_agent = user_agents[retry_count % len(user_agents)]
-        
-        headers = {
-            'User-Agent': user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Referer': 'https://www.google.com/',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        }
-        
         try:
             if retry_count > 0:
                 print(f"Retry {retry_count}/{max_retries} for article: {url}")
             else:
                 print(f"Scraping article: {url}")
             
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Find title with site-specific handling
-            title = "No title"
-            
-            # Special handling for BBC
-            if site_name == "BBC":
-                # First try to find H1 (article page)
-                title_element = soup.find("h1")
-                if title_element:
-                    title = title_element.text.strip()
-                else:
-                    # If no H1, try to find main headline in H2 (sometimes BBC uses H2 for headlines)
-                    headline_elements = soup.find_all("h2")
-                    for h2 in headline_elements:
-                        # Look for headlines with significant text length
-                        if len(h2.text.strip()) > 20:
-                            title = h2.text.strip()
-                            break
-                # If we still have "No title", try other common headline classes
-                if title == "No title":
-                    for headline_class in ["article-headline", "story-headline", "headline"]:
-                        headline = soup.find(class_=headline_class)
-                        if headline:
-                            title = headline.text.strip()
-                            break
+            if STREAM_ARTICLES:
+                # Size-capped streaming fetch that stops once the article body has closed
+                fetched = article_stream.fetch_article(url, site_name, attempt=retry_count, timeout=timeout,
+                                                       keep_raw=html_archive.archive is not None)
+                html = fetched["html"]
+                html_archive.record_response(url, fetched["response"], site_name, body=fetched.get("raw"))
+                print(f"Read {fetched['bytes_read'] / 1024:.0f} KB"
+                      f"{' (stopped after article body)' if fetched['stopped_early'] else ''}"
+                      f"{' (truncated at byte cap)' if fetched['truncated'] else ''}")
             else:
-                # Default behavior for other sites
-                title_element = soup.find("h1")
-                title = title_element.text.strip() if title_element else "No title"
-            
-            invalid_titles = {
-                "Business", "Climate", "Sport", "Technology", "Entertainment",
-                "Analysis", "Art & Design", "Movies", "Opinion", "Review",
-                "Menu", "Navigation", "Search"
-            }
-            
-            if (title in invalid_titles or 
-                len(title) < 10 or 
-                any(section in title for section in ["Section", "Category", "Page"])):
-                print(f"Skipping article with invalid title: {title}")
-                return None
-            
-            # Find content with fallbacks for different site structures
-            content = ""
-            
-            # First try to find content in article body containers
-            article_containers = soup.find_all(["article", "div", "section"], 
-                class_=lambda c: c and any(cls in str(c).lower() for cls in 
-                          ["article-body", "article-content", "story-body", "story-content", 
-                           "main-content", "entry-content", "post-content"]))
-            
-            # If we found article containers, extract paragraphs from them
-            if article_containers:
-                for container in article_containers:
-                    container_paragraphs = container.find_all("p")
-                    if container_paragraphs:
-                        content = " ".join([p.text.strip() for p in container_paragraphs])
-                        break
-            
-            # If we couldn't get content from containers, try the standard method
-            if not content or len(content) < 300:
-                paragraphs = soup.find_all("p")
-                content = " ".join([p.text.strip() for p in paragraphs])
-            
-            # Last resort: if still not enough content, get all text from the page
-            if len(content) < 300:
-                print(f"Not enough paragraph content, trying to extract all text")
-                # Get all text from the body, excluding scripts and styles
-                for script in soup(["script", "style"]):
-                    script.extract()
-                content = soup.get_text(separator=" ", strip=True)
-            
-            if len(content) < 300: 
-                print(f"Skipping article with insufficient content: {title}")
-                return None
-            
-            print(f"Successfully scraped article: {title} ({len(content)} chars)")    
-            return {"url": url, "title": title, "content": content}
+                response = http_client.get(url, attempt=retry_count, timeout=timeout)
+                response.raise_for_status()
+                html = response.text
+                html_archive.record_response(url, response, site_name)
+
+            host_health.health.record_success(url)
+            return html
             
         except RequestException as e:
             retry_count += 1
             last_error = e
             print(f"Request error on article try {retry_count} for {url}: {e}")
+            host_health.health.record_failure(url, e)
             
-            # If it's a 403 error, definitely retry with a different user agent
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 403:
-                print(f"Received 403 Forbidden for article, will retry with different user agent")
-            elif retry_count >= max_retries:
+            if retry_count >= max_retries:
                 print(f"Max retries ({max_retries}) reached for article, giving up")
                 break
+
+            # If it's a 403 error, retry with a different user agent
+            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 403:
+                print(f"Received 403 Forbidden for article, will retry with different user agent")
                 
-            # Wait longer between retries
-            time.sleep(retry_count * 2)
+            # Jittered backoff (or Retry-After) from the run's retry budget
+            delay = host_health.health.retry_delay(url, retry_count, e)
+            if delay is None:
+                print(f"Not retrying article (not retryable, circuit open or retry budget used up)")
+                break
+            time.sleep(delay)
             continue
             
         except Exception as e:
@@ -414,100 +225,71 @@ def scrape_article(url, site_name, timeout=10, max_retries=3):
                 print(f"Max retries ({max_retries}) reached for article, giving up")
                 break
                 
-            # Wait longer between retries
-            time.sleep(retry_count * 2)
+            delay = host_health.health.retry_delay(url, retry_count, e)
+            if delay is None:
+                print(f"Not retrying article (not retryable, circuit open or retry budget used up)")
+                break
+            time.sleep(delay)
             continue
     
     # If we get here, all retries failed
     print(f"Error scraping article {url}: {last_error}")
     return None
 
+def scrape_article(url, site_name, timeout=10, max_retries=3):
+    """Scrapes an article: fetches it and extracts the title and content"""
+    html = fetch_article_html(url, site_name, timeout, max_retries)
+    if html is None:
+        return None
+
+    article = article_parser.parse_article(html, url, site_name)
+    if article:
+        print(f"Successfully scraped article: {article['title']} ({len(article['content'])} chars, "
+              f"{article['extraction_path']}, {article['parse_ms']}ms)")
+    return article
+
 def search_keywords(article):
-    """Checks if article contains any target keywords."""
+    """Checks if article contains any target keywords.
+
+    Keeps the content match positions in article["keyword_matches"] for
+    extract_article_quotes.
+    """
     if not article:
         return None
-        
-    content = article["content"].lower()
-    title = article["title"].lower()
-    
-    matches = {kw for kw in KEYWORDS if kw.lower() in title or kw.lower() in content}
+
+    matches, article["keyword_matches"] = keyword_matcher.article_keywords(article)
     
     if matches:
         print(f"Found keywords {matches} in article: {article['title']}")
         return list(matches)
     return None
 
-def normalize_quote(text):
-    text = text.lower().strip()
-    text = re.sub(r'\s+', ' ', text)
-    #text = re.sub(r'[^\w\s]', '', text)
-    return text
-
-def quote_id(text):
-    #using hash to avoid long document IDs
-    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+def extract_article_quotes(article):
+    """Quotes from the article text around its keyword matches (all of it if KEYWORD_QUOTE_WINDOW is 0)"""
+    matches = article.get("keyword_matches")
+    if matches is None:
+        return quote_extractor.extract_quotes(article["content"])
+    return keyword_matcher.quotes_near_keywords(quote_extractor, article["content"], matches)
 
 def store_quotes(quotes, article_info, source):
-    """Store new quotes in Firebase using normalized hash as document ID to prevent duplicates"""
-    batch = db.batch()
-    stored_count = 0
-
-    for quote in quotes:
-        norm_quote = normalize_quote(quote)
-        if not norm_quote:
-            continue
-        doc_id = quote_id(norm_quote)
-        doc_ref = db.collection(COLLECTION).document(doc_id)
-        if doc_ref.get().exists:
-            continue  # Already exists, skip
-        batch.set(doc_ref, {
-            "text": quote.strip(),
-            "article_url": article_info["url"],
-            "article_title": article_info["title"],
-            "source": source,
-            "timestamp": firestore.SERVER_TIMESTAMP,
-            "score": None,
-            "processed": False
-        })
-        stored_count += 1
+    """Queue new quotes for Firebase, keyed by normalized hash to prevent duplicates.
 
+    Returns the number of new quotes; they are written when the quote sink flushes.
+    """
+    stored_count = quote_store.sink.add(quotes, article_info, source)
     if stored_count > 0:
-        batch.commit()
         print(f"Stored {stored_count} new quotes from: {article_info['title']}")
     
     return stored_count
 
-def normalize_url(url):
-    """Normalize URL for consistent tracking"""
-    url = url.rstrip('/')
-    url = url.split('?')[0]
-    url = url.replace('http://', '').replace('https://', '')
-    url = url.replace('www.', '')
-    return url
-
-def has_been_processed(url, days_threshold=30):
+def has_been_processed(url, days_threshold=PROCESSED_DAYS_THRESHOLD):
     """Check if URL has been processed in the last X days"""
-    normalized_url = normalize_url(url)
-    url_hash = hashlib.md5(normalized_url.encode()).hexdigest()
-    
-    # print(f"Checking if URL has been processed: {url}")
-    # print(f"  Normalized URL: {normalized_url}")
-    # print(f"  URL hash: {url_hash}")
-    
-    doc_ref = db.collection("processed_urls").document(url_hash)
-    doc = doc_ref.get()
-    
-    if doc.exists:
-        # print(f"  URL was previously processed!")
-        return True
-    
-    # print(f"  URL is new, not previously processed.")
-    return False
+    return url in processed_index.find_processed([url], days_threshold)
 
 def mark_as_processed(url, site_name):
     """Mark URL as processed in Firestore"""
     normalized_url = normalize_url(url)
-    url_hash = hashlib.md5(normalized_url.encode()).hexdigest()
+    url_hash = hash_url(url)
     
     # print(f"Marking URL as processed: {url}")
     # print(f"  Normalized URL: {normalized_url}")
@@ -522,11 +304,18 @@ def mark_as_processed(url, site_name):
     })
     # print(f"  Successfully marked URL as processed.")
 
-def main():
+def main(concurrent=None, max_articles_per_site=1, max_articles_to_check=16, adaptive_budget=None):
+    if concurrent is None:
+        concurrent = CONCURRENT_CRAWL
+    if adaptive_budget is None:
+        adaptive_budget = ADAPTIVE_BUDGET
+    if concurrent:
+        from crawl_engine import run_concurrent_crawl
+        return run_concurrent_crawl(max_articles_per_site, max_articles_to_check, adaptive_budget=adaptive_budget)
+
     quotes_processed = 0
-    max_articles_per_site = 1
-    max_articles_to_check = 16  
     processed_urls = set()
+    run_start = time.monotonic()
 
     # Create the processed_urls collection if it doesn't exist
     try:
@@ -536,31 +325,52 @@ def main():
             db.collection("processed_urls").document("init").delete()
     except Exception as e:
         print(f"Error initializing processed_urls collection: {e}")
+    processed_index.load_filter()
+    host_health.health.start_run()
+
+    # Articles to check per site, shifted toward high-yield sites when enabled
+    if adaptive_budget:
+        budgets = crawl_budget.plan_budgets(list(NEWS_SITES), max_articles_to_check)
+    else:
+        budgets = {site_name: max_articles_to_check for site_name in NEWS_SITES}
     
     for site_name, site_config in NEWS_SITES.items():
+        site_start = time.monotonic()
+        site_fetches = 0
+        site_keyword_hits = 0
+        site_quotes = 0
+        markers = processed_index.MarkerBuffer()
         try:
             print(f"\nProcessing {site_name}...")
-            article_links = get_article_links(site_name, site_config)
+            article_links = discover_article_links(site_name, site_config, with_text=True)
             
             if not article_links:
                 print(f"No articles found for {site_name}, skipping site")
                 continue
                 
             print(f"Found {len(article_links)} total articles for {site_name}")
-            print(f"Will check up to {len(article_links[:max_articles_to_check])} articles to find {max_articles_per_site} successful ones")
+            # Keyword-likely links first (or only) when the headline prefilter is on
+            articles_to_check = link_prefilter.plan_fetches(site_name, article_links, budgets[site_name])
+            print(f"Will check up to {len(articles_to_check)} articles to find {max_articles_per_site} successful ones")
             
             # Track successful articles (those that resulted in quotes being added)
             successful_articles = 0
             # Track articles we've attempted to process
             attempted_articles = 0
             
-            articles_to_check = article_links[:max_articles_to_check]
+            # One multi-document read for every candidate instead of a get() per link
+            already_processed = processed_index.find_processed(
+                [link for link in articles_to_check if link not in processed_urls])
             for link in articles_to_check:
                 # Stop if we've processed enough successful articles for this site
                 if successful_articles >= max_articles_per_site:
                     print(f"Reached target of {max_articles_per_site} successful articles for {site_name}")
                     break
                 
+                if not host_health.health.allow(link):
+                    print(f"Circuit open for {site_name}, stopping this site")
+                    break
+
                 # Count this as an attempt
                 attempted_articles += 1
                 
@@ -569,7 +379,7 @@ def main():
                     print(f"Skipping URL already processed in this run")
                     continue
                 
-                if has_been_processed(link):
+                if link in already_processed:
                     print(f"Skipping URL already processed in previous runs")
                     continue
                 
@@ -582,25 +392,32 @@ def main():
                     
                     # Try to scrape the article
                     article = scrape_article(link, site_name)
+                    site_fetches += 1
                     
                     # Check if article is valid
                     if not article:
+                        if not host_health.health.allow(link):
+                            # Leave it unmarked so it is tried once the host recovers
+                            print(f"Circuit opened for {site_name}, stopping this site")
+                            break
                         print(f"Article could not be scraped or has invalid title/content")
-                        mark_as_processed(link, site_name)
+                        markers.add(link, site_name)
                         continue  # Skip to next article
                     
                     # Check for keywords
                     matched_terms = search_keywords(article)
+                    link_prefilter.stats.record_fetch(site_name, link, matched_terms)
                     if not matched_terms:
                         print(f"No relevant keywords found in: {article['title']}")
-                        mark_as_processed(link, site_name)
+                        markers.add(link, site_name)
                         continue  # Skip to next article
+                    site_keyword_hits += 1
                     
                     # Try to extract quotes
-                    quotes = quote_extractor.extract_quotes(article["content"])
+                    quotes = extract_article_quotes(article)
                     if not quotes:
                         print(f"No quotes found in: {article['title']}")
-                        mark_as_processed(link, site_name)
+                        markers.add(link, site_name)
                         continue  # Skip to next article
                     
                     # We have quotes! Try to store them
@@ -614,12 +431,13 @@ def main():
                     if quotes_added > 0:
                         successful_articles += 1
                         quotes_processed += quotes_added
+                        site_quotes += quotes_added
                         print(f"Success! Found and stored {quotes_added} new quotes from article")
                     else:
                         print(f"No new quotes were added (all were duplicates)")
                     
                     # Mark as processed either way
-                    mark_as_processed(link, site_name)
+                    markers.add(link, site_name)
                     
                 except Exception as e:
                     print(f"Error processing article: {e}")
@@ -639,17 +457,40 @@ def main():
                     print(f"  - Couldn't reach target of {max_articles_per_site} successful articles (exhausted all available articles)")
                 else:
                     print(f"  - Stopped early due to exceptions")
+            print(f"  - Took {time.monotonic() - site_start:.1f}s")
             
             time.sleep(5)
             
         except Exception as e:
             print(f"Error processing site {site_name}: {e}")
             continue
+        finally:
+            try:
+                # Quotes reach Firestore before their URLs are marked processed
+                quote_store.sink.flush()
+                markers.flush()
+            except Exception as e:
+                print(f"Error storing quotes or marking {len(markers)} {site_name} URLs as processed: {e}")
+            crawl_budget.record_site_run(site_name, site_fetches, site_keyword_hits, site_quotes)
     
-    print(f"\nScript completed. Processed {quotes_processed} new quotes in total.")
+    homepage_cache.cache.save()
+    processed_index.save_filter()
+    host_health.health.save()
+    quote_store.sink.close()
+    processed_index.stats.report()
+    quote_store.stats.report()
+    link_prefilter.stats.report()
+    article_parser.stats.report()
+    http_client.client.report()
+    host_health.health.report()
+    print(f"\nScript completed in {time.monotonic() - run_start:.1f}s. Processed {quotes_processed} new quotes in total.")
     return quotes_processed
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Quote scraper utility')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Crawl all sites in parallel with per-host limits')
+    parser.add_argument('--adaptive-budget', action='store_true',
+                        help='Shift articles to check toward sites with a higher quote yield')
     args = parser.parse_args()
-    main()
+    main(concurrent=args.concurrent or None, adaptive_budget=args.adaptive_budget or None)
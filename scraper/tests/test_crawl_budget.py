@@ -0,0 +1,29 @@
+from crawl_budget import plan_budgets
+
+SITES = ["busy", "quiet", "new"]
+STATS = {
+    "busy": {"fetches": 100, "quotes_stored": 80, "scored_quotes": 80, "score_sum": 60.0},
+    "quiet": {"fetches": 100, "quotes_stored": 0},
+}
+
+
+def test_total_budget_is_kept():
+    budgets = plan_budgets(SITES, 8, floor=2, max_multiplier=2, stats=STATS)
+    assert sum(budgets.values()) == 8 * len(SITES)
+
+
+def test_budget_follows_yield_within_floor_and_cap():
+    budgets = plan_budgets(SITES, 8, floor=2, max_multiplier=2, stats=STATS)
+    assert budgets["busy"] > budgets["new"] > budgets["quiet"]
+    assert budgets["quiet"] == 2
+    assert max(budgets.values()) <= 16
+
+
+def test_equal_history_gives_equal_budgets():
+    assert plan_budgets(SITES, 5, floor=2, stats={}) == {name: 5 for name in SITES}
+
+
+def test_floor_never_exceeds_the_per_site_budget():
+    budgets = plan_budgets(SITES, 3, floor=10, max_multiplier=2, stats=STATS)
+    assert min(budgets.values()) >= 3
+    assert sum(budgets.values()) == 9
@@ -0,0 +1,41 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+import feed_discovery
+from feed_discovery import entry_fields, feed_links
+
+FEED_URL = "https://example.com/feeds/world.xml"
+SITE_CONFIG = {
+    "base_url": "https://example.com",
+    "article_link_pattern": "/news/",
+    "feeds": [FEED_URL],
+}
+
+
+def test_entry_fields_resolves_relative_links():
+    atom = ET.fromstring('<entry xmlns="http://www.w3.org/2005/Atom">'
+                         '<title>Talks resume</title><link href="/news/talks-resume"/></entry>')
+    assert entry_fields(atom, FEED_URL)[:2] == ("https://example.com/news/talks-resume", "Talks resume")
+
+    sitemap = ET.fromstring("<url><loc>../news/hostage-release</loc></url>")
+    assert entry_fields(sitemap, FEED_URL)[0] == "https://example.com/news/hostage-release"
+
+    absolute = ET.fromstring("<item><link>https://example.com/news/war-latest</link></item>")
+    assert entry_fields(absolute, FEED_URL)[0] == "https://example.com/news/war-latest"
+
+
+def test_feed_links_without_age_cutoff(monkeypatch, capsys):
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    entries = [
+        ("https://example.com/news/old-story", "Old story", "", old),
+        ("https://example.com/sport/match-report", "Match report", "", None),
+    ]
+    monkeypatch.setattr(feed_discovery, "iter_feed", lambda url, timeout=None: iter(entries))
+
+    links = feed_links("Example", SITE_CONFIG, max_age_hours=None)
+    assert [link.url for link in links] == ["https://example.com/news/old-story"]
+    assert "Found 1 articles in Example feeds\n" in capsys.readouterr().out
+
+    links = feed_links("Example", SITE_CONFIG, max_age_hours=24)
+    assert links == []
+    assert "1 older than 24h skipped" in capsys.readouterr().out
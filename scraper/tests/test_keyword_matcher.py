@@ -0,0 +1,47 @@
+import pytest
+
+from keyword_matcher import KeywordMatcher, ahocorasick, inflections
+
+BACKENDS = ["find", "regex"] + (["ahocorasick"] if ahocorasick is not None else [])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_word_boundaries(backend):
+    matcher = KeywordMatcher(["war", "hostage"], backend=backend)
+    text = "An award for software, a warden, and the war's end; hostage-taking."
+    assert [(m.keyword, text[m.start:m.end]) for m in matcher.finditer(text)] == [
+        ("war", "war"), ("hostage", "hostage")
+    ]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_inflections_match_base_keyword(backend):
+    matcher = KeywordMatcher(["war", "conflict", "battle", "protest"], backend=backend)
+    text = "Wars, conflicts, battled, battling and protesting; not warfare or battlements."
+    assert [text[m.start:m.end] for m in matcher.finditer(text)] == [
+        "Wars", "conflicts", "battled", "battling", "protesting"
+    ]
+    assert matcher.terms(text) == {"war", "conflict", "battle", "protest"}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_exact_matching_without_inflections(backend):
+    matcher = KeywordMatcher(["war"], backend=backend, inflect=False)
+    assert matcher.terms("Wars and more wars") == set()
+    assert matcher.terms("WAR.") == {"war"}
+
+
+def test_inflections():
+    assert {"war", "wars"} <= inflections("war")
+    assert {"battles", "battled", "battling"} <= inflections("battle")
+    assert "crashes" in inflections("crash")
+    assert inflections("hostages") == {"hostages"}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_search_returns_first_match(backend):
+    matcher = KeywordMatcher(["gaza", "united states"], backend=backend, inflect=False)
+    text = "Aid from the United States reached Gaza."
+    match = matcher.search(text)
+    assert (match.keyword, text[match.start:match.end]) == ("united states", "United States")
+    assert matcher.search("Nothing to see here") is None
@@ -0,0 +1,66 @@
+import pytest
+
+import link_prefilter
+from keyword_matcher import KeywordMatcher
+from link_extractor import ExtractedLink
+from link_prefilter import PrefilterStats, plan_fetches, score_link
+
+LINKS = [
+    ExtractedLink("https://example.com/news/markets-rally-again", "Markets rally again"),
+    ExtractedLink("https://example.com/news/talks-resume", "Ceasefire talks resume as war enters third year"),
+    ExtractedLink("https://example.com/news/weather-update", "Weather update"),
+    ExtractedLink("https://example.com/news/hostage-release-agreed", "Families wait for news"),
+    ExtractedLink("https://example.com/news/election-results", "Election results"),
+]
+URLS = [link.url for link in LINKS]
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(link_prefilter, "stats", PrefilterStats())
+    monkeypatch.setattr(link_prefilter.keyword_matcher, "matcher", KeywordMatcher(["war", "conflict", "hostage"]))
+
+
+def test_score_link_weights_headline_over_slug():
+    assert score_link(LINKS[1]) == link_prefilter.HEADLINE_WEIGHT
+    assert score_link(LINKS[3]) == link_prefilter.SLUG_WEIGHT
+    assert score_link(LINKS[0]) == 0
+    both = ExtractedLink("https://example.com/news/war-latest", "War latest")
+    assert score_link(both) == link_prefilter.HEADLINE_WEIGHT + link_prefilter.SLUG_WEIGHT
+
+
+def test_off_and_shadow_keep_page_order():
+    assert plan_fetches("Site", LINKS, 3, mode="off") == URLS[:3]
+    assert link_prefilter.stats.candidates == {}
+    assert plan_fetches("Site", LINKS, 3, mode="shadow") == URLS[:3]
+    assert link_prefilter.stats.candidates["Site"] == len(LINKS)
+    assert link_prefilter.stats.scores[URLS[1]] > 0
+
+
+def test_order_puts_keyword_links_first():
+    # Equal scores keep page order
+    assert plan_fetches("Site", LINKS, 5, mode="order") == [URLS[1], URLS[3], URLS[0], URLS[2], URLS[4]]
+    assert link_prefilter.stats.dropped["Site"] == 0
+
+
+def test_prune_keeps_explore_links_and_counts_dropped():
+    planned = plan_fetches("Site", LINKS, 5, mode="prune", explore=1)
+    assert planned == [URLS[1], URLS[3], URLS[0]]
+    assert link_prefilter.stats.dropped["Site"] == 2
+
+
+def test_prune_counts_only_fetches_saved_within_budget():
+    planned = plan_fetches("Site", LINKS, 2, mode="prune", explore=0)
+    assert planned == [URLS[1], URLS[3]]
+    assert link_prefilter.stats.dropped["Site"] == 0
+
+
+def test_record_fetch_splits_scored_and_unscored():
+    plan_fetches("Site", LINKS, 5, mode="shadow")
+    stats = link_prefilter.stats
+    stats.record_fetch("Site", URLS[1], True)
+    stats.record_fetch("Site", URLS[0], False)
+    stats.record_fetch("Site", URLS[2], True)
+    stats.record_fetch("Site", "https://example.com/unplanned", True)
+    assert stats.scored["Site"] == [1, 1]
+    assert stats.unscored["Site"] == [2, 1]
@@ -0,0 +1,21 @@
+from prescore import PreScorer
+
+
+def test_rule_terms_short_circuit_the_model():
+    scorer = PreScorer()
+    assert scorer.rule_hit("Talks with Netanyahu resumed on Monday") == "netanyahu"
+    assert scorer.verdict("Aid convoys reached Gaza after the talks") == ("rule:gaza", 1.0)
+
+
+def test_rule_terms_are_exact_words():
+    scorer = PreScorer()
+    assert scorer.rule_hit("The Iranian delegation left early") is None
+    assert scorer.rule_hit("We will keep going no matter what") is None
+
+
+def test_model_verdict_without_rule_hit():
+    scorer = PreScorer(bias=5.0)
+    reason, probability = scorer.verdict("We will keep going no matter what", confidence=0.9)
+    assert reason == "model" and probability > 0.9
+    reason, _ = PreScorer(bias=-5.0).verdict("We will keep going no matter what")
+    assert reason is None
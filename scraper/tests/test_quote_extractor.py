@@ -0,0 +1,52 @@
+from quote_extractor import MAX_SPAN, QuoteExtractor
+
+extractor = QuoteExtractor()
+
+
+def texts(content):
+    return [quote.text for quote in extractor.find_quotes(content)]
+
+
+def test_curly_and_straight_quotes():
+    assert texts("He said “we will never give up on them” today.") == ["we will never give up on them"]
+    assert texts('He said "we will never give up on them" today.') == ["we will never give up on them"]
+
+
+def test_nested_quote_stays_in_outer_text():
+    content = "He said “we will ‘never’ give up on them” today."
+    quotes = extractor.find_quotes(content)
+    assert [quote.text for quote in quotes] == ["we will ‘never’ give up on them"]
+    assert content[quotes[0].start] == "“"
+    assert content[quotes[0].end - 1] == "”"
+
+
+def test_apostrophes_do_not_close_quotes():
+    assert texts("It’s the people’s “choice to make for themselves” she said.") == [
+        "choice to make for themselves"
+    ]
+
+
+def test_continuation_paragraph_is_joined():
+    content = "“This is the first paragraph of it.\n\n“And this is the second paragraph,” she said."
+    assert texts(content) == ["This is the first paragraph of it. And this is the second paragraph,"]
+
+
+def test_consecutive_quotes():
+    content = "“First quote is right here,” he said. “Second quote follows it now.”"
+    assert texts(content) == ["First quote is right here,", "Second quote follows it now."]
+
+
+def test_unbalanced_quotes_are_dropped():
+    assert texts("Stray “ opening mark with no close and then text here.") == []
+    assert texts("He said “unclosed quote here and a ‘nested one’ and then nothing more") == []
+
+
+def test_stray_opening_mark_expires():
+    content = "“stray opening " + "x " * (MAX_SPAN // 2 + 100) + "“Real quote text goes here,” he said."
+    assert texts(content) == ["Real quote text goes here,"]
+
+
+def test_attribution_context():
+    quote = extractor.find_quotes("The minister said “we will not stop here” on Monday.")[0]
+    assert quote.before.endswith("The minister said ")
+    assert quote.after.startswith(" on Monday.")
@@ -0,0 +1,26 @@
+from quote_text import canonical_id, clean_quote, normalize_quote, quote_id
+
+
+def test_nfkc_and_quote_marks():
+    # Full-width letters, a ligature and curly marks fold to plain ASCII
+    assert normalize_quote("“Ｗe ﬁght ‘on’ today”") == "we fight 'on' today"
+
+
+def test_whitespace_is_folded():
+    assert normalize_quote("  We will fight\n\n on\t the beaches ") == "we will fight on the beaches"
+
+
+def test_edge_punctuation_and_dashes():
+    assert normalize_quote('"Peace — now," ') == "peace - now"
+
+
+def test_canonical_id_matches_variants():
+    assert canonical_id("“We will fight on,”") == canonical_id('we  will FIGHT on')
+    assert canonical_id("We will fight on") == quote_id("we will fight on")
+    assert canonical_id("We will fight on") != canonical_id("We will fight again")
+
+
+def test_clean_quote_keeps_canonical_id():
+    text = "“We will not stop here,”"
+    assert clean_quote(text) == "We will not stop here"
+    assert canonical_id(clean_quote(text)) == canonical_id(text)
@@ -0,0 +1,59 @@
+import hashlib
+
+import url_filter
+from url_filter import DAY, BucketedFilter
+
+NOW = 1_700_000_000.0
+
+
+def key(url):
+    return hashlib.md5(url.encode("utf-8")).hexdigest()
+
+
+def at(monkeypatch, timestamp):
+    monkeypatch.setattr(url_filter.time, "time", lambda: timestamp)
+
+
+def test_lookup_respects_days_threshold(monkeypatch):
+    at(monkeypatch, NOW)
+    bucketed = BucketedFilter(bucket_days=7, retention_days=30)
+    bucketed.add(key("old"), NOW - 20 * DAY)
+    bucketed.add(key("new"))
+    assert bucketed.might_contain(key("old"), 30)
+    assert not bucketed.might_contain(key("old"), 7)
+    assert bucketed.might_contain(key("new"), 1)
+    assert not bucketed.might_contain(key("other"), 30)
+
+
+def test_bucket_rollover(monkeypatch):
+    at(monkeypatch, NOW)
+    bucketed = BucketedFilter(bucket_days=7, retention_days=14)
+    bucketed.add(key("first"))
+    first_bucket = set(bucketed.buckets)
+
+    # A week on, new keys go to a new bucket and the old one still answers
+    at(monkeypatch, NOW + 7 * DAY)
+    bucketed.add(key("second"))
+    assert len(bucketed.buckets) == 2
+    bucketed.expire()
+    assert bucketed.might_contain(key("first"), 14)
+
+    # Once the first bucket ends before the retention window it is dropped
+    at(monkeypatch, NOW + 22 * DAY)
+    bucketed.expire()
+    assert not set(bucketed.buckets) & first_bucket
+    assert not bucketed.might_contain(key("first"), 14)
+    assert bucketed.might_contain(key("second"), 14)
+
+
+def test_snapshot_round_trip(monkeypatch):
+    at(monkeypatch, NOW)
+    bucketed = BucketedFilter(bucket_days=7, retention_days=30)
+    bucketed.add(key("a"), NOW - 10 * DAY)
+    bucketed.add(key("b"))
+    bucketed.watermark = NOW - 60
+    restored = BucketedFilter.from_bytes(bucketed.to_bytes())
+    assert restored.watermark == bucketed.watermark
+    assert set(restored.buckets) == set(bucketed.buckets)
+    assert restored.might_contain(key("a"), 30)
+    assert restored.might_contain(key("b"), 1)
@@ -0,0 +1,163 @@
+"""
+Time-bucketed Bloom filter of processed URL hashes.
+
+Each bucket holds the url_hash of every URL marked as processed during a
+window of PROCESSED_BUCKET_DAYS days. A lookup only consults the buckets that
+overlap the requested days_threshold, and buckets older than the retention
+window are dropped, so the filter stays small while processed_urls grows.
+
+A negative answer is certain; a positive one has to be confirmed in
+Firestore. The filter is snapshotted to PROCESSED_FILTER_SNAPSHOT, a local
+path or a gs://bucket/object blob, so cold starts don't rebuild it.
+"""
+import gzip
+import json
+import math
+import os
+import threading
+import time
+
+from config import (
+    PROCESSED_BUCKET_DAYS,
+    PROCESSED_DAYS_THRESHOLD,
+    PROCESSED_FILTER_CAPACITY,
+    PROCESSED_FILTER_ERROR_RATE,
+)
+
+try:
+    from google.cloud import storage
+except ImportError:
+    storage = None
+
+DAY = 86400
+
+
+class BloomFilter:
+    def __init__(self, capacity=PROCESSED_FILTER_CAPACITY, error_rate=PROCESSED_FILTER_ERROR_RATE,
+                 num_bits=None, num_hashes=None, bits=None, count=0):
+        if num_bits is None:
+            num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        # Keys are md5 hex digests, so their two halves already make independent hashes
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class BucketedFilter:
+    """Bloom filters keyed by time bucket, with a watermark of the newest marker loaded"""
+
+    def __init__(self, bucket_days=PROCESSED_BUCKET_DAYS, retention_days=PROCESSED_DAYS_THRESHOLD):
+        self.bucket_days = bucket_days
+        self.retention_days = retention_days
+        self.buckets = {}
+        self.watermark = None
+        # Crawl workers add and check keys from threads
+        self._lock = threading.Lock()
+
+    def _bucket(self, timestamp):
+        return int(timestamp // DAY) // self.bucket_days
+
+    def add(self, key, timestamp=None):
+        bucket = self._bucket(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            if bucket not in self.buckets:
+                self.buckets[bucket] = BloomFilter()
+            self.buckets[bucket].add(key)
+
+    def covers(self, days_threshold):
+        return days_threshold <= self.retention_days
+
+    def might_contain(self, key, days_threshold):
+        """False if key was certainly not marked in the last days_threshold days"""
+        oldest = self._bucket(time.time() - days_threshold * DAY)
+        with self._lock:
+            return any(key in bloom for bucket, bloom in self.buckets.items() if bucket >= oldest)
+
+    def expire(self):
+        """Drops buckets that end before the retention window"""
+        oldest = self._bucket(time.time() - self.retention_days * DAY)
+        with self._lock:
+            for bucket in [b for b in self.buckets if b < oldest]:
+                del self.buckets[bucket]
+
+    def to_bytes(self):
+        with self._lock:
+            buckets = sorted(self.buckets.items())
+            header = {
+                "bucket_days": self.bucket_days,
+                "retention_days": self.retention_days,
+                "watermark": self.watermark,
+                "buckets": [
+                    {"bucket": bucket, "num_bits": bloom.num_bits, "num_hashes": bloom.num_hashes,
+                     "count": bloom.count, "length": len(bloom.bits)}
+                    for bucket, bloom in buckets
+                ]
+            }
+            body = b"".join(bytes(bloom.bits) for _, bloom in buckets)
+        return gzip.compress(json.dumps(header).encode("utf-8") + b"\n" + body, mtime=0)
+
+    @classmethod
+    def from_bytes(cls, data):
+        header_line, _, body = gzip.decompress(data).partition(b"\n")
+        header = json.loads(header_line)
+        url_filter = cls(header["bucket_days"], header["retention_days"])
+        url_filter.watermark = header["watermark"]
+        offset = 0
+        for meta in header["buckets"]:
+            bits = bytearray(body[offset:offset + meta["length"]])
+            offset += meta["length"]
+            url_filter.buckets[meta["bucket"]] = BloomFilter(
+                num_bits=meta["num_bits"], num_hashes=meta["num_hashes"], bits=bits, count=meta["count"])
+        return url_filter
+
+
+def _split_gs(path):
+    bucket, _, name = path[len("gs://"):].partition("/")
+    return bucket, name
+
+
+def read_snapshot(path):
+    """Snapshot bytes from a local path or gs:// blob, or None if there is none"""
+    if path.startswith("gs://"):
+        if storage is None:
+            print(f"google-cloud-storage is not installed, can't read snapshot {path}")
+            return None
+        bucket, name = _split_gs(path)
+        blob = storage.Client().bucket(bucket).blob(name)
+        return blob.download_as_bytes() if blob.exists() else None
+
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write_snapshot(path, data):
+    if path.startswith("gs://"):
+        if storage is None:
+            print(f"google-cloud-storage is not installed, can't write snapshot {path}")
+            return
+        bucket, name = _split_gs(path)
+        storage.Client().bucket(bucket).blob(name).upload_from_string(data, content_type="application/octet-stream")
+        return
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,15 @@
+import hashlib
+
+
+def normalize_url(url):
+    """Normalize URL for consistent tracking"""
+    url = url.rstrip('/')
+    url = url.split('?')[0]
+    url = url.replace('http://', '').replace('https://', '')
+    url = url.replace('www.', '')
+    return url
+
+
+def url_hash(url):
+    """Document ID used for a URL in processed_urls"""
+    return hashlib.md5(normalize_url(url).encode()).hexdigest()